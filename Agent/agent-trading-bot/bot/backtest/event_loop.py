@@ -0,0 +1,98 @@
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest.sim_exchange import SimulatedExchange
+from core.order_executor import OrderExecutor
+from core.position_manager import PositionManager
+from strategy.base_strategy import BaseStrategy
+
+
+class StrategyRunner:
+    """
+    Handler mỗi nến chạy đúng đường code production: strategy quyết định,
+    PositionManager đọc/đóng vị thế, OrderExecutor đặt lệnh (làm tròn, retry...).
+    """
+
+    def __init__(self, strategy: BaseStrategy, api, symbol: str, quantity: float,
+                 executor: Optional[OrderExecutor] = None, position_manager: Optional[PositionManager] = None):
+        self.strategy = strategy
+        self.symbol = symbol
+        self.quantity = quantity
+        # Trên sàn giả lập không cần chờ giữa các lần thử lại
+        self.executor = executor or OrderExecutor(api, retry_delay=0.0)
+        self.position_manager = position_manager or PositionManager(api, symbol)
+
+    def __call__(self, candle: Dict):
+        pm = self.position_manager
+        pm.update_position()
+        if pm.is_position_open():
+            if self.strategy.should_close_position(candle):
+                pm.close_position()
+        elif self.strategy.should_open_position(candle):
+            side = "BUY" if self.strategy.get_signal_type(candle) == "long" else "SELL"
+            self.executor.place_order(self.symbol, side, self.quantity, reference_price=candle["close"])
+
+
+class EventLoopResult:
+    def __init__(self, exchange: SimulatedExchange, equity: np.ndarray, cycles: int, elapsed: float):
+        self.exchange = exchange
+        self.equity = equity
+        self.cycles = cycles
+        self.elapsed = elapsed
+        self.fills = pd.DataFrame(exchange.fills)
+        peak = np.maximum.accumulate(equity) if len(equity) else equity
+        self.stats = {
+            "cycles": cycles,
+            "elapsed_sec": elapsed,
+            "cycles_per_sec": cycles / elapsed if elapsed > 0 else 0.0,
+            "final_equity": float(equity[-1]) if len(equity) else exchange.initial_balance,
+            "total_return": float(equity[-1] / exchange.initial_balance - 1) if len(equity) else 0.0,
+            "max_drawdown": float((equity / peak - 1).min()) if len(equity) else 0.0,
+            "fills": len(exchange.fills),
+            "total_fees": exchange.total_fees,
+            "liquidations": exchange.liquidations,
+        }
+
+
+class BacktestEventLoop:
+    """
+    Vòng lặp sự kiện chạy nhanh hơn thời gian thực: mỗi bước sàn giả lập sang nến mới
+    (khớp lệnh chờ, kiểm tra thanh lý), rồi gọi handler với nến vừa đóng.
+
+    handler có thể là StrategyRunner, hoặc hàm bất kỳ gọi code bot thật trên api=exchange
+    (ví dụ TradingBot(config, api=exchange).run_once).
+    """
+
+    def __init__(self, exchange: SimulatedExchange, handler: Callable[[Dict], None], warmup: int = 0):
+        self.exchange = exchange
+        self.handler = handler
+        self.warmup = warmup
+
+    def run(self, max_cycles: Optional[int] = None, log_every: int = 0) -> EventLoopResult:
+        ex = self.exchange
+        total = len(ex.close) - ex.index
+        if max_cycles is not None:
+            total = min(total, max_cycles)
+        equity = np.empty(total, dtype=np.float64)
+        started = time.perf_counter()
+        cycles = 0
+        while cycles < total:
+            if cycles > 0 and not ex.advance():
+                break
+            if ex.index >= self.warmup:
+                try:
+                    self.handler(ex.current_candle())
+                except Exception as e:
+                    logging.error(f"[EventLoop] Lỗi handler tại nến {ex.index}: {e}")
+            equity[cycles] = ex.equity()
+            cycles += 1
+            if log_every and cycles % log_every == 0:
+                logging.info(f"[EventLoop] {cycles}/{total} nến, equity {equity[cycles - 1]:.2f}")
+        elapsed = time.perf_counter() - started
+        result = EventLoopResult(ex, equity[:cycles], cycles, elapsed)
+        logging.info(f"[EventLoop] Hoàn tất: {result.stats}")
+        return result
@@ -0,0 +1,332 @@
+import logging
+import time
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from backtest.vectorized import BacktestResult, to_arrays
+from strategy_data import Strategy, StrategyData
+
+AMBIGUITY_POLICIES = ("stop_first", "target_first", "ohlc", "nearest")
+
+EXIT_NONE, EXIT_SL, EXIT_TP, EXIT_LIQ, EXIT_TIMEOUT = 0, 1, 2, 3, 4
+EXIT_NAMES = np.array(["", "stop_loss", "take_profit", "liquidation", "timeout"])
+
+
+def entries_from_signals(signals: Dict[str, np.ndarray]):
+    """Chỉ số nến vào lệnh và chiều (+1/-1) từ kết quả BaseStrategy.vectorized_signals."""
+    long_idx = np.flatnonzero(signals["entry_long"])
+    short_idx = np.flatnonzero(signals["entry_short"])
+    idx = np.concatenate([long_idx, short_idx])
+    sides = np.concatenate([np.ones(len(long_idx)), -np.ones(len(short_idx))])
+    order = np.argsort(idx, kind="stable")
+    return idx[order], sides[order]
+
+
+def _first_true(mask: np.ndarray) -> np.ndarray:
+    """Vị trí True đầu tiên theo trục cuối, bằng độ dài trục nếu không có."""
+    horizon = mask.shape[-1]
+    return np.where(mask.any(axis=-1), mask.argmax(axis=-1), horizon)
+
+
+class ExitSimulator:
+    """
+    Mô phỏng thoát lệnh trong nến (SL / TP / thanh lý) cho các profile Strategy của strategy_data.py.
+
+    Với mỗi tín hiệu vào lệnh (giá vào = close của nến tín hiệu) và mỗi profile, tìm nến đầu tiên
+    trong `max_holding` nến sau đó mà low/high chạm SL, TP hoặc giá thanh lý (isolated, theo leverage).
+    Tính toàn bộ bằng mảng (profiles x entries x horizon), chia khối theo entries để giới hạn bộ nhớ.
+
+    Nến chạm cả SL và TP xử lý theo `ambiguity`:
+        - stop_first: coi SL chạm trước (bảo thủ, mặc định).
+        - target_first: coi TP chạm trước.
+        - ohlc: theo hướng nến, nến tăng đi O->L->H->C, nến giảm đi O->H->L->C.
+        - nearest: mức nào gần giá open của nến hơn thì chạm trước.
+    stop_loss_pct / take_profit_pct = 0 nghĩa là không đặt mức đó.
+    """
+
+    def __init__(
+        self,
+        data,
+        max_holding: int = 288,
+        fee_rate: float = 0.0004,
+        maintenance_margin_rate: float = 0.004,
+        ambiguity: str = "stop_first",
+        block_entries: int = 512
+    ):
+        if ambiguity not in AMBIGUITY_POLICIES:
+            raise ValueError(f"ambiguity phải thuộc {AMBIGUITY_POLICIES}, nhận {ambiguity}")
+        arrays = to_arrays(data)
+        self.open = np.asarray(arrays["open"], dtype=np.float64)
+        self.high = np.asarray(arrays["high"], dtype=np.float64)
+        self.low = np.asarray(arrays["low"], dtype=np.float64)
+        self.close = np.asarray(arrays["close"], dtype=np.float64)
+        self.timestamps = arrays.get("timestamp")
+        self.max_holding = max_holding
+        self.fee_rate = fee_rate
+        self.maintenance_margin_rate = maintenance_margin_rate
+        self.ambiguity = ambiguity
+        self.block_entries = block_entries
+
+    @staticmethod
+    def _profile_arrays(profiles: Sequence[Strategy]):
+        sl = np.array([p.stop_loss_pct for p in profiles], dtype=np.float64)
+        tp = np.array([p.take_profit_pct for p in profiles], dtype=np.float64)
+        lev = np.array([p.leverage for p in profiles], dtype=np.float64)
+        size = np.array([p.max_position_size for p in profiles], dtype=np.float64)
+        return sl, tp, lev, size
+
+    def simulate(self, entries: np.ndarray, sides: np.ndarray, profiles: Optional[Sequence[Strategy]] = None) -> Dict[str, np.ndarray]:
+        """
+        Trả về dict mảng (profiles x entries): exit_index, exit_price, reason (mã EXIT_*),
+        bars, return_on_margin, pnl (theo max_position_size), ambiguous.
+        """
+        profiles = list(profiles or StrategyData.STRATEGIES)
+        entries = np.asarray(entries, dtype=np.int64)
+        sides = np.asarray(sides, dtype=np.float64)
+        valid = entries < len(self.close) - 1
+        entries, sides = entries[valid], sides[valid]
+        n_prof, n_ent = len(profiles), len(entries)
+
+        out = {
+            "exit_index": np.zeros((n_prof, n_ent), dtype=np.int64),
+            "exit_price": np.zeros((n_prof, n_ent)),
+            "reason": np.zeros((n_prof, n_ent), dtype=np.int8),
+            "ambiguous": np.zeros((n_prof, n_ent), dtype=bool),
+        }
+        for start in range(0, n_ent, self.block_entries):
+            stop = min(start + self.block_entries, n_ent)
+            block = self._simulate_block(entries[start:stop], sides[start:stop], profiles)
+            for key, values in block.items():
+                out[key][:, start:stop] = values
+
+        sl, tp, lev, size = self._profile_arrays(profiles)
+        entry_price = self.close[entries][None, :]
+        move = sides[None, :] * (out["exit_price"] / entry_price - 1)
+        rom = move * lev[:, None] - 2 * self.fee_rate * lev[:, None]
+        # Thanh lý mất toàn bộ margin ký quỹ
+        rom = np.where(out["reason"] == EXIT_LIQ, -1.0, np.maximum(rom, -1.0))
+        out["return_on_margin"] = rom
+        out["pnl"] = (move - 2 * self.fee_rate) * size[:, None] * entry_price
+        out["pnl"] = np.where(out["reason"] == EXIT_LIQ, -size[:, None] * entry_price / lev[:, None], out["pnl"])
+        out["bars"] = out["exit_index"] - entries[None, :]
+        out["entries"] = entries
+        out["sides"] = sides
+        out["profiles"] = np.array([p.name for p in profiles])
+        return out
+
+    def _simulate_block(self, entries: np.ndarray, sides: np.ndarray, profiles: Sequence[Strategy]) -> Dict[str, np.ndarray]:
+        n = len(self.close)
+        horizon = self.max_holding
+        offsets = np.arange(1, horizon + 1)
+        idx = np.minimum(entries[:, None] + offsets[None, :], n - 1)          # (E, H)
+        in_range = (entries[:, None] + offsets[None, :]) <= n - 1
+        last = np.minimum(entries + horizon, n - 1)                            # nến timeout
+        high, low, open_ = self.high[idx], self.low[idx], self.open[idx]
+        long = sides[:, None] > 0
+        # Giá bất lợi / thuận lợi theo chiều lệnh, cộng dồn để so với mức cố định
+        adverse = np.where(long, np.minimum.accumulate(low, axis=1), -np.maximum.accumulate(high, axis=1))
+        favorable = np.where(long, np.maximum.accumulate(high, axis=1), -np.minimum.accumulate(low, axis=1))
+        adverse = np.where(in_range, adverse, np.inf)
+        favorable = np.where(in_range, favorable, -np.inf)
+
+        sl, tp, lev, _ = self._profile_arrays(profiles)
+        entry = self.close[entries]
+        side = sides
+        # Mức giá theo (P, E); với short các mức được đổi dấu để dùng chung phép so sánh
+        sl_level = entry[None, :] * (1 - side[None, :] * sl[:, None])
+        tp_level = entry[None, :] * (1 + side[None, :] * tp[:, None])
+        liq_dist = np.maximum(1 / lev - self.maintenance_margin_rate, 0.0)
+        liq_level = entry[None, :] * (1 - side[None, :] * liq_dist[:, None])
+        sgn = side[None, :]
+
+        def signed(level):
+            return np.where(sgn > 0, level, -level)
+
+        sl_hit = _first_true(adverse[None, :, :] <= signed(sl_level)[:, :, None])
+        sl_hit = np.where(sl[:, None] > 0, sl_hit, horizon)
+        tp_hit = _first_true(favorable[None, :, :] >= signed(tp_level)[:, :, None])
+        tp_hit = np.where(tp[:, None] > 0, tp_hit, horizon)
+        liq_hit = _first_true(adverse[None, :, :] <= signed(liq_level)[:, :, None])
+
+        def at_hit(values, hit):
+            """Giá trị (E, H) tại nến chạm `hit` (P, E)."""
+            hit = np.minimum(hit, horizon - 1)
+            return np.take_along_axis(np.broadcast_to(values, (len(profiles),) + values.shape), hit[:, :, None], axis=2)[:, :, 0]
+
+        # Mức dừng thực tế: SL, hoặc thanh lý nếu thanh lý chạm trước SL. Cùng nến thì thanh lý chỉ thắng khi
+        # giá thanh lý gần giá vào hơn SL hoặc nến mở cửa đã vượt giá thanh lý; còn lại SL khớp trước
+        liq_open = at_hit(open_, liq_hit)
+        liq_nearer = signed(liq_level) >= signed(sl_level)
+        opens_beyond_liq = np.where(sgn > 0, liq_open <= liq_level, liq_open >= liq_level)
+        liq_first = (liq_hit < sl_hit) | ((liq_hit == sl_hit) & (liq_nearer | opens_beyond_liq))
+        stop_hit = np.where(liq_first, liq_hit, sl_hit)
+        stop_level = np.where(liq_first, liq_level, sl_level)
+        stop_reason = np.where(liq_first, EXIT_LIQ, EXIT_SL)
+
+        both = (stop_hit == tp_hit) & (stop_hit < horizon)
+        bar_open = at_hit(open_, stop_hit)
+        if self.ambiguity == "stop_first":
+            stop_wins = both
+        elif self.ambiguity == "target_first":
+            stop_wins = np.zeros_like(both)
+        elif self.ambiguity == "nearest":
+            stop_wins = both & (np.abs(bar_open - stop_level) <= np.abs(tp_level - bar_open))
+        else:
+            bar_close = at_hit(self.close[idx], stop_hit)
+            bullish = bar_close >= bar_open
+            # Nến tăng đi qua low trước: long chạm SL trước, short chạm TP trước
+            stop_wins = both & (bullish == (sgn > 0))
+
+        stop_exit = (stop_hit < tp_hit) | stop_wins
+        tp_exit = (tp_hit < horizon) & ~stop_exit
+        stop_exit &= stop_hit < horizon
+
+        exit_offset = np.where(stop_exit, stop_hit, np.where(tp_exit, tp_hit, -1))
+        reason = np.where(stop_exit, stop_reason, np.where(tp_exit, EXIT_TP, EXIT_TIMEOUT)).astype(np.int8)
+        exit_index = np.where(exit_offset >= 0, entries[None, :] + 1 + exit_offset, last[None, :])
+
+        # Giá ra: mức SL/TP, nhưng nếu nến mở cửa đã vượt qua mức (gap) thì khớp ở open
+        level = np.where(stop_exit, stop_level, tp_level)
+        gap_open = self.open[exit_index]
+        if_stop = np.where(sgn > 0, np.minimum(level, gap_open), np.maximum(level, gap_open))
+        if_tp = np.where(sgn > 0, np.maximum(level, gap_open), np.minimum(level, gap_open))
+        exit_price = np.where(stop_exit & (reason == EXIT_SL), if_stop, np.where(tp_exit, if_tp, level))
+        exit_price = np.where(reason == EXIT_TIMEOUT, self.close[exit_index], exit_price)
+
+        return {"exit_index": exit_index, "exit_price": exit_price, "reason": reason, "ambiguous": both}
+
+    def score(self, entries: np.ndarray, sides: np.ndarray, profiles: Optional[Sequence[Strategy]] = None) -> pd.DataFrame:
+        """Bảng điểm mỗi profile trên cùng bộ tín hiệu, sắp theo tổng return_on_margin."""
+        started = time.perf_counter()
+        res = self.simulate(entries, sides, profiles)
+        rom, pnl, reason = res["return_on_margin"], res["pnl"], res["reason"]
+        n = rom.shape[1]
+        wins = np.where(rom > 0, rom, 0.0).sum(axis=1)
+        losses = -np.where(rom < 0, rom, 0.0).sum(axis=1)
+        table = pd.DataFrame({
+            "profile": res["profiles"],
+            "trades": n,
+            "win_rate": (rom > 0).mean(axis=1) if n else 0.0,
+            "avg_return_on_margin": rom.mean(axis=1) if n else 0.0,
+            "total_return_on_margin": rom.sum(axis=1),
+            "total_pnl": pnl.sum(axis=1),
+            "profit_factor": np.where(losses > 0, wins / np.maximum(losses, 1e-12), np.inf),
+            "stop_loss": (reason == EXIT_SL).sum(axis=1),
+            "take_profit": (reason == EXIT_TP).sum(axis=1),
+            "liquidations": (reason == EXIT_LIQ).sum(axis=1),
+            "timeouts": (reason == EXIT_TIMEOUT).sum(axis=1),
+            "ambiguous": res["ambiguous"].sum(axis=1),
+            "avg_bars": res["bars"].mean(axis=1) if n else 0.0,
+        }).sort_values("total_return_on_margin", ascending=False).reset_index(drop=True)
+        logging.debug(f"[ExitSimulator] {len(table)} profile x {n} tín hiệu trong {time.perf_counter() - started:.3f}s")
+        return table
+
+    def trades(self, entries: np.ndarray, sides: np.ndarray, profile: Union[str, Strategy]) -> pd.DataFrame:
+        """Chi tiết từng lệnh của một profile."""
+        if isinstance(profile, str):
+            profile = StrategyData.get_strategy_by_name(profile)
+        res = self.simulate(entries, sides, [profile])
+        table = pd.DataFrame({
+            "entry_index": res["entries"],
+            "side": np.where(res["sides"] > 0, "long", "short"),
+            "entry_price": self.close[res["entries"]],
+            "exit_index": res["exit_index"][0],
+            "exit_price": res["exit_price"][0],
+            "reason": EXIT_NAMES[res["reason"][0]],
+            "bars": res["bars"][0],
+            "return_on_margin": res["return_on_margin"][0],
+            "pnl": res["pnl"][0],
+            "ambiguous": res["ambiguous"][0],
+        })
+        if self.timestamps is not None:
+            table["entry_time"] = pd.to_datetime(np.asarray(self.timestamps)[table["entry_index"]], unit="ms")
+        return table
+
+    def select_profile(self, entries: np.ndarray, sides: np.ndarray, lookback: Optional[int] = None,
+                       metric: str = "total_return_on_margin") -> Optional[str]:
+        """Tên profile tốt nhất theo metric trên `lookback` tín hiệu gần nhất (chạy lại được mỗi nến)."""
+        if lookback is not None:
+            entries, sides = entries[-lookback:], sides[-lookback:]
+        if len(entries) == 0:
+            return None
+        table = self.score(entries, sides)
+        return str(table.sort_values(metric, ascending=False)["profile"].iloc[0])
+
+
+def run_exit_backtest(
+    strategy,
+    data,
+    stop_loss_pct: float = 0.0,
+    take_profit_pct: float = 0.0,
+    leverage: float = 1.0,
+    fee_rate: float = 0.0004,
+    slippage: float = 0.0,
+    max_holding: int = 288,
+    ambiguity: str = "stop_first",
+    initial_capital: float = 1000.0,
+    interval: str = "1m",
+    name: Optional[str] = None
+) -> BacktestResult:
+    """
+    Backtest vào lệnh theo tín hiệu entry của strategy, ra lệnh bằng SL/TP/thanh lý trong nến
+    (ExitSimulator) hoặc hết `max_holding` nến; tín hiệu exit của strategy không dùng.
+    Mỗi lúc giữ một vị thế: tín hiệu vào lệnh khi lệnh trước chưa đóng bị bỏ qua.
+    Lợi nhuận của lệnh ghi vào nến đóng lệnh, nên stats (total_return, max_drawdown, sharpe...)
+    cùng dạng với run_backtest và dùng được làm metric của ParameterSweep.
+    """
+    started = time.perf_counter()
+    arrays = to_arrays(data)
+    entries, sides = entries_from_signals(strategy.vectorized_signals(arrays))
+    simulator = ExitSimulator(arrays, max_holding=max_holding, fee_rate=fee_rate + slippage, ambiguity=ambiguity)
+    profile = Strategy(name or type(strategy).__name__, leverage, 1.0, stop_loss_pct, take_profit_pct, "")
+    res = simulator.simulate(entries, sides, [profile])
+
+    n = len(simulator.close)
+    taken = []
+    next_free = 0
+    for j, entry in enumerate(res["entries"]):
+        if entry >= next_free:
+            taken.append(j)
+            next_free = res["exit_index"][0, j]
+    taken = np.asarray(taken, dtype=np.int64)
+    entry_idx = res["entries"][taken]
+    exit_idx = res["exit_index"][0, taken]
+    side = res["sides"][taken]
+    rom = res["return_on_margin"][0, taken]
+
+    returns = np.zeros(n)
+    np.add.at(returns, exit_idx, rom)
+    fees = np.zeros(n)
+    np.add.at(fees, exit_idx, 2 * (fee_rate + slippage) * leverage)
+    # Vị thế có hiệu lực từ nến sau nến tín hiệu tới hết nến đóng lệnh
+    delta = np.zeros(n + 1)
+    np.add.at(delta, entry_idx + 1, side)
+    np.add.at(delta, exit_idx + 1, -side)
+    positions = np.cumsum(delta[:n]).astype(np.int8)
+    equity = initial_capital * np.cumprod(np.maximum(1 + returns, 0.0))
+
+    timestamps = arrays.get("timestamp")
+    trades = pd.DataFrame({
+        "side": np.where(side > 0, "long", "short"),
+        "entry_index": entry_idx,
+        "exit_index": exit_idx,
+        "entry_price": simulator.close[entry_idx],
+        "exit_price": res["exit_price"][0, taken],
+        "bars": exit_idx - entry_idx,
+        "pnl_pct": rom,
+        "reason": EXIT_NAMES[res["reason"][0, taken]],
+    })
+    result = BacktestResult(
+        profile.name, timestamps, equity, positions, returns,
+        fees * np.r_[initial_capital, equity[:-1]], trades, interval, time.perf_counter() - started
+    )
+    reasons = res["reason"][0, taken]
+    result.stats.update({
+        "stop_loss": int((reasons == EXIT_SL).sum()),
+        "take_profit": int((reasons == EXIT_TP).sum()),
+        "liquidations": int((reasons == EXIT_LIQ).sum()),
+        "timeouts": int((reasons == EXIT_TIMEOUT).sum()),
+    })
+    return result
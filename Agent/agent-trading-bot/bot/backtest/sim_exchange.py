@@ -0,0 +1,557 @@
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from core.exchange_api import BinanceAPI
+from core.user_stream import UserDataStream
+from backtest.vectorized import to_arrays
+from data.indicators import calculate_all_indicators
+from data.kline_parser import arrays_to_dataframe
+
+FINAL_STATUSES = ("FILLED", "CANCELED", "REJECTED", "EXPIRED")
+
+
+class SimulatedUserStream(UserDataStream):
+    """
+    User-data stream giả lập cho SimulatedExchange: không listenKey, không WebSocket.
+    Sự kiện được giao ngay (hoặc trễ `latency_ms` trên luồng timer để thử các tình huống
+    sự kiện tới sau/trước response REST), cùng định dạng với stream thật.
+    """
+
+    def __init__(self, latency_ms: int = 0):
+        super().__init__(api_key="", transport=False, ws_base_url="")
+        self.latency_ms = latency_ms
+
+    def start(self):
+        self.connected = True
+        self._notify_connect()
+
+    def stop(self):
+        self.connected = False
+
+    def push(self, event: Dict):
+        if not self.connected:
+            return  # Giống stream thật: sự kiện lúc mất kết nối bị lỡ
+        if self.latency_ms > 0:
+            threading.Timer(self.latency_ms / 1000, self.handle_message, args=(event,)).start()
+        else:
+            self.handle_message(event)
+
+
+class SimulatedExchange(BinanceAPI):
+    """
+    Sàn futures giả lập chạy trên nến lịch sử, cùng giao diện với BinanceAPI.
+
+    Kế thừa BinanceAPI và chỉ thay `_request`: các hàm get_position, set_leverage, place_order,
+    calculate_liquidation_price, get_order, cancel_order... của BinanceAPI chạy nguyên vẹn, request
+    được định tuyến tới bộ xử lý nội bộ thay vì gửi HTTP (kể cả exchangeInfo cho ExchangeInfoCache).
+    attach_user_stream(SimulatedUserStream) để nhận ORDER_TRADE_UPDATE/ACCOUNT_UPDATE như user-data stream thật.
+
+    Mô hình khớp lệnh:
+        - Thời gian hiện tại là lúc đóng nến hiện tại; giá mark là giá close.
+        - MARKET khớp ngay ở giá close (hoặc giá open của nến kế tiếp nếu latency_ms > 0), cộng trượt giá.
+        - LIMIT khớp khi high/low của nến sau chạm giá đặt (phí maker); đặt xuyên giá thì khớp ngay như taker.
+        - STOP_MARKET/TAKE_PROFIT_MARKET kích hoạt khi nến chạm stopPrice (tham số stopPrice).
+        - Thanh lý khi high/low chạm giá thanh lý (CROSSED: theo số dư ví, ISOLATED: theo margin vị thế).
+    """
+
+    def __init__(
+        self,
+        candles: Union[pd.DataFrame, Dict[str, np.ndarray]],
+        symbol: str = "BTCUSDT",
+        initial_balance: float = 1000.0,
+        leverage: int = 20,
+        taker_fee: float = 0.0004,
+        maker_fee: float = 0.0002,
+        slippage: float = 0.0,
+        latency_ms: int = 0,
+        maintenance_margin_rate: float = 0.004,
+        step_size: float = 0.001,
+        tick_size: float = 0.1,
+        interval_ms: Optional[int] = None
+    ):
+        super().__init__(api_key="", api_secret="")
+        arrays = to_arrays(candles)
+        self.timestamps = np.asarray(arrays["timestamp"], dtype=np.int64)
+        self.open = np.asarray(arrays["open"], dtype=np.float64)
+        self.high = np.asarray(arrays["high"], dtype=np.float64)
+        self.low = np.asarray(arrays["low"], dtype=np.float64)
+        self.close = np.asarray(arrays["close"], dtype=np.float64)
+        self.volume = np.asarray(arrays.get("volume", np.zeros(len(self.close))), dtype=np.float64)
+        if interval_ms is None:
+            interval_ms = int(self.timestamps[1] - self.timestamps[0]) if len(self.timestamps) > 1 else 60_000
+        self.interval_ms = interval_ms
+
+        self.symbol = symbol.upper()
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.slippage = slippage
+        self.latency_ms = latency_ms
+        self.maintenance_margin_rate = maintenance_margin_rate
+        self.step_size = step_size
+        self.tick_size = tick_size
+
+        self.index = 0
+        self.wallet_balance = float(initial_balance)
+        self.initial_balance = float(initial_balance)
+        self.leverage = int(leverage)
+        self.margin_type = "CROSSED"
+        self.position_amt = 0.0
+        self.entry_price = 0.0
+        self.orders: Dict[int, Dict] = {}
+        self.client_order_ids: Dict[str, int] = {}
+        self.open_order_ids: List[int] = []
+        self.fills: List[Dict] = []
+        self.total_fees = 0.0
+        self.liquidations = 0
+        self._next_order_id = 1
+        self.user_stream: Optional[SimulatedUserStream] = None
+
+        self._routes = {
+            ("GET", "/fapi/v1/exchangeInfo"): self._handle_exchange_info,
+            ("GET", "/fapi/v2/positionRisk"): self._handle_position_risk,
+            ("GET", "/fapi/v2/account"): self._handle_account,
+            ("POST", "/fapi/v1/leverage"): self._handle_leverage,
+            ("POST", "/fapi/v1/marginType"): self._handle_margin_type,
+            ("POST", "/fapi/v1/order"): self._handle_new_order,
+            ("GET", "/fapi/v1/order"): self._handle_query_order,
+            ("DELETE", "/fapi/v1/order"): self._handle_cancel_order,
+            ("POST", "/fapi/v1/batchOrders"): self._handle_batch_orders,
+        }
+
+    def attach_user_stream(self, stream: SimulatedUserStream):
+        self.user_stream = stream
+
+    # ========== ĐỊNH TUYẾN REQUEST ==========
+
+    def _request(self, method: str, path: str, params: dict = None, signed: bool = False,
+                 return_errors: bool = False):
+        handler = self._routes.get((method, path))
+        if handler is None:
+            logging.error(f"[SimExchange] Không hỗ trợ {method} {path}")
+            return None
+        try:
+            return handler(dict(params or {}))
+        except ValueError as e:
+            # Giống BinanceAPI: lỗi từ sàn được log và trả về None
+            logging.error(f"Binance API request error: {e}")
+            return {"code": -1, "msg": str(e)} if return_errors else None
+
+    # ========== THỜI GIAN / GIÁ ==========
+
+    @property
+    def now(self) -> int:
+        """Thời điểm đóng nến hiện tại (ms)."""
+        return int(self.timestamps[self.index]) + self.interval_ms - 1
+
+    @property
+    def mark_price(self) -> float:
+        return float(self.close[self.index])
+
+    def current_candle(self) -> Dict:
+        i = self.index
+        return {
+            "timestamp": int(self.timestamps[i]),
+            "open": float(self.open[i]),
+            "high": float(self.high[i]),
+            "low": float(self.low[i]),
+            "close": float(self.close[i]),
+            "volume": float(self.volume[i]),
+        }
+
+    def get_historical_dataframe(
+        self,
+        limit: int = 1000,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        with_indicators: bool = True
+    ) -> pd.DataFrame:
+        """
+        Nến lịch sử tới nến hiện tại (không bao giờ lộ nến tương lai), cùng giao diện và định dạng
+        với BinanceFuturesCollector.get_historical_dataframe để TradingBot dùng sàn giả lập làm nguồn nến.
+        """
+        stop = self.index + 1
+        if end_time is not None:
+            stop = min(stop, int(np.searchsorted(self.timestamps, end_time, side="right")))
+        start = max(0, stop - limit)
+        if start_time is not None:
+            start = max(start, int(np.searchsorted(self.timestamps, start_time, side="left")))
+        if stop <= start:
+            return pd.DataFrame()
+        ts = self.timestamps[start:stop]
+        df = arrays_to_dataframe({
+            "timestamp": ts, "open": self.open[start:stop], "high": self.high[start:stop],
+            "low": self.low[start:stop], "close": self.close[start:stop], "volume": self.volume[start:stop],
+            "close_time": ts + self.interval_ms - 1,
+        })
+        return calculate_all_indicators(df) if with_indicators else df
+
+    def has_next(self) -> bool:
+        return self.index + 1 < len(self.close)
+
+    def advance(self) -> bool:
+        """Chuyển sang nến kế tiếp: xử lý lệnh chờ và thanh lý theo OHLC của nến mới."""
+        if not self.has_next():
+            return False
+        self.index += 1
+        self._process_open_orders()
+        self._check_liquidation()
+        return True
+
+    # ========== TÀI KHOẢN / VỊ THẾ ==========
+
+    def unrealized_pnl(self, price: Optional[float] = None) -> float:
+        price = self.mark_price if price is None else price
+        return self.position_amt * (price - self.entry_price)
+
+    def position_margin(self) -> float:
+        return abs(self.position_amt) * self.entry_price / self.leverage
+
+    def equity(self) -> float:
+        return self.wallet_balance + self.unrealized_pnl()
+
+    def available_balance(self) -> float:
+        return max(0.0, self.equity() - self.position_margin() - self._open_order_margin())
+
+    def _open_order_margin(self) -> float:
+        margin = 0.0
+        for order_id in self.open_order_ids:
+            order = self.orders[order_id]
+            if order["type"] == "LIMIT" and not order["reduceOnly"]:
+                margin += (order["origQty"] - order["executedQty"]) * order["price"] / self.leverage
+        return margin
+
+    def liquidation_price(self) -> float:
+        amt = self.position_amt
+        if amt == 0:
+            return 0.0
+        margin = self.wallet_balance if self.margin_type == "CROSSED" else self.position_margin()
+        # Giải margin + amt * (P - entry) = mmr * |amt| * P
+        price = (amt * self.entry_price - margin) / (amt - self.maintenance_margin_rate * abs(amt))
+        return max(price, 0.0)
+
+    def _handle_position_risk(self, params: dict):
+        symbol = params.get("symbol", self.symbol)
+        if symbol != self.symbol:
+            return []
+        return [{
+            "symbol": self.symbol,
+            "positionAmt": f"{self.position_amt:.8f}",
+            "entryPrice": f"{self.entry_price:.8f}",
+            "markPrice": f"{self.mark_price:.8f}",
+            "unRealizedProfit": f"{self.unrealized_pnl():.8f}",
+            "liquidationPrice": f"{self.liquidation_price():.8f}",
+            "leverage": str(self.leverage),
+            "marginType": "cross" if self.margin_type == "CROSSED" else "isolated",
+            "isolatedMargin": f"{self.position_margin() if self.margin_type == 'ISOLATED' else 0.0:.8f}",
+            "maintMargin": f"{abs(self.position_amt) * self.mark_price * self.maintenance_margin_rate:.8f}",
+            "positionSide": "BOTH",
+            "updateTime": self.now,
+        }]
+
+    def _handle_account(self, params: dict):
+        unrealized = self.unrealized_pnl()
+        return {
+            "totalWalletBalance": f"{self.wallet_balance:.8f}",
+            "totalUnrealizedProfit": f"{unrealized:.8f}",
+            "totalMarginBalance": f"{self.wallet_balance + unrealized:.8f}",
+            "totalPositionInitialMargin": f"{self.position_margin():.8f}",
+            "totalOpenOrderInitialMargin": f"{self._open_order_margin():.8f}",
+            "availableBalance": f"{self.available_balance():.8f}",
+            "maxWithdrawAmount": f"{self.available_balance():.8f}",
+            "positions": self._handle_position_risk({}),
+            "updateTime": self.now,
+        }
+
+    def _handle_leverage(self, params: dict):
+        leverage = int(params["leverage"])
+        if not 1 <= leverage <= 125:
+            raise ValueError(f"Leverage {leverage} không hợp lệ")
+        self.leverage = leverage
+        return {"symbol": self.symbol, "leverage": leverage, "maxNotionalValue": "1000000"}
+
+    def _handle_margin_type(self, params: dict):
+        margin_type = params["marginType"].upper()
+        if margin_type not in ("CROSSED", "ISOLATED"):
+            raise ValueError(f"marginType {margin_type} không hợp lệ")
+        if self.position_amt != 0:
+            raise ValueError("Không thể đổi margin type khi đang có vị thế")
+        self.margin_type = margin_type
+        return {"code": 200, "msg": "success"}
+
+    # ========== LỆNH ==========
+
+    def get_symbol_info(self, symbol: str) -> Dict:
+        """Thông tin symbol dạng exchangeInfo, các filter mà SymbolRules dùng."""
+        step, tick = str(self.step_size), str(self.tick_size)
+        return {
+            "symbol": symbol,
+            "status": "TRADING",
+            "filters": [
+                {"filterType": "PRICE_FILTER", "tickSize": tick, "minPrice": tick, "maxPrice": "0"},
+                {"filterType": "LOT_SIZE", "stepSize": step, "minQty": step, "maxQty": "0"},
+                {"filterType": "MARKET_LOT_SIZE", "stepSize": step, "minQty": step, "maxQty": "0"},
+                {"filterType": "MIN_NOTIONAL", "notional": "0"},
+            ],
+        }
+
+    def _handle_exchange_info(self, params: dict):
+        return {"serverTime": self.now, "symbols": [self.get_symbol_info(self.symbol)]}
+
+    def _handle_new_order(self, params: dict):
+        if params.get("symbol", "").upper() != self.symbol:
+            raise ValueError(f"Symbol {params.get('symbol')} không có trong dữ liệu giả lập")
+        order_type = params["type"]
+        if order_type not in ("MARKET", "LIMIT", "STOP_MARKET", "TAKE_PROFIT_MARKET"):
+            raise ValueError(f"Loại lệnh {order_type} chưa được hỗ trợ")
+        close_position = str(params.get("closePosition", "false")).lower() == "true"
+        if close_position and order_type not in ("STOP_MARKET", "TAKE_PROFIT_MARKET"):
+            raise ValueError("closePosition chỉ dùng cho STOP_MARKET/TAKE_PROFIT_MARKET")
+        # closePosition: khối lượng là toàn bộ vị thế lúc kích hoạt
+        quantity = 0.0 if close_position else float(params["quantity"])
+        if quantity <= 0 and not close_position:
+            raise ValueError("Quantity phải > 0")
+        client_order_id = params.get("newClientOrderId") or f"sim_{self._next_order_id}"
+        if client_order_id in self.client_order_ids:
+            raise ValueError(f"clientOrderId {client_order_id} bị trùng")
+        price = float(params["price"]) if params.get("price") is not None else 0.0
+        if order_type == "LIMIT" and price <= 0:
+            raise ValueError("Lệnh LIMIT cần price")
+        stop_price = float(params.get("stopPrice", 0) or 0)
+        if order_type.endswith("_MARKET") and order_type != "MARKET" and stop_price <= 0:
+            raise ValueError(f"Lệnh {order_type} cần stopPrice")
+
+        order = {
+            "orderId": self._next_order_id,
+            "symbol": self.symbol,
+            "clientOrderId": client_order_id,
+            "side": params["side"],
+            "type": order_type,
+            "origQty": quantity,
+            "executedQty": 0.0,
+            "price": price,
+            "stopPrice": stop_price,
+            "avgPrice": 0.0,
+            "reduceOnly": close_position or str(params.get("reduceOnly", "false")).lower() == "true",
+            "closePosition": close_position,
+            "timeInForce": params.get("timeInForce", "GTC"),
+            "status": "NEW",
+            "activeAt": self.now + self.latency_ms,
+            "updateTime": self.now,
+        }
+        self._next_order_id += 1
+        self.orders[order["orderId"]] = order
+        self.client_order_ids[client_order_id] = order["orderId"]
+        self.open_order_ids.append(order["orderId"])
+        self._emit_order_update(order, "NEW")
+
+        if self.latency_ms == 0:
+            self._try_fill_now(order)
+        return self._order_response(order)
+
+    def _handle_batch_orders(self, params: dict):
+        orders = json.loads(params["batchOrders"])
+        if len(orders) > 5:
+            raise ValueError("batchOrders tối đa 5 lệnh")
+        results = []
+        for order_params in orders:
+            try:
+                results.append(self._handle_new_order(order_params))
+            except ValueError as e:
+                results.append({"code": -1, "msg": str(e)})
+        return results
+
+    def _handle_query_order(self, params: dict):
+        if "orderId" in params:
+            order = self.orders.get(int(params["orderId"]))
+        else:
+            order = self.orders.get(self.client_order_ids.get(params.get("origClientOrderId"), -1))
+        if order is None:
+            raise ValueError(f"Order {params.get('orderId', params.get('origClientOrderId'))} không tồn tại")
+        return self._order_response(order)
+
+    def _handle_cancel_order(self, params: dict):
+        order = self.orders.get(int(params["orderId"]))
+        if order is None:
+            raise ValueError(f"Order {params['orderId']} không tồn tại")
+        if order["status"] in FINAL_STATUSES:
+            raise ValueError(f"Order {order['orderId']} đã ở trạng thái {order['status']}")
+        self._finish(order, "CANCELED")
+        return self._order_response(order)
+
+    @staticmethod
+    def _order_response(order: Dict) -> Dict:
+        response = {k: v for k, v in order.items() if k != "activeAt"}
+        for key in ("origQty", "executedQty", "price", "stopPrice", "avgPrice"):
+            response[key] = f"{order[key]:.8f}"
+        response["cumQuote"] = f"{order['executedQty'] * order['avgPrice']:.8f}"
+        return response
+
+    def _finish(self, order: Dict, status: str):
+        order["status"] = status
+        order["updateTime"] = self.now
+        if order["orderId"] in self.open_order_ids:
+            self.open_order_ids.remove(order["orderId"])
+        self._emit_order_update(order, "TRADE" if status == "FILLED" else status)
+
+    # ========== SỰ KIỆN USER-DATA STREAM ==========
+
+    def _emit_order_update(self, order: Dict, execution_type: str):
+        if self.user_stream is None:
+            return
+        filled = execution_type == "TRADE"
+        self.user_stream.push({
+            "e": "ORDER_TRADE_UPDATE",
+            "E": self.now,
+            "T": self.now,
+            "o": {
+                "s": order["symbol"], "c": order["clientOrderId"], "S": order["side"], "o": order["type"],
+                "f": order["timeInForce"], "q": f"{order['origQty']:.8f}", "p": f"{order['price']:.8f}",
+                "ap": f"{order['avgPrice']:.8f}", "sp": f"{order['stopPrice']:.8f}", "x": execution_type,
+                "X": order["status"], "i": order["orderId"],
+                "l": f"{order['executedQty'] if filled else 0.0:.8f}", "z": f"{order['executedQty']:.8f}",
+                "L": f"{order['avgPrice'] if filled else 0.0:.8f}", "T": order["updateTime"],
+                "R": order["reduceOnly"], "ps": "BOTH",
+            },
+        })
+
+    def _emit_account_update(self, reason: str):
+        if self.user_stream is None:
+            return
+        self.user_stream.push({
+            "e": "ACCOUNT_UPDATE",
+            "E": self.now,
+            "T": self.now,
+            "a": {
+                "m": reason,
+                "B": [{"a": "USDT", "wb": f"{self.wallet_balance:.8f}", "cw": f"{self.wallet_balance:.8f}", "bc": "0"}],
+                "P": [{
+                    "s": self.symbol, "pa": f"{self.position_amt:.8f}", "ep": f"{self.entry_price:.8f}",
+                    "up": f"{self.unrealized_pnl():.8f}", "iw": f"{self.position_margin() if self.margin_type == 'ISOLATED' else 0.0:.8f}",
+                    "mt": "cross" if self.margin_type == "CROSSED" else "isolated", "ps": "BOTH",
+                }],
+            },
+        })
+
+    def _try_fill_now(self, order: Dict):
+        """Lệnh vừa đặt (không có độ trễ): khớp ở giá close hiện tại nếu điều kiện thỏa."""
+        price = self.mark_price
+        buy = order["side"] == "BUY"
+        if order["type"] == "MARKET":
+            self._fill(order, price, taker=True)
+        elif order["type"] == "LIMIT" and ((buy and order["price"] >= price) or (not buy and order["price"] <= price)):
+            self._fill(order, price, taker=True)
+        elif order["type"] != "LIMIT" and self._stop_triggered(order, price, price):
+            self._fill(order, price, taker=True)
+
+    def _stop_triggered(self, order: Dict, high: float, low: float) -> bool:
+        stop = order["stopPrice"]
+        buy = order["side"] == "BUY"
+        # STOP_MARKET mua/TAKE_PROFIT_MARKET bán kích hoạt khi giá lên tới stop, ngược lại khi giá xuống tới stop
+        rising = buy if order["type"] == "STOP_MARKET" else not buy
+        return high >= stop if rising else low <= stop
+
+    def _process_open_orders(self):
+        i = self.index
+        open_, high, low = float(self.open[i]), float(self.high[i]), float(self.low[i])
+        bar_start = int(self.timestamps[i])
+        for order_id in list(self.open_order_ids):
+            order = self.orders[order_id]
+            if order["activeAt"] > bar_start + self.interval_ms - 1:
+                continue  # Chưa tới sàn
+            buy = order["side"] == "BUY"
+            if order["type"] == "MARKET":
+                self._fill(order, open_, taker=True)
+            elif order["type"] == "LIMIT":
+                limit = order["price"]
+                if buy and low <= limit:
+                    self._fill(order, min(limit, open_), taker=open_ < limit)
+                elif not buy and high >= limit:
+                    self._fill(order, max(limit, open_), taker=open_ > limit)
+            elif self._stop_triggered(order, high, low):
+                # Nến mở cửa đã vượt qua stop (gap) thì khớp ở giá open
+                gapped = self._stop_triggered(order, open_, open_)
+                self._fill(order, open_ if gapped else order["stopPrice"], taker=True)
+
+    def _fill(self, order: Dict, price: float, taker: bool):
+        quantity = abs(self.position_amt) if order["closePosition"] else order["origQty"] - order["executedQty"]
+        signed = quantity if order["side"] == "BUY" else -quantity
+
+        if order["reduceOnly"]:
+            if self.position_amt == 0 or np.sign(signed) == np.sign(self.position_amt):
+                logging.info(f"[SimExchange] Lệnh reduceOnly {order['orderId']} bị từ chối (không có vị thế để giảm)")
+                self._finish(order, "EXPIRED")
+                return
+            signed = float(np.sign(signed)) * min(abs(signed), abs(self.position_amt))
+
+        if taker and order["type"] != "LIMIT":
+            price *= (1 + self.slippage) if signed > 0 else (1 - self.slippage)
+
+        opening = abs(signed) if self.position_amt == 0 or np.sign(signed) == np.sign(self.position_amt) \
+            else max(0.0, abs(signed) - abs(self.position_amt))
+        if opening > 0 and opening * price / self.leverage > self.available_balance() + 1e-12:
+            logging.info(f"[SimExchange] Lệnh {order['orderId']} bị từ chối: không đủ margin")
+            self._finish(order, "REJECTED")
+            return
+
+        fee = abs(signed) * price * (self.taker_fee if taker else self.maker_fee)
+        realized = self._apply_fill(signed, price)
+        self.wallet_balance += realized - fee
+        self.total_fees += fee
+
+        order["executedQty"] += abs(signed)
+        order["avgPrice"] = price
+        self._emit_account_update("ORDER")
+        self._finish(order, "FILLED")
+        self.fills.append({
+            "time": self.now, "index": self.index, "orderId": order["orderId"], "side": order["side"],
+            "type": order["type"], "qty": abs(signed), "price": price, "fee": fee, "realized_pnl": realized,
+        })
+
+    def _apply_fill(self, signed: float, price: float) -> float:
+        """Cập nhật vị thế theo lượng khớp (có dấu), trả về PnL đã thực hiện."""
+        amt = self.position_amt
+        if amt == 0 or np.sign(signed) == np.sign(amt):
+            new_amt = amt + signed
+            self.entry_price = (amt * self.entry_price + signed * price) / new_amt
+            self.position_amt = new_amt
+            return 0.0
+        closed = min(abs(signed), abs(amt))
+        realized = closed * (price - self.entry_price) * np.sign(amt)
+        new_amt = amt + signed
+        if abs(new_amt) < 1e-12:
+            self.position_amt, self.entry_price = 0.0, 0.0
+        elif np.sign(new_amt) != np.sign(amt):
+            self.position_amt, self.entry_price = new_amt, price  # Đảo chiều: phần dư mở vị thế mới
+        else:
+            self.position_amt = new_amt
+        return float(realized)
+
+    def _check_liquidation(self):
+        if self.position_amt == 0:
+            return
+        liq = self.liquidation_price()
+        i = self.index
+        hit = self.low[i] <= liq if self.position_amt > 0 else self.high[i] >= liq
+        if not hit:
+            return
+        qty = abs(self.position_amt)
+        side_long = self.position_amt > 0
+        realized = self._apply_fill(-self.position_amt, liq)
+        fee = qty * liq * self.taker_fee
+        self.wallet_balance = max(0.0, self.wallet_balance + realized - fee)
+        self.total_fees += fee
+        self.liquidations += 1
+        self._emit_account_update("ORDER")
+        # Sàn hủy toàn bộ lệnh chờ khi thanh lý
+        for order_id in list(self.open_order_ids):
+            self._finish(self.orders[order_id], "CANCELED")
+        self.fills.append({
+            "time": self.now, "index": i, "orderId": None, "side": "SELL" if side_long else "BUY",
+            "type": "LIQUIDATION", "qty": qty, "price": liq, "fee": fee, "realized_pnl": realized,
+        })
+        logging.warning(f"[SimExchange] Vị thế {self.symbol} bị thanh lý tại {liq:.2f}")
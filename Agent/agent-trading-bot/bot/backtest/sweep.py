@@ -0,0 +1,293 @@
+import importlib
+import itertools
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from backtest.exit_simulator import run_exit_backtest
+from backtest.vectorized import run_backtest, to_arrays
+from data.indicator_kernels import ema_2d
+
+# Tham số thuộc về backtest, không truyền vào constructor của strategy
+BACKTEST_PARAMS = ("leverage", "fee_rate", "slippage")
+# Có stop_loss_pct/take_profit_pct thì cấu hình chạy qua run_exit_backtest (ExitSimulator)
+EXIT_PARAMS = ("stop_loss_pct", "take_profit_pct", "max_holding", "ambiguity")
+
+
+# ========== SHARED MEMORY ==========
+
+class SharedArrays:
+    """
+    Đặt các mảng nến/chỉ báo vào shared memory một lần; worker chỉ nhận `spec`
+    (tên block, shape, dtype) và tạo view NumPy trên cùng vùng nhớ, không pickle/copy dữ liệu.
+    Dùng như context manager để giải phóng block khi xong.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.spec: Dict[str, Tuple[str, Tuple[int, ...], str]] = {}
+        for name, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[...] = values
+            self._blocks.append(block)
+            self.spec[name] = (block.name, values.shape, values.dtype.str)
+
+    @staticmethod
+    def attach(spec: Dict[str, Tuple[str, Tuple[int, ...], str]]):
+        """Mở lại các block từ spec, trả về (dict view, danh sách block cần giữ tham chiếu)."""
+        blocks, arrays = [], {}
+        for name, (block_name, shape, dtype) in spec.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        return arrays, blocks
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ema_arrays(close: np.ndarray, periods: Iterable[int]) -> Dict[str, np.ndarray]:
+    """Tính sẵn ema_N cho mọi chu kỳ trong không gian tìm kiếm (EmaCrossoverStrategy dùng lại)."""
+    close = np.asarray(close, dtype=np.float64)[None, :]
+    return {f"ema_{p}": ema_2d(close, p)[0] for p in sorted(set(int(p) for p in periods))}
+
+
+# ========== KHÔNG GIAN TÌM KIẾM ==========
+
+def grid(space: Dict[str, Sequence]) -> List[Dict[str, Any]]:
+    """Mọi tổ hợp của các danh sách giá trị."""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def _sample(spec, rng: np.random.Generator):
+    if isinstance(spec, tuple) and len(spec) == 2:
+        low, high = spec
+        if isinstance(low, int) and isinstance(high, int):
+            return int(rng.integers(low, high + 1))
+        return float(rng.uniform(low, high))
+    return spec[int(rng.integers(len(spec)))]
+
+
+def random_search(space: Dict[str, Union[Sequence, Tuple]], n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    n cấu hình ngẫu nhiên. Mỗi tham số là list (chọn một giá trị) hoặc tuple (low, high)
+    (int -> số nguyên trong [low, high], float -> phân phối đều).
+    """
+    rng = np.random.default_rng(seed)
+    return [{k: _sample(v, rng) for k, v in space.items()} for _ in range(n)]
+
+
+def _perturb(params: Dict[str, Any], space: Dict[str, Any], rng: np.random.Generator, scale: float) -> Dict[str, Any]:
+    out = {}
+    for key, spec in space.items():
+        value = params[key]
+        if isinstance(spec, tuple) and len(spec) == 2:
+            low, high = spec
+            step = (high - low) * scale
+            new = value + rng.normal(0, step)
+            new = min(max(new, low), high)
+            out[key] = int(round(new)) if isinstance(low, int) and isinstance(high, int) else float(new)
+        else:
+            options = list(spec)
+            i = options.index(value) + int(rng.integers(-1, 2))
+            out[key] = options[min(max(i, 0), len(options) - 1)]
+    return out
+
+
+# ========== WORKER ==========
+
+_WORKER_ARRAYS: Dict[str, np.ndarray] = {}
+_WORKER_BLOCKS: List[shared_memory.SharedMemory] = []
+
+
+def _init_worker(spec):
+    global _WORKER_ARRAYS, _WORKER_BLOCKS
+    _WORKER_ARRAYS, _WORKER_BLOCKS = SharedArrays.attach(spec)
+
+
+def _resolve(strategy_cls):
+    if isinstance(strategy_cls, str):
+        module, _, name = strategy_cls.partition(":")
+        return getattr(importlib.import_module(module), name)
+    return strategy_cls
+
+
+def _evaluate(task) -> Dict[str, Any]:
+    strategy_cls, params, end, interval, defaults = task
+    arrays = _WORKER_ARRAYS if end is None else {k: v[:end] for k, v in _WORKER_ARRAYS.items()}
+    strategy_params = {k: v for k, v in params.items() if k not in BACKTEST_PARAMS + EXIT_PARAMS}
+    backtest_params = dict(defaults)
+    backtest_params.update({k: v for k, v in params.items() if k in BACKTEST_PARAMS + EXIT_PARAMS})
+    with_exits = "stop_loss_pct" in backtest_params or "take_profit_pct" in backtest_params
+    try:
+        strategy = _resolve(strategy_cls)(**strategy_params)
+        runner = run_exit_backtest if with_exits else run_backtest
+        stats = runner(strategy, arrays, interval=interval, **backtest_params).stats
+    except Exception as e:
+        return {"params": params, "error": str(e)}
+    return {"params": params, "stats": stats}
+
+
+# ========== SWEEP ==========
+
+class ParameterSweep:
+    """
+    Chạy nhiều cấu hình strategy song song trên process pool, dữ liệu nằm trong shared memory.
+
+    Dừng sớm cấu hình kém: vòng đầu chạy trên `stage_fraction` đầu của lịch sử; cấu hình có
+    max_drawdown tệ hơn `max_drawdown_limit` hoặc không nằm trong `keep_fraction` tốt nhất
+    bị loại, chỉ cấu hình còn lại mới chạy trên toàn bộ lịch sử. Kết quả vòng đầu nằm ở các cột
+    `stage1_*`; cột metric chính chỉ có giá trị với cấu hình chạy hết lịch sử.
+
+    SL/TP/leverage (ví dụ theo các profile của StrategyData) quét như tham số thường: cấu hình có
+    stop_loss_pct hoặc take_profit_pct chạy qua run_exit_backtest (thoát lệnh trong nến bằng ExitSimulator).
+
+    Ví dụ:
+        sweep = ParameterSweep("strategy.EMA_crossover:EmaCrossoverStrategy", df)
+        table = sweep.run(grid({"short_period": [5, 8, 12], "long_period": [21, 26, 50]}), output_path="sweep.csv")
+    """
+
+    def __init__(
+        self,
+        strategy_cls,
+        data,
+        indicators: Optional[Dict[str, np.ndarray]] = None,
+        interval: str = "1m",
+        n_workers: int = 4,
+        metric: str = "total_return",
+        stage_fraction: float = 0.25,
+        keep_fraction: float = 0.5,
+        max_drawdown_limit: float = -0.5,
+        **backtest_defaults
+    ):
+        self.strategy_cls = strategy_cls
+        self.arrays = to_arrays(data)
+        if indicators:
+            self.arrays.update(indicators)
+        self.interval = interval
+        self.n_workers = n_workers
+        self.metric = metric
+        self.stage_fraction = stage_fraction
+        self.keep_fraction = keep_fraction
+        self.max_drawdown_limit = max_drawdown_limit
+        self.backtest_defaults = backtest_defaults
+        self.logger = logging.getLogger("ParameterSweep")
+
+    def _map(self, pool, configs: List[Dict], end: Optional[int]) -> List[Dict]:
+        tasks = [(self.strategy_cls, params, end, self.interval, self.backtest_defaults) for params in configs]
+        chunksize = max(1, len(tasks) // (self.n_workers * 4))
+        return list(pool.map(_evaluate, tasks, chunksize=chunksize))
+
+    def _survivors(self, results: List[Dict]) -> List[Dict]:
+        ok = [r for r in results if "stats" in r and r["stats"]["max_drawdown"] >= self.max_drawdown_limit]
+        ok.sort(key=lambda r: r["stats"][self.metric], reverse=True)
+        keep = max(1, int(np.ceil(len(ok) * self.keep_fraction))) if ok else 0
+        return ok[:keep]
+
+    def _evaluate_configs(self, pool, configs: List[Dict]) -> List[Dict]:
+        n_bars = len(self.arrays["close"])
+        rows: List[Dict] = []
+        if 0 < self.stage_fraction < 1 and len(configs) > 1:
+            end = int(n_bars * self.stage_fraction)
+            first = self._map(pool, configs, end)
+            survivors = self._survivors(first)
+            kept = {id(r) for r in survivors}
+            for r in first:
+                if id(r) not in kept:
+                    rows.append(self._row(r, stage="pruned", first=r))
+            configs = [r["params"] for r in survivors]
+            self.logger.info(f"[Sweep] Vòng đầu ({end} nến): giữ {len(configs)}/{len(first)} cấu hình")
+        else:
+            survivors = [None] * len(configs)
+        for stage1, r in zip(survivors, self._map(pool, configs, None)):
+            rows.append(self._row(r, stage="full", first=stage1))
+        return rows
+
+    @staticmethod
+    def _row(result: Dict, stage: str, first: Optional[Dict] = None) -> Dict:
+        """
+        Một dòng bảng kết quả. Stats vòng đầu (chỉ một phần lịch sử) ghi vào cột `stage1_*`,
+        nên dòng bị loại không có giá trị ở các cột của lần chạy đầy đủ.
+        """
+        row = dict(result["params"])
+        if first is not None and "stats" in first:
+            row.update({f"stage1_{k}": v for k, v in first["stats"].items() if k != "strategy"})
+        if "stats" not in result:
+            row["stage"] = "error"
+            row["error"] = result["error"]
+            return row
+        row["stage"] = stage
+        if stage != "pruned":
+            row.update({k: v for k, v in result["stats"].items() if k != "strategy"})
+        return row
+
+    def run(self, configs: List[Dict[str, Any]], output_path: Optional[str] = None) -> pd.DataFrame:
+        """Đánh giá danh sách cấu hình (grid/random_search), trả về bảng xếp hạng theo metric."""
+        started = time.perf_counter()
+        with SharedArrays(self.arrays) as shared:
+            with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker, initargs=(shared.spec,)) as pool:
+                rows = self._evaluate_configs(pool, configs)
+        table = self._rank(rows, output_path)
+        self.logger.info(f"[Sweep] {len(configs)} cấu hình trong {time.perf_counter() - started:.2f}s")
+        return table
+
+    def run_adaptive(self, space: Dict[str, Any], n_initial: int = 32, n_rounds: int = 3, per_round: int = 16,
+                     top_k: int = 4, seed: int = 0, output_path: Optional[str] = None) -> pd.DataFrame:
+        """
+        Tìm kiếm thích nghi: vòng đầu random_search, các vòng sau lấy mẫu quanh top_k cấu hình
+        tốt nhất với bước thu hẹp dần. Pool và shared memory dùng chung cho mọi vòng.
+        """
+        rng = np.random.default_rng(seed)
+        rows: List[Dict] = []
+        seen = set()
+        configs = random_search(space, n_initial, seed)
+        with SharedArrays(self.arrays) as shared:
+            with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker, initargs=(shared.spec,)) as pool:
+                for round_no in range(n_rounds + 1):
+                    configs = [c for c in configs if tuple(sorted(c.items())) not in seen]
+                    seen.update(tuple(sorted(c.items())) for c in configs)
+                    if not configs:
+                        break
+                    rows.extend(self._evaluate_configs(pool, configs))
+                    if round_no == n_rounds:
+                        break
+                    best = [r for r in rows if r["stage"] == "full"]
+                    best.sort(key=lambda r: r[self.metric], reverse=True)
+                    parents = [{k: r[k] for k in space} for r in best[:top_k]]
+                    if not parents:
+                        break
+                    scale = 0.2 / (round_no + 1)
+                    configs = [_perturb(parents[i % len(parents)], space, rng, scale) for i in range(per_round)]
+        return self._rank(rows, output_path)
+
+    def _rank(self, rows: List[Dict], output_path: Optional[str]) -> pd.DataFrame:
+        table = pd.DataFrame(rows)
+        if table.empty:
+            return table
+        full = table["stage"] == "full"
+        ranked = table[full].sort_values(self.metric, ascending=False) if self.metric in table else table[full]
+        table = pd.concat([
+            ranked,
+            table[~full],
+        ]).reset_index(drop=True)
+        table.insert(0, "rank", np.where(table["stage"] == "full", np.arange(1, len(table) + 1), np.nan))
+        if output_path:
+            table.to_csv(output_path, index=False)
+            self.logger.info(f"[Sweep] Đã ghi bảng kết quả vào {output_path}")
+        return table
@@ -0,0 +1,186 @@
+import logging
+import time
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from strategy.base_strategy import BaseStrategy
+
+BARS_PER_YEAR = {"1m": 525600, "5m": 105120, "15m": 35040, "1h": 8760, "4h": 2190, "1d": 365}
+
+
+def to_arrays(data: Union[pd.DataFrame, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """DataFrame (collector/candle_store) hoặc dict cột (kline_parser) -> dict mảng float64."""
+    if isinstance(data, pd.DataFrame):
+        arrays = {col: data[col].to_numpy(dtype=np.float64) for col in ("open", "high", "low", "close", "volume") if col in data}
+        if "timestamp" in data:
+            arrays["timestamp"] = data["timestamp"].to_numpy(dtype=np.int64)
+        else:
+            arrays["timestamp"] = data.index.to_numpy().astype("datetime64[ms]").astype(np.int64)
+        return arrays
+    return {key: np.asarray(values) for key, values in data.items()}
+
+
+def resolve_positions(
+    entry_long: np.ndarray,
+    entry_short: np.ndarray,
+    exit_long: np.ndarray,
+    exit_short: np.ndarray
+) -> np.ndarray:
+    """
+    Vị thế (+1 long, -1 short, 0 không có) sau mỗi nến, cùng máy trạng thái với bot:
+    chưa có vị thế thì xét entry, đang có vị thế thì chỉ xét exit của chiều đó (mỗi nến một hành động).
+    Chỉ lặp qua các nến có tín hiệu (thường rất thưa), phần còn lại forward-fill bằng NumPy.
+    """
+    n = len(entry_long)
+    events = np.flatnonzero(entry_long | entry_short | exit_long | exit_short)
+    change_at = np.empty(len(events), dtype=np.int64)
+    change_to = np.empty(len(events), dtype=np.int8)
+    count = 0
+    pos = 0
+    for i in events:
+        if pos == 0:
+            new = 1 if entry_long[i] else (-1 if entry_short[i] else 0)
+        elif (pos == 1 and exit_long[i]) or (pos == -1 and exit_short[i]):
+            new = 0
+        else:
+            continue
+        if new != pos:
+            change_at[count] = i
+            change_to[count] = new
+            count += 1
+            pos = new
+
+    positions = np.zeros(n, dtype=np.int8)
+    if count:
+        marker = np.full(n, -1, dtype=np.int64)
+        marker[change_at[:count]] = np.arange(count)
+        last = np.maximum.accumulate(marker)
+        filled = last >= 0
+        positions[filled] = change_to[:count][last[filled]]
+    return positions
+
+
+class BacktestResult:
+    """Kết quả backtest: đường equity, vị thế theo nến, bảng lệnh và thống kê tổng hợp."""
+
+    def __init__(self, name: str, timestamps: np.ndarray, equity: np.ndarray, positions: np.ndarray,
+                 returns: np.ndarray, fees: np.ndarray, trades: pd.DataFrame, interval: str, elapsed: float):
+        self.name = name
+        self.timestamps = timestamps
+        self.equity = equity
+        self.positions = positions
+        self.returns = returns
+        self.fees = fees
+        self.trades = trades
+        self.interval = interval
+        self.elapsed = elapsed
+        peak = np.maximum.accumulate(equity)
+        self.drawdown = equity / peak - 1
+        self.stats = self._stats()
+
+    def _stats(self) -> Dict:
+        n_trades = len(self.trades)
+        bars_per_year = BARS_PER_YEAR.get(self.interval, 0)
+        std = float(self.returns.std())
+        sharpe = float(self.returns.mean() / std * np.sqrt(bars_per_year)) if std > 0 and bars_per_year else 0.0
+        return {
+            "strategy": self.name,
+            "bars": len(self.equity),
+            "total_return": float(self.equity[-1] / self.equity[0] - 1) if len(self.equity) else 0.0,
+            "max_drawdown": float(self.drawdown.min()) if len(self.drawdown) else 0.0,
+            "sharpe": sharpe,
+            "trades": n_trades,
+            "win_rate": float((self.trades["pnl_pct"] > 0).mean()) if n_trades else 0.0,
+            "total_fees": float(self.fees.sum()),
+            "exposure": float((self.positions != 0).mean()) if len(self.positions) else 0.0,
+            "elapsed_sec": self.elapsed,
+        }
+
+    def equity_curve(self) -> pd.Series:
+        index = pd.to_datetime(self.timestamps, unit="ms") if self.timestamps is not None else None
+        return pd.Series(self.equity, index=index, name=self.name)
+
+
+def _extract_trades(positions: np.ndarray, close: np.ndarray, timestamps: Optional[np.ndarray],
+                    leverage: float, fee_rate: float) -> pd.DataFrame:
+    """Ghép các đoạn vị thế liên tục thành bảng lệnh (vào/ra tại giá đóng cửa của nến tín hiệu)."""
+    n = len(positions)
+    changes = np.flatnonzero(np.diff(positions, prepend=0) != 0)
+    sides = positions[changes]
+    entries = changes[sides != 0]
+    if len(entries) == 0:
+        return pd.DataFrame(columns=["side", "entry_index", "exit_index", "entry_price", "exit_price", "bars", "pnl_pct", "open"])
+    # Lệnh kết thúc ở lần đổi vị thế kế tiếp, hoặc nến cuối nếu vẫn đang mở
+    following = np.searchsorted(changes, entries, side="right")
+    exits = np.where(following < len(changes), changes[np.minimum(following, len(changes) - 1)], n - 1)
+    side = positions[entries].astype(np.float64)
+    entry_price = close[entries]
+    exit_price = close[exits]
+    pnl_pct = side * (exit_price / entry_price - 1) * leverage - 2 * fee_rate * leverage
+    trades = pd.DataFrame({
+        "side": np.where(side > 0, "long", "short"),
+        "entry_index": entries,
+        "exit_index": exits,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "bars": exits - entries,
+        "pnl_pct": pnl_pct,
+        "open": following >= len(changes),
+    })
+    if timestamps is not None:
+        trades["entry_time"] = pd.to_datetime(timestamps[entries], unit="ms")
+        trades["exit_time"] = pd.to_datetime(timestamps[exits], unit="ms")
+    return trades
+
+
+def run_backtest(
+    strategy: BaseStrategy,
+    data: Union[pd.DataFrame, Dict[str, np.ndarray]],
+    fee_rate: float = 0.0004,
+    slippage: float = 0.0,
+    leverage: float = 1.0,
+    initial_capital: float = 1000.0,
+    interval: str = "1m",
+    name: Optional[str] = None
+) -> BacktestResult:
+    """
+    Backtest một strategy trên toàn bộ lịch sử bằng các phép tính mảng.
+
+    Tín hiệu đánh giá tại giá đóng cửa nến i, vị thế có hiệu lực từ nến i+1.
+    Phí (fee_rate + slippage, tính trên notional) trừ mỗi lần vị thế thay đổi;
+    đảo chiều trực tiếp tính phí hai lần. Lợi nhuận nhân đòn bẩy và cộng dồn kép vào equity.
+    """
+    started = time.perf_counter()
+    arrays = to_arrays(data)
+    close = np.asarray(arrays["close"], dtype=np.float64)
+    signals = strategy.vectorized_signals(arrays)
+    positions = resolve_positions(signals["entry_long"], signals["entry_short"], signals["exit_long"], signals["exit_short"])
+
+    held = np.empty(len(close), dtype=np.float64)
+    held[0] = 0.0
+    held[1:] = positions[:-1]
+    bar_returns = np.zeros(len(close))
+    bar_returns[1:] = close[1:] / close[:-1] - 1
+    turnover = np.abs(np.diff(positions.astype(np.float64), prepend=0.0))
+    fees = turnover * (fee_rate + slippage) * leverage
+    returns = held * bar_returns * leverage - fees
+    # Không để equity âm (tương đương cháy tài khoản)
+    equity = initial_capital * np.cumprod(np.maximum(1 + returns, 0.0))
+
+    timestamps = arrays.get("timestamp")
+    trades = _extract_trades(positions, close, timestamps, leverage, fee_rate + slippage)
+    result = BacktestResult(
+        name or type(strategy).__name__, timestamps, equity, positions, returns,
+        fees * np.r_[initial_capital, equity[:-1]], trades, interval, time.perf_counter() - started
+    )
+    logging.info(f"[Backtest] {result.name}: {result.stats}")
+    return result
+
+
+def run_many(strategies: Dict[str, BaseStrategy], data, **kwargs) -> pd.DataFrame:
+    """Chạy nhiều strategy trên cùng dữ liệu, trả về bảng thống kê sắp theo total_return."""
+    arrays = to_arrays(data)
+    rows = [run_backtest(strategy, arrays, name=name, **kwargs).stats for name, strategy in strategies.items()]
+    return pd.DataFrame(rows).sort_values("total_return", ascending=False).reset_index(drop=True)
@@ -2,52 +2,104 @@ import time
 import logging
 from datetime import datetime
 
-from core.exchange_api import ExchangeAPI
+from core.exchange_api import BinanceAPI
 from core.position_manager import PositionManager
 from core.order_executor import OrderExecutor
+from core.order_tracker import OrderTracker
+from core.exchange_info import ExchangeInfoCache
+from core.user_stream import UserDataStream
+from core.account_cache import AccountStateCache
 from core.risk_manager import RiskManager
-from model.predictor import Predictor
-from strategy.base_strategy import StrategySelector  # Có thể là AI hoặc rules
-from memory_manager import MemoryManager  # Nơi bạn lưu giao dịch (pickle, JSON, DB)
+from core.memory_manager import MemoryManager
+from core.metrics import default_metrics
+from data.collector import BinanceFuturesCollector
+from data.candle_store import CandleStore
+from data.indicator_cache import default_indicator_cache
+from strategy.base_strategy import StrategySelector
 
 class TradingBot:
-    def __init__(self, config):
+    def __init__(self, config, api=None, candle_source=None, user_stream=None, predictor=None, strategy_selector=None):
         """
-        :param config: Dict chứa config cơ bản như symbol, quantity, leverage...
+        :param config: Dict chứa config cơ bản như symbol, quantity, api_key, api_secret...
+        :param api: client sàn dùng thay cho BinanceAPI (ví dụ backtest.sim_exchange.SimulatedExchange)
+        :param candle_source: nguồn nến có get_historical_dataframe thay cho collector REST; mặc định là
+            chính `api` nếu nó cung cấp nến (SimulatedExchange), để backtest không đọc nến thật
+        :param user_stream: user-data stream dùng chung cho cache tài khoản và theo dõi lệnh; mặc định tạo UserDataStream
+            khi dùng sàn thật (config "user_stream": False để tắt), không tạo khi `api` được truyền vào
+        :param predictor: đối tượng có predict_action(df, symbol=..., interval=...); mặc định model.predictor.Predictor
+            (cần torch và file checkpoint config "model_path")
+        :param strategy_selector: mặc định StrategySelector() (gợi ý của model, không kèm strategy luật)
         """
         self.symbol = config["symbol"]
         self.quantity = config["quantity"]
         self.interval = config.get("interval", "5m")
+        # Xuất metric tầng sàn (Prometheus): HTTP /metrics và/hoặc file cho textfile collector
+        self.metrics_port = config.get("metrics_port")
+        self.metrics_path = config.get("metrics_path")
 
         # Khởi tạo các thành phần
-        self.api = ExchangeAPI(config)
-        self.memory = MemoryManager()
-        self.executor = OrderExecutor(self.api)
-        self.position_manager = PositionManager(self.api, self.executor)
-        self.risk_manager = RiskManager()
-        self.strategy_selector = StrategySelector()
-        self.model_predictor = Predictor()
+        self.api = api or BinanceAPI(config["api_key"], config["api_secret"], base_url=config.get("base_url"))
+        # Backtest (api truyền vào) chỉ giữ log giao dịch trong bộ nhớ
+        self.memory = MemoryManager(config.get("memory_path", "memory.jsonl") if api is None else None)
+        if user_stream is None and api is None and config.get("user_stream", True):
+            user_stream = UserDataStream(self.api.api_key, transport=self.api.transport)
+        self.user_stream = user_stream
+        # Vị thế/tài khoản đọc từ bộ nhớ, cập nhật bằng sự kiện stream thay vì gọi REST mỗi chu kỳ
+        self.account_cache = None
+        if self.user_stream is not None:
+            self.account_cache = AccountStateCache(self.api, user_stream=self.user_stream)
+            self.api.attach_account_cache(self.account_cache)
+        # stepSize/tickSize của mọi symbol lưu trên đĩa, khởi động lại không phải tải exchangeInfo
+        self.exchange_info = ExchangeInfoCache(
+            self.api, cache_path=config.get("exchange_info_path", "exchange_info.json") if api is None else None
+        )
+        # Cùng một stream: lệnh khớp/hủy báo qua ORDER_TRADE_UPDATE thay vì poll REST
+        self.executor = OrderExecutor(
+            self.api, exchange_info=self.exchange_info,
+            tracker=OrderTracker(self.api, user_stream=self.user_stream)
+        )
+        self.position_manager = PositionManager(self.api, self.symbol)
+        self.risk_manager = RiskManager(max_range_pct=config.get("max_range_pct"))
+        self.strategy_selector = strategy_selector or StrategySelector()
+        self.indicator_cache = default_indicator_cache
+        if predictor is None:
+            from model.predictor import Predictor  # torch chỉ cần khi dùng model thật
+            predictor = Predictor(config.get("model_path", "model_checkpoint.pt"), indicator_cache=self.indicator_cache)
+        self.model_predictor = predictor
+        # Nến lịch sử được cache trên đĩa, mỗi chu kỳ chỉ tải phần nến mới
+        if candle_source is None and hasattr(api, "get_historical_dataframe"):
+            candle_source = api
+        self.collector = candle_source or BinanceFuturesCollector(
+            self.symbol, self.interval,
+            store=CandleStore(config.get("candle_store_dir", "candle_store"))
+        )
         
         self.current_position = None
 
-    def get_market_snapshot(self):
-        candles = self.api.get_candles(self.symbol, self.interval, limit=50)
-        if not candles:
+    def get_market_snapshot(self, end_time=None):
+        df = self.collector.get_historical_dataframe(limit=50, end_time=end_time, with_indicators=False)
+        if df.empty:
             logging.warning("Không lấy được dữ liệu nến.")
             return None
-        indicators = self.api.compute_indicators(candles)  # Nếu có indicators.py
+        candles = df.reset_index().to_dict("records")
+        # Dùng chung cache với Predictor nên cùng nến chỉ tính chỉ báo một lần
+        indicators = self.indicator_cache.get(df, self.symbol, self.interval)
         return {
             "candles": candles,
-            "indicators": indicators
+            "indicators": indicators,
+            "frame": df
         }
 
     def decide_action(self, market_snapshot):
         """
         Trả về hành động dựa trên AI hoặc chiến lược.
         """
-        # Lấy dự đoán từ mô hình AI
-        ai_action = self.model_predictor.predict(market_snapshot)
-        base_prompt = f"Dựa trên dữ liệu hiện tại: {market_snapshot}, mô hình gợi ý {ai_action}."
+        # Lấy dự đoán từ mô hình AI; cùng khóa (symbol, interval) nên chỉ báo lấy lại từ cache
+        ai_action = self.model_predictor.predict_action(
+            market_snapshot["frame"], symbol=self.symbol, interval=self.interval
+        )
+        # Chỉ nến cuối: format cả snapshot (DataFrame chỉ báo) mỗi chu kỳ tốn hơn cả phần còn lại của run_once
+        base_prompt = f"Dựa trên nến cuối: {market_snapshot['candles'][-1]}, mô hình gợi ý {ai_action}."
 
         # Chiến lược chọn giữa AI và rule
         strategy = self.strategy_selector.select_strategy(base_prompt, ai_action, market_snapshot)
@@ -75,30 +127,34 @@ class TradingBot:
             return False
         return True
 
-    def execute_trade(self, action):
+    def execute_trade(self, action, reference_price=None):
         """
-        Thực hiện giao dịch thực tế dựa vào hành động đã quyết định
+        Thực hiện giao dịch thực tế dựa vào hành động đã quyết định.
+        Đảo chiều vị thế là một lệnh (một round trip) thay vì đóng rồi mở.
+        reference_price: giá đóng cửa gần nhất, để lệnh MARKET dưới MIN_NOTIONAL bị chặn trước khi gửi.
         """
-        if action == "BUY":
-            if self.current_position == "long":
-                logging.info("Đã có lệnh long, bỏ qua.")
-                return
-            if self.current_position == "short":
-                self.position_manager.close_position(self.symbol)
-            self.position_manager.open_long(self.symbol, self.quantity)
-            self.current_position = "long"
-
-        elif action == "SELL":
-            if self.current_position == "short":
-                logging.info("Đã có lệnh short, bỏ qua.")
-                return
-            if self.current_position == "long":
-                self.position_manager.close_position(self.symbol)
-            self.position_manager.open_short(self.symbol, self.quantity)
-            self.current_position = "short"
-
-        elif action == "HOLD":
+        if action == "HOLD":
             logging.info("HOLD: Không vào lệnh.")
+            return
+        if action not in ("BUY", "SELL"):
+            return
+
+        target = "long" if action == "BUY" else "short"
+        self.position_manager.update_position()
+        amount = self.position_manager.get_position_amount()
+        held = "long" if amount > 0 else "short" if amount < 0 else None
+        if held == target:
+            logging.info(f"Đã có lệnh {target}, bỏ qua.")
+            return
+
+        if held is not None:
+            order = self.executor.reverse_position(self.symbol, action, amount, self.quantity,
+                                                   reference_price=reference_price)
+        else:
+            order = self.executor.place_order(self.symbol, action, self.quantity, timeout=0,
+                                              reference_price=reference_price)
+        if order:
+            self.current_position = target
 
     def save_trade_log(self, action, strategy, snapshot):
         """
@@ -110,7 +166,8 @@ class TradingBot:
             "strategy": strategy,
             "position": self.current_position,
             "symbol": self.symbol,
-            "snapshot": snapshot
+            # Nến cuối thay cho cả snapshot (DataFrame không ghi được ra JSON)
+            "candle": snapshot["candles"][-1]
         })
 
     def run(self, interval_seconds=300):
@@ -118,22 +175,48 @@ class TradingBot:
         Chạy bot theo chu kỳ liên tục.
         """
         logging.info("Bot bắt đầu chạy...")
-        while True:
-            try:
-                self.current_position = self.api.get_position(self.symbol)
-                snapshot = self.get_market_snapshot()
-                if not snapshot:
-                    continue
-
-                action = self.decide_action(snapshot)
-                logging.info(f"Chiến lược gợi ý: {action}")
-
-                if action != "HOLD" and self.evaluate_risk(snapshot, action):
-                    self.execute_trade(action)
+        self.exchange_info.start_background_refresh()
+        # Đồng bộ đồng hồ sàn trước lệnh đầu tiên, sau đó định kỳ trong nền
+        if getattr(self.api, "signer", None) is not None:
+            self.api.signer.start()
+        if self.metrics_port is not None:
+            default_metrics.start_http_server(self.metrics_port)
+        if self.metrics_path:
+            default_metrics.start_textfile_export(self.metrics_path)
+        if self.user_stream is not None:
+            self.user_stream.start()
+        try:
+            while True:
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logging.error(f"Lỗi trong vòng lặp bot: {e}")
+
+                time.sleep(interval_seconds)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Dừng các kết nối nền (user-data stream, xóa listenKey)."""
+        if self.user_stream is not None:
+            self.user_stream.stop()
+        logging.info("Bot đã dừng.")
+
+    def run_once(self, candle=None):
+        """
+        Một chu kỳ của bot. Tách khỏi run() để vòng lặp backtest (backtest.event_loop)
+        gọi trực tiếp mỗi nến, không phải chờ interval_seconds.
+        candle: nến vừa đóng do vòng lặp backtest truyền vào; snapshot kết thúc đúng ở nến đó.
+        """
+        self.current_position = self.api.get_position(self.symbol)
+        snapshot = self.get_market_snapshot(end_time=candle["timestamp"] if candle else None)
+        if not snapshot:
+            return
 
-                self.save_trade_log(action, action, snapshot)
+        action = self.decide_action(snapshot)
+        logging.info(f"Chiến lược gợi ý: {action}")
 
-            except Exception as e:
-                logging.error(f"Lỗi trong vòng lặp bot: {e}")
+        if action != "HOLD" and self.evaluate_risk(snapshot, action):
+            self.execute_trade(action, reference_price=snapshot["candles"][-1]["close"])
 
-            time.sleep(interval_seconds)
+        self.save_trade_log(action, action, snapshot)
@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from core.user_stream import UserDataStream
+
+# Các trường user-data stream không gửi kèm, hoặc chỉ gửi khi số dư/vị thế đổi (ACCOUNT_UPDATE không tới
+# khi chỉ có mark price thay đổi). Đọc chúng cần snapshot không quá `ttl` giây.
+STREAM_BLIND_FIELDS = (
+    "liquidationPrice", "markPrice", "availableBalance", "maxWithdrawAmount",
+    "unRealizedProfit", "totalUnrealizedProfit", "totalMarginBalance",
+)
+
+
+class AccountStateCache:
+    """
+    Trạng thái tài khoản/vị thế trong bộ nhớ, dùng chung cho BinanceAPI và BinanceFuturesAPI.
+
+    - snapshot: một lần /fapi/v2/account + /fapi/v2/positionRisk (mọi symbol).
+    - Cập nhật đẩy từ UserDataStream: ACCOUNT_UPDATE (số dư, vị thế), ACCOUNT_CONFIG_UPDATE (leverage),
+      ORDER_TRADE_UPDATE khớp lệnh (đánh dấu các trường stream không gửi là cũ).
+    - Không có stream hoặc stream mất kết nối: snapshot lại khi dữ liệu cũ hơn `ttl` giây.
+    - Khi stream hoạt động vẫn snapshot lại sau `max_age` giây để tự sửa sai lệch; riêng các trường
+      STREAM_BLIND_FIELDS (PnL, mark price, margin khả dụng...) đổi theo mark price nên luôn giới hạn `ttl`.
+    - Vị thế lưu theo (symbol, positionSide): hedge mode có hai chân LONG/SHORT, one-way mode là BOTH.
+    - Nhiều luồng cùng thấy dữ liệu cũ chỉ gọi REST một lần (single-flight).
+    Các getter chỉ đọc dict trong bộ nhớ, không gọi REST trừ khi cần snapshot lại.
+    """
+
+    def __init__(self, api, user_stream: Optional[UserDataStream] = None, ttl: float = 5.0, max_age: float = 300.0):
+        self.api = api
+        self.user_stream = user_stream
+        self.ttl = ttl
+        self.max_age = max_age
+        self.account: Dict = {}
+        self.assets: Dict[str, Dict] = {}
+        self.positions: Dict[Tuple[str, str], Dict] = {}
+        self.updated_at = 0.0
+        self._blind_stale = False  # Có sự kiện làm thay đổi trạng thái mà stream không gửi các trường STREAM_BLIND_FIELDS
+        self._events = 0  # Số sự kiện đã áp dụng, để snapshot không xóa cờ cũ của sự kiện tới trong lúc gọi REST
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self.stats = {"snapshots": 0, "events": 0, "reads": 0}
+        self.logger = logging.getLogger("AccountStateCache")
+        if user_stream is not None:
+            user_stream.add_handler(self.on_event)
+            # Kết nối lại thì sự kiện trong lúc mất kết nối đã bị lỡ, chụp lại snapshot
+            user_stream.add_on_connect(self.refresh)
+
+    @staticmethod
+    def _key(symbol: str, position_side: Optional[str] = None) -> Tuple[str, str]:
+        return symbol.upper(), (position_side or "BOTH").upper()
+
+    # ========== SNAPSHOT ==========
+
+    def refresh(self) -> bool:
+        """Chụp snapshot REST toàn bộ tài khoản và vị thế."""
+        with self._refresh_lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> bool:
+        events_before = self._events
+        account = self.api._request("GET", "/fapi/v2/account", signed=True)
+        risks = self.api._request("GET", "/fapi/v2/positionRisk", signed=True)
+        if not account:
+            self.logger.error("[AccountCache] Không lấy được snapshot tài khoản")
+            return False
+        with self._lock:
+            positions: Dict[Tuple[str, str], Dict] = {}
+            for pos in account.get("positions", []):
+                merged = dict(pos)
+                merged.setdefault("unRealizedProfit", pos.get("unrealizedProfit", "0"))
+                positions[self._key(pos["symbol"], pos.get("positionSide"))] = merged
+            for risk in risks or []:
+                merged = positions.setdefault(self._key(risk["symbol"], risk.get("positionSide")), {})
+                merged.update(risk)
+                merged.setdefault("unrealizedProfit", risk.get("unRealizedProfit", "0"))
+            self.account = {k: v for k, v in account.items() if k not in ("positions", "assets")}
+            self.assets = {a["asset"]: dict(a) for a in account.get("assets", [])}
+            self.positions = positions
+            self.updated_at = time.monotonic()
+            if self._events == events_before:
+                self._blind_stale = False
+            self.stats["snapshots"] += 1
+        return True
+
+    def _stream_live(self) -> bool:
+        return self.user_stream is not None and self.user_stream.connected
+
+    def _is_stale(self, blind_field: bool) -> bool:
+        age = time.monotonic() - self.updated_at
+        limit = self.max_age if self._stream_live() and not blind_field else self.ttl
+        return not self.updated_at or age > limit or (blind_field and self._blind_stale)
+
+    def _ensure_fresh(self, blind_field: bool = False):
+        if not self._is_stale(blind_field):
+            return
+        with self._refresh_lock:
+            # Luồng khác có thể vừa chụp xong trong lúc chờ khóa
+            if self._is_stale(blind_field):
+                self._snapshot()
+
+    # ========== SỰ KIỆN STREAM ==========
+
+    def on_event(self, event: Dict):
+        kind = event.get("e")
+        if kind == "ACCOUNT_UPDATE":
+            self._apply_account_update(event.get("a", {}))
+        elif kind == "ACCOUNT_CONFIG_UPDATE" and "ac" in event:
+            with self._lock:
+                symbol = event["ac"]["s"].upper()
+                legs = [pos for key, pos in self.positions.items() if key[0] == symbol]
+                if not legs:
+                    legs = [self.positions.setdefault(self._key(symbol), {"symbol": symbol})]
+                for pos in legs:
+                    pos["leverage"] = str(event["ac"]["l"])
+                self._events += 1
+                self.stats["events"] += 1
+        elif kind == "ORDER_TRADE_UPDATE" and event.get("o", {}).get("x") == "TRADE":
+            # Lệnh khớp: positionAmt/số dư tới qua ACCOUNT_UPDATE đi kèm (thứ tự hai sự kiện không đảm bảo
+            # nên không tự cộng khối lượng ở đây), nhưng margin khả dụng/giá thanh lý đã đổi
+            with self._lock:
+                self._blind_stale = True
+                self._events += 1
+                self.stats["events"] += 1
+
+    def _apply_account_update(self, data: Dict):
+        with self._lock:
+            for b in data.get("B", []):
+                asset = self.assets.setdefault(b["a"], {"asset": b["a"]})
+                old_wallet = float(asset.get("walletBalance", 0) or 0)
+                asset["walletBalance"] = b["wb"]
+                asset["crossWalletBalance"] = b["cw"]
+                if b["a"] == "USDT" and "totalWalletBalance" in self.account:
+                    total = float(self.account["totalWalletBalance"]) + float(b["wb"]) - old_wallet
+                    self.account["totalWalletBalance"] = f"{total:.8f}"
+            for p in data.get("P", []):
+                pos = self.positions.setdefault(self._key(p["s"], p.get("ps")), {"symbol": p["s"]})
+                pos["positionAmt"] = p["pa"]
+                pos["entryPrice"] = p["ep"]
+                pos["unRealizedProfit"] = p["up"]
+                pos["unrealizedProfit"] = p["up"]
+                pos["positionSide"] = p.get("ps", pos.get("positionSide", "BOTH"))
+                pos["marginType"] = p.get("mt", pos.get("marginType"))
+                pos["isolatedWallet"] = p.get("iw", pos.get("isolatedWallet"))
+                pos["isolated"] = p.get("mt") == "isolated"
+            unrealized = sum(float(p.get("unRealizedProfit", 0) or 0) for p in self.positions.values())
+            self.account["totalUnrealizedProfit"] = f"{unrealized:.8f}"
+            if "totalWalletBalance" in self.account:
+                self.account["totalMarginBalance"] = f"{float(self.account['totalWalletBalance']) + unrealized:.8f}"
+            self._blind_stale = True
+            self._events += 1
+            self.stats["events"] += 1
+
+    # ========== GETTER ==========
+
+    def legs(self, symbol: str, blind_field: bool = False) -> List[Dict]:
+        """Mọi chân vị thế của symbol (một chân BOTH ở one-way mode, LONG/SHORT ở hedge mode)."""
+        self._ensure_fresh(blind_field)
+        symbol = symbol.upper()
+        with self._lock:
+            self.stats["reads"] += 1
+            return [dict(pos) for key, pos in self.positions.items() if key[0] == symbol]
+
+    def position(self, symbol: str, blind_field: bool = False, position_side: str = "BOTH") -> Optional[Dict]:
+        """Một chân vị thế của symbol (dict có cả trường kiểu positionRisk lẫn kiểu account)."""
+        self._ensure_fresh(blind_field)
+        with self._lock:
+            self.stats["reads"] += 1
+            pos = self.positions.get(self._key(symbol, position_side))
+            return dict(pos) if pos is not None else None
+
+    def position_risk(self, symbol: str, blind_field: bool = False) -> List[Dict]:
+        """Giống kết quả /fapi/v2/positionRisk?symbol=... (list, hai phần tử ở hedge mode)."""
+        return self.legs(symbol, blind_field)
+
+    def account_info(self, blind_field: bool = False) -> Dict:
+        """Giống kết quả /fapi/v2/account."""
+        self._ensure_fresh(blind_field)
+        with self._lock:
+            self.stats["reads"] += 1
+            info = dict(self.account)
+            info["assets"] = [dict(a) for a in self.assets.values()]
+            info["positions"] = [dict(p) for p in self.positions.values()]
+            return info
+
+    def balance(self, asset: str = "USDT") -> float:
+        self._ensure_fresh()
+        with self._lock:
+            self.stats["reads"] += 1
+            return float(self.assets.get(asset, {}).get("walletBalance", 0.0))
+
+    def leverage(self, symbol: str) -> Optional[int]:
+        for pos in self.legs(symbol):
+            if "leverage" in pos:
+                return int(pos["leverage"])
+        return None
+
+    def unrealized_pnl(self, symbol: str) -> Optional[float]:
+        """Tổng PnL chưa thực hiện các chân của symbol; đổi theo mark price nên đọc snapshot mới."""
+        legs = self.legs(symbol, blind_field=True)
+        return sum(float(pos.get("unRealizedProfit", 0) or 0) for pos in legs) if legs else None
+
+    def liquidation_price(self, symbol: str) -> Optional[float]:
+        for pos in self.legs(symbol, blind_field=True):
+            if float(pos.get("positionAmt", 0) or 0) != 0:
+                return float(pos.get("liquidationPrice", 0))
+        return None
+
+    def set_leverage(self, symbol: str, leverage: int):
+        """Ghi nhận leverage vừa đặt qua REST (ACCOUNT_CONFIG_UPDATE cũng sẽ tới sau)."""
+        symbol = symbol.upper()
+        with self._lock:
+            legs = [pos for key, pos in self.positions.items() if key[0] == symbol]
+            if not legs:
+                legs = [self.positions.setdefault(self._key(symbol), {"symbol": symbol})]
+            for pos in legs:
+                pos["leverage"] = str(leverage)
@@ -0,0 +1,211 @@
+import json
+import logging
+from decimal import Decimal
+import requests
+from core.signer import RequestSigner, error_code
+from core.transport import HttpTransport, get_shared_transport
+
+
+def _format_number(value) -> str:
+    """Số gửi lên sàn dạng thập phân thường (Decimal('1.2E+2') -> '120'), không dùng ký hiệu khoa học."""
+    return format(value, "f") if isinstance(value, Decimal) else str(value)
+
+class BinanceAPI:
+    BASE_URL = "https://fapi.binance.com"
+
+    def __init__(self, api_key: str, api_secret: str, transport: HttpTransport = None,
+                 signer: RequestSigner = None, base_url: str = None):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        # Transport keep-alive dùng chung với BinanceFuturesAPI và collector
+        # base_url: trỏ tới server giả lập (tools.mock_binance) khi test offline
+        self.transport = transport or get_shared_transport(base_url or self.BASE_URL)
+        # Ký HMAC dùng lại khóa + offset đồng hồ sàn (signer.start() để đồng bộ nền)
+        self.signer = signer or RequestSigner(api_secret, self.transport)
+        self.headers = {"X-MBX-APIKEY": self.api_key}
+        self.account_cache = None  # AccountStateCache (tùy chọn): getter đọc từ bộ nhớ thay vì REST
+
+    def _request(self, method: str, path: str, params: dict = None, signed: bool = False,
+                 return_errors: bool = False):
+        """
+        Gửi request tới sàn, trả về body JSON; lỗi được log và trả về None.
+        return_errors: trả về body lỗi {"code", "msg"} của sàn thay vì None, còn lỗi đường truyền
+            (timeout, mất kết nối, lỗi không có body của sàn) thì raise, để bên gọi phân biệt
+            lệnh bị từ chối với lệnh chưa rõ đã tới sàn hay chưa.
+        """
+        try:
+            return self.signer.send(self.transport, method, path, params=params, headers=self.headers,
+                                    client="api", signed=signed)
+        except requests.exceptions.HTTPError as e:
+            logging.error(f"Binance API request error: {e}")
+            if return_errors:
+                if error_code(e.response) is None:
+                    raise
+                return e.response.json()
+            return None
+        except Exception as e:
+            logging.error(f"Binance API request error: {e}")
+            if return_errors:
+                raise
+            return None
+
+    def attach_account_cache(self, cache):
+        """Dùng AccountStateCache cho get_position/get_account_info/get_leverage/..."""
+        self.account_cache = cache
+
+    # === Futures Account / Position ===
+
+    def get_position(self, symbol: str):
+        """Lấy thông tin vị thế hiện tại của symbol"""
+        if self.account_cache is not None:
+            # unRealizedProfit/markPrice đổi theo mark price mà stream không báo: cần snapshot mới
+            return self.account_cache.position_risk(symbol, blind_field=True)
+        path = "/fapi/v2/positionRisk"
+        params = {"symbol": symbol}
+        return self._request("GET", path, params=params, signed=True)
+
+    def get_account_info(self):
+        """Lấy thông tin tài khoản futures"""
+        if self.account_cache is not None:
+            return self.account_cache.account_info(blind_field=True)
+        path = "/fapi/v2/account"
+        return self._request("GET", path, signed=True)
+
+    def get_leverage(self, symbol: str):
+        """Lấy thông tin đòn bẩy hiện tại của symbol"""
+        # Binance Futures không có API get leverage trực tiếp, phải lấy từ position
+        if self.account_cache is not None:
+            return self.account_cache.leverage(symbol)
+        positions = self.get_position(symbol)
+        if positions:
+            for pos in positions:
+                if pos['symbol'] == symbol:
+                    return int(pos.get('leverage', 1))
+        return None
+
+    def set_leverage(self, symbol: str, leverage: int):
+        """Đặt đòn bẩy cho symbol"""
+        path = "/fapi/v1/leverage"
+        params = {"symbol": symbol, "leverage": leverage}
+        result = self._request("POST", path, params=params, signed=True)
+        if result and self.account_cache is not None:
+            self.account_cache.set_leverage(symbol, leverage)
+        return result
+
+    def change_margin_type(self, symbol: str, margin_type: str):
+        """
+        Thay đổi margin type (CROSSED hoặc ISOLATED)
+        """
+        path = "/fapi/v1/marginType"
+        params = {"symbol": symbol, "marginType": margin_type}
+        return self._request("POST", path, params=params, signed=True)
+
+    @staticmethod
+    def build_order_params(symbol: str, side: str, order_type: str, quantity=None, price=None,
+                           reduce_only: bool = False, time_in_force: str = None, stop_price=None,
+                           close_position: bool = False, new_client_order_id: str = None) -> dict:
+        """Tham số một lệnh theo định dạng Binance (dùng cho /order và từng phần tử của /batchOrders)"""
+        params = {"symbol": symbol, "side": side, "type": order_type}
+        if close_position:
+            # closePosition không đi kèm quantity/reduceOnly
+            params["closePosition"] = "true"
+        else:
+            params["quantity"] = _format_number(quantity)
+            params["reduceOnly"] = str(reduce_only).lower()
+        if price is not None:
+            params["price"] = _format_number(price)
+        if stop_price is not None:
+            params["stopPrice"] = _format_number(stop_price)
+        if time_in_force is not None:
+            params["timeInForce"] = time_in_force
+        if new_client_order_id is not None:
+            params["newClientOrderId"] = new_client_order_id
+        return params
+
+    def place_order(self, symbol: str, side: str, order_type: str, quantity: float, price: float = None,
+                    reduce_only: bool = False, time_in_force: str = None, stop_price: float = None,
+                    close_position: bool = False, new_client_order_id: str = None, return_errors: bool = False):
+        """
+        Đặt lệnh futures
+        side: BUY hoặc SELL
+        order_type: LIMIT, MARKET, STOP_MARKET, TAKE_PROFIT_MARKET,...
+        new_client_order_id: id do client đặt, gửi lại cùng id khi retry để không tạo lệnh trùng
+        return_errors: xem _request (trả body lỗi của sàn, raise lỗi đường truyền)
+        """
+        path = "/fapi/v1/order"
+        params = self.build_order_params(symbol, side, order_type, quantity, price, reduce_only,
+                                         time_in_force, stop_price, close_position, new_client_order_id)
+        return self._request("POST", path, params=params, signed=True, return_errors=return_errors)
+
+    def place_batch_orders(self, orders: list, return_errors: bool = False):
+        """
+        Đặt tối đa 5 lệnh trong một request /fapi/v1/batchOrders.
+        orders: list tham số từ build_order_params. Trả về list cùng thứ tự, phần tử lỗi có dạng
+        {"code": ..., "msg": ...}; None nếu cả request lỗi (return_errors: body lỗi của cả request).
+        """
+        path = "/fapi/v1/batchOrders"
+        params = {"batchOrders": json.dumps(orders, separators=(",", ":"))}
+        return self._request("POST", path, params=params, signed=True, return_errors=return_errors)
+
+    def get_order(self, symbol: str, order_id: int = None, client_order_id: str = None):
+        """Truy vấn lệnh theo orderId hoặc clientOrderId"""
+        path = "/fapi/v1/order"
+        params = {"symbol": symbol}
+        if order_id is not None:
+            params["orderId"] = order_id
+        else:
+            params["origClientOrderId"] = client_order_id
+        return self._request("GET", path, params=params, signed=True)
+
+    def get_order_status(self, symbol: str, order_id: int):
+        """Trạng thái lệnh (NEW, PARTIALLY_FILLED, FILLED, CANCELED,...) hoặc None nếu lỗi"""
+        order = self.get_order(symbol, order_id)
+        return order.get("status") if order else None
+
+    def cancel_order(self, symbol: str, order_id: int):
+        """Hủy lệnh theo orderId"""
+        path = "/fapi/v1/order"
+        params = {"symbol": symbol, "orderId": order_id}
+        return self._request("DELETE", path, params=params, signed=True)
+
+    # === Mở rộng tính toán ===
+
+    def calculate_liquidation_price(self, symbol: str):
+        """
+        Tính toán giá thanh lý từ dữ liệu vị thế.
+        Giá trị lấy từ API position, hoặc tính toán thủ công theo công thức Binance.
+        """
+        if self.account_cache is not None:
+            return self.account_cache.liquidation_price(symbol)
+        pos_list = self.get_position(symbol)
+        if not pos_list:
+            return None
+
+        for pos in pos_list:
+            if pos['symbol'] == symbol and float(pos['positionAmt']) != 0:
+                # Giá thanh lý trả về API
+                return float(pos.get('liquidationPrice', 0))
+        return None
+
+    def get_margin_used(self):
+        """Lấy margin đã dùng (used margin) trong tài khoản futures"""
+        if self.account_cache is not None:
+            # availableBalance không có trong user-data stream, cache tự chụp lại khi đã cũ
+            account = self.account_cache.account_info(blind_field=True)
+        else:
+            account = self.get_account_info()
+        if not account:
+            return None
+        return float(account.get('totalMarginBalance', 0)) - float(account.get('availableBalance', 0))
+
+    def get_unrealized_pnl(self, symbol: str):
+        """Lấy PnL chưa thực hiện (unrealized profit/loss) của vị thế symbol"""
+        if self.account_cache is not None:
+            return self.account_cache.unrealized_pnl(symbol)
+        pos_list = self.get_position(symbol)
+        if not pos_list:
+            return None
+        for pos in pos_list:
+            if pos['symbol'] == symbol:
+                return float(pos.get('unRealizedProfit', 0))
+        return None
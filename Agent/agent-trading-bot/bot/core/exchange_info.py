@@ -0,0 +1,236 @@
+import json
+import logging
+import os
+import threading
+import time
+from decimal import Decimal, ROUND_DOWN, ROUND_UP
+from typing import Dict, Optional
+
+from core.exchange_api import BinanceAPI
+
+EXCHANGE_INFO_PATH = "/fapi/v1/exchangeInfo"
+
+
+def _to_decimal(value) -> Decimal:
+    # str() trước để float như 0.1 giữ đúng giá trị thập phân đã viết, không mang sai số nhị phân
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _quantum(step: Decimal) -> Optional[Decimal]:
+    """Số mũ để quantize theo bước: 0.001 -> 1E-3; bước >= 1 (ví dụ 10) -> 1, tránh dạng 1.2E+2."""
+    if step <= 0:
+        return None
+    return Decimal(1).scaleb(min(0, step.normalize().as_tuple().exponent))
+
+
+class SymbolRules:
+    """
+    Bảng quy tắc đặt lệnh đã biên dịch của một symbol (từ filters của exchangeInfo).
+    Làm tròn và kiểm tra đều là phép Decimal O(1), không duyệt filters hay gọi math.log.
+    """
+    __slots__ = (
+        "symbol", "status", "step_size", "min_qty", "max_qty", "market_step_size", "market_min_qty",
+        "market_max_qty", "tick_size", "min_price", "max_price", "min_notional",
+        "quantity_precision", "price_precision", "_qty_exp", "_market_qty_exp", "_price_exp"
+    )
+
+    def __init__(self, info: Dict):
+        filters = {f["filterType"]: f for f in info.get("filters", [])}
+        lot = filters.get("LOT_SIZE", {})
+        market_lot = filters.get("MARKET_LOT_SIZE", lot)
+        price = filters.get("PRICE_FILTER", {})
+        notional = filters.get("MIN_NOTIONAL", {})
+
+        self.symbol = info["symbol"]
+        self.status = info.get("status", "TRADING")
+        self.step_size = _to_decimal(lot.get("stepSize", "0"))
+        self.min_qty = _to_decimal(lot.get("minQty", "0"))
+        self.max_qty = _to_decimal(lot.get("maxQty", "0"))
+        self.market_step_size = _to_decimal(market_lot.get("stepSize", lot.get("stepSize", "0")))
+        self.market_min_qty = _to_decimal(market_lot.get("minQty", lot.get("minQty", "0")))
+        self.market_max_qty = _to_decimal(market_lot.get("maxQty", lot.get("maxQty", "0")))
+        self.tick_size = _to_decimal(price.get("tickSize", "0"))
+        self.min_price = _to_decimal(price.get("minPrice", "0"))
+        self.max_price = _to_decimal(price.get("maxPrice", "0"))
+        # Futures dùng "notional", spot dùng "minNotional"
+        self.min_notional = _to_decimal(notional.get("notional", notional.get("minNotional", "0")))
+        self._qty_exp = _quantum(self.step_size)
+        self._market_qty_exp = _quantum(self.market_step_size)
+        self._price_exp = _quantum(self.tick_size)
+        self.quantity_precision = max(0, -self._qty_exp.as_tuple().exponent) if self._qty_exp is not None \
+            else int(info.get("quantityPrecision", 8))
+        self.price_precision = max(0, -self._price_exp.as_tuple().exponent) if self._price_exp is not None \
+            else int(info.get("pricePrecision", 8))
+
+    @staticmethod
+    def _to_step(value: Decimal, step: Decimal, exp: Optional[Decimal], rounding=ROUND_DOWN) -> Decimal:
+        if exp is None:
+            return value
+        return ((value / step).to_integral_value(rounding=rounding) * step).quantize(exp)
+
+    def round_quantity(self, quantity, market: bool = False) -> Decimal:
+        """Làm tròn xuống theo stepSize (MARKET_LOT_SIZE cho lệnh market)."""
+        if market:
+            return self._to_step(_to_decimal(quantity), self.market_step_size, self._market_qty_exp)
+        return self._to_step(_to_decimal(quantity), self.step_size, self._qty_exp)
+
+    def round_price(self, price, round_up: bool = False) -> Decimal:
+        """Làm tròn theo tickSize (mặc định xuống, round_up=True để làm tròn lên)."""
+        return self._to_step(_to_decimal(price), self.tick_size, self._price_exp, ROUND_UP if round_up else ROUND_DOWN)
+
+    def validate(self, quantity, price=None, market: bool = False, reference_price=None,
+                 reduce_only: bool = False) -> Optional[str]:
+        """
+        Kiểm tra lệnh đã làm tròn; trả về lý do lỗi hoặc None nếu hợp lệ.
+        reference_price: giá tham chiếu (giá cuối/mark) để kiểm tra MIN_NOTIONAL cho lệnh không có giá
+        (MARKET); reduce_only thì sàn không áp MIN_NOTIONAL.
+        """
+        quantity = _to_decimal(quantity)
+        min_qty, max_qty = (self.market_min_qty, self.market_max_qty) if market else (self.min_qty, self.max_qty)
+        if self.status != "TRADING":
+            return f"{self.symbol} đang ở trạng thái {self.status}"
+        if quantity <= 0 or quantity < min_qty:
+            return f"quantity {quantity} < minQty {min_qty}"
+        if max_qty > 0 and quantity > max_qty:
+            return f"quantity {quantity} > maxQty {max_qty}"
+        if price is not None:
+            price = _to_decimal(price)
+            if price < self.min_price or (self.max_price > 0 and price > self.max_price):
+                return f"price {price} ngoài khoảng [{self.min_price}, {self.max_price}]"
+        notional_price = price if price is not None else reference_price
+        if notional_price is not None and not reduce_only:
+            notional = quantity * _to_decimal(notional_price)
+            if notional < self.min_notional:
+                return f"notional {notional} < {self.min_notional}"
+        return None
+
+
+class ExchangeInfoCache:
+    """
+    Metadata sàn (/fapi/v1/exchangeInfo) cho mọi symbol, tải một lần và dùng chung.
+
+    - Lưu JSON trên đĩa (`cache_path`) để khởi động lại không cần gọi REST; bản trên đĩa cũ hơn
+      `max_age` giây thì tải lại.
+    - Luồng nền (start_background_refresh) tải lại mỗi `refresh_interval` giây.
+    - Biên dịch mỗi symbol thành SymbolRules; rules(symbol) chỉ là một lần tra dict.
+    - Symbol chưa có (mới niêm yết) thì tải lại ngay, tối đa một lần mỗi `min_refresh_gap` giây.
+    """
+
+    def __init__(
+        self,
+        api: BinanceAPI,
+        cache_path: Optional[str] = "exchange_info.json",
+        refresh_interval: float = 3600.0,
+        max_age: float = 86400.0,
+        min_refresh_gap: float = 60.0
+    ):
+        self.api = api
+        self.cache_path = cache_path
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.min_refresh_gap = min_refresh_gap
+        self.fetched_at = 0.0  # epoch giây của bản exchangeInfo đang dùng
+        self._symbols: Dict[str, Dict] = {}
+        self._rules: Dict[str, SymbolRules] = {}
+        self._last_attempt = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.logger = logging.getLogger("ExchangeInfoCache")
+
+    # ========== TẢI / LƯU ==========
+
+    def _compile(self, data: Dict, fetched_at: float):
+        symbols = {s["symbol"]: s for s in data.get("symbols", [])}
+        rules = {}
+        for name, info in symbols.items():
+            try:
+                rules[name] = SymbolRules(info)
+            except Exception as e:
+                self.logger.warning(f"[ExchangeInfo] Bỏ qua {name}: {e}")
+        # Thay cả dict một lần, luồng đọc không bao giờ thấy bảng dở dang
+        self._symbols, self._rules = symbols, rules
+        self.fetched_at = fetched_at
+        self._loaded = True
+
+    def _load_from_disk(self) -> bool:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            self._compile(stored["exchangeInfo"], float(stored["fetched_at"]))
+        except Exception as e:
+            self.logger.error(f"[ExchangeInfo] Lỗi đọc {self.cache_path}: {e}")
+            return False
+        self.logger.debug(f"[ExchangeInfo] Nạp {len(self._rules)} symbol từ {self.cache_path}")
+        return True
+
+    def _save_to_disk(self, data: Dict, fetched_at: float):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": fetched_at, "exchangeInfo": data}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            self.logger.error(f"[ExchangeInfo] Lỗi ghi {self.cache_path}: {e}")
+
+    def refresh(self) -> bool:
+        """Tải exchangeInfo từ sàn, biên dịch lại bảng quy tắc và lưu xuống đĩa."""
+        with self._lock:
+            self._last_attempt = time.time()
+            data = self.api._request("GET", EXCHANGE_INFO_PATH)
+            if not data or "symbols" not in data:
+                self.logger.error("[ExchangeInfo] Không tải được exchangeInfo")
+                return False
+            fetched_at = time.time()
+            self._compile(data, fetched_at)
+            self._save_to_disk(data, fetched_at)
+        self.logger.info(f"[ExchangeInfo] Đã tải {len(self._rules)} symbol")
+        return True
+
+    def load(self) -> bool:
+        """Warm start từ đĩa; tải từ sàn nếu chưa có hoặc bản trên đĩa đã quá max_age."""
+        if self._load_from_disk() and time.time() - self.fetched_at <= self.max_age:
+            return True
+        return self.refresh() or self._loaded
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    # ========== TRA CỨU ==========
+
+    def rules(self, symbol: str) -> Optional[SymbolRules]:
+        self._ensure_loaded()
+        rules = self._rules.get(symbol)
+        if rules is None and time.time() - self._last_attempt >= self.min_refresh_gap:
+            self.refresh()
+            rules = self._rules.get(symbol)
+        return rules
+
+    def symbol_info(self, symbol: str) -> Optional[Dict]:
+        """Thông tin thô của symbol, giống python-binance client.get_symbol_info."""
+        return self._symbols.get(symbol) if self.rules(symbol) is not None else None
+
+    # ========== LÀM MỚI NỀN ==========
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.logger.error(f"[ExchangeInfo] Lỗi làm mới nền: {e}")
+
+    def start_background_refresh(self):
+        self._ensure_loaded()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,53 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class MemoryManager:
+    """
+    Lưu bản ghi giao dịch theo nhóm (trades, strategies...) để theo dõi hiệu suất và huấn luyện lại model.
+
+    - memory_file: file JSON Lines, mỗi bản ghi một dòng {"category", ...}; ghi nối thêm (không ghi lại
+      cả file mỗi lần như bản lưu JSON), giá trị không phải JSON (datetime, Timestamp) ghi dạng chuỗi.
+    - memory_file=None: chỉ giữ trong bộ nhớ (backtest).
+    - Mỗi nhóm giữ tối đa `max_records` bản ghi gần nhất trong bộ nhớ.
+    """
+
+    def __init__(self, memory_file: Optional[str] = "memory.jsonl", max_records: int = 10_000):
+        self.memory_file = memory_file
+        self.max_records = max_records
+        self.memory: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger("MemoryManager")
+        self._load()
+
+    def _load(self):
+        if not self.memory_file or not os.path.exists(self.memory_file):
+            return
+        with open(self.memory_file, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    self.logger.warning(f"[MemoryManager] Bỏ dòng {line_no} không đọc được trong {self.memory_file}")
+                    continue
+                category = record.pop("category", "default")
+                self.memory.setdefault(category, deque(maxlen=self.max_records)).append(record)
+
+    def add_record(self, category: str, data: Dict):
+        record = dict(data)
+        record["timestamp"] = time.time()
+        with self._lock:
+            self.memory.setdefault(category, deque(maxlen=self.max_records)).append(record)
+            if self.memory_file:
+                with open(self.memory_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"category": category, **record}, ensure_ascii=False, default=str) + "\n")
+
+    def get_records(self, category: str, limit: int = 10) -> List[Dict]:
+        with self._lock:
+            records = list(self.memory.get(category, ()))
+        return records[-limit:]
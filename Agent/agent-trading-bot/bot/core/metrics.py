@@ -0,0 +1,313 @@
+import logging
+import os
+import threading
+import weakref
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Bucket (giây) cho histogram độ trễ: từ request nội bộ ~1ms tới timeout 10s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Tên metric dùng trong HttpTransport và các client sàn
+HTTP_REQUESTS = "binance_http_requests_total"
+HTTP_DURATION = "binance_http_request_duration_seconds"
+HTTP_QUEUE = "binance_http_queue_duration_seconds"
+HTTP_RETRIES = "binance_http_retries_total"
+HTTP_ERRORS = "binance_http_errors_total"
+HTTP_SENT_BYTES = "binance_http_request_bytes_total"
+HTTP_RECEIVED_BYTES = "binance_http_response_bytes_total"
+API_ERRORS = "binance_api_errors_total"
+RATE_LIMIT_USED = "binance_rate_limit_used"
+RATE_LIMIT_AVAILABLE = "binance_rate_limit_available"
+RATE_LIMIT_QUEUED = "binance_rate_limit_queued"
+
+# name -> (loại, mô tả, tên label)
+METRICS = {
+    HTTP_REQUESTS: ("counter", "Số lần gửi HTTP (mỗi lần thử) theo status", ("client", "method", "endpoint", "status")),
+    HTTP_DURATION: ("histogram", "Round trip HTTP mỗi lần thử", ("client", "method", "endpoint")),
+    HTTP_QUEUE: ("histogram", "Thời gian chờ rate limiter trước khi gửi", ("client", "endpoint")),
+    HTTP_RETRIES: ("counter", "Số lần gửi lại sau lỗi mạng/429/5xx", ("client", "method", "endpoint")),
+    HTTP_ERRORS: ("counter", "Lần thử thất bại: HTTP status >= 400, tên exception hoặc circuit_open",
+                  ("client", "method", "endpoint", "reason")),
+    HTTP_SENT_BYTES: ("counter", "Byte gửi đi (URL + body)", ("client", "endpoint")),
+    HTTP_RECEIVED_BYTES: ("counter", "Byte body nhận về", ("client", "endpoint")),
+    API_ERRORS: ("counter", "Lỗi Binance theo mã lỗi trong body", ("client", "endpoint", "code")),
+    RATE_LIMIT_USED: ("gauge", "Giới hạn đã dùng theo header X-MBX-* gần nhất", ("host", "limit")),
+    RATE_LIMIT_AVAILABLE: ("gauge", "Token còn lại trong RateLimiter", ("host", "limit")),
+    RATE_LIMIT_QUEUED: ("gauge", "Số request đang chờ RateLimiter", ("host",)),
+}
+
+
+class _Shard:
+    """Bộ đếm riêng của một luồng: chỉ luồng đó ghi nên không cần khóa."""
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: Dict[Tuple, float] = {}
+        self.histograms: Dict[Tuple, List[float]] = {}
+
+
+class _ShardOwner:
+    """Chỉ thread-local của luồng giữ object này: luồng kết thúc thì nó bị thu hồi, kích hoạt finalize."""
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self, shard: _Shard):
+        self.shard = shard
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def histogram_quantile(buckets: Tuple[float, ...], counts: List[float], q: float) -> float:
+    """Ước lượng quantile từ số đếm theo bucket (nội suy tuyến tính trong bucket, như Prometheus)."""
+    total = sum(counts)
+    if total == 0:
+        return 0.0
+    rank = q * total
+    cumulative = 0.0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count > 0:
+            lower = buckets[i - 1] if i > 0 else 0.0
+            upper = buckets[i] if i < len(buckets) else buckets[-1]
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+    return buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    Metric của tầng sàn (counter, histogram, gauge), xuất dạng Prometheus text.
+
+    - Ghi không khóa: mỗi luồng ghi vào shard riêng (threading.local), khóa chỉ dùng một lần khi
+      luồng ghi lần đầu và khi xuất. Một lần observe là một bisect + hai phép cộng trên list.
+    - Gauge là phép gán dict; collector (add_collector) được gọi lúc xuất để đọc trạng thái
+      như token còn lại của RateLimiter mà không tốn gì trên hot path.
+    - Xuất: render(), write_textfile(path) (ghi nguyên tử, dùng với textfile collector của
+      node_exporter), start_textfile_export(path, interval) và start_http_server(port) (GET /metrics).
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard()  # shard gộp từ các luồng đã kết thúc
+        self._gauges: Dict[Tuple, float] = {}
+        self._collectors: List[weakref.ReferenceType] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._export_thread: Optional[threading.Thread] = None
+        self._http_server: Optional[ThreadingHTTPServer] = None
+        self.logger = logging.getLogger("MetricsRegistry")
+
+    # ========== GHI ==========
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.owner.shard
+        except AttributeError:
+            shard = _Shard()
+            owner = self._local.owner = _ShardOwner(shard)
+            with self._lock:
+                self._shards.append(shard)
+            # Luồng kết thúc -> thread-local bị xóa -> gộp shard vào _retired, không giữ shard mãi
+            weakref.finalize(owner, self._retire, shard)
+            return shard
+
+    def _retire(self, shard: _Shard):
+        with self._lock:
+            self._merge_into(self._retired.counters, self._retired.histograms, shard)
+            try:
+                self._shards.remove(shard)
+            except ValueError:
+                pass
+
+    @staticmethod
+    def _merge_into(counters: Dict[Tuple, float], histograms: Dict[Tuple, List[float]], shard: _Shard):
+        # dict(...) copy ở tầng C, an toàn khi luồng chủ shard đang ghi
+        for key, value in dict(shard.counters).items():
+            counters[key] = counters.get(key, 0.0) + value
+        for key, entry in dict(shard.histograms).items():
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = list(entry)
+            else:
+                for i, value in enumerate(list(entry)):
+                    merged[i] += value
+
+    def inc(self, name: str, labels: Tuple = (), value: float = 1.0):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: Tuple, value: float):
+        """Ghi một giá trị vào histogram; list = [số đếm từng bucket..., +Inf, tổng]."""
+        histograms = self._shard().histograms
+        key = (name, labels)
+        entry = histograms.get(key)
+        if entry is None:
+            entry = histograms[key] = [0.0] * (len(self.buckets) + 2)
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def set_gauge(self, name: str, labels: Tuple, value: float):
+        self._gauges[(name, labels)] = value
+
+    def add_collector(self, callback: Callable[[], Iterable[Tuple[str, Tuple, float]]]):
+        """
+        callback() trả về các (tên gauge, labels, giá trị), gọi mỗi lần xuất.
+        Method bound được giữ bằng weakref để không giữ đối tượng sống mãi.
+        """
+        ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else (lambda: callback)
+        with self._lock:
+            self._collectors.append(ref)
+
+    # ========== ĐỌC ==========
+
+    def _merged(self):
+        counters: Dict[Tuple, float] = {}
+        histograms: Dict[Tuple, List[float]] = {}
+        with self._lock:
+            # Chụp _retired cùng danh sách shard trong khóa để shard vừa gộp không bị đếm hai lần
+            self._merge_into(counters, histograms, self._retired)
+            shards = list(self._shards)
+            collectors = list(self._collectors)
+        for shard in shards:
+            self._merge_into(counters, histograms, shard)
+        gauges = dict(self._gauges)
+        alive = []
+        for ref in collectors:
+            callback = ref()
+            if callback is None:
+                continue
+            alive.append(ref)
+            try:
+                for name, labels, value in callback():
+                    gauges[(name, labels)] = value
+            except Exception as e:
+                self.logger.warning(f"[Metrics] Lỗi collector: {e}")
+        if len(alive) != len(collectors):
+            with self._lock:
+                self._collectors = [r for r in self._collectors if r() is not None]
+        return counters, histograms, gauges
+
+    def counters(self, name: str) -> Dict[Tuple, float]:
+        """Giá trị counter `name` theo labels (đã gộp mọi luồng)."""
+        return {labels: v for (n, labels), v in self._merged()[0].items() if n == name}
+
+    def histograms(self, name: str) -> Dict[Tuple, Dict]:
+        """Histogram `name` theo labels: count, sum, p50/p99 ước lượng từ bucket."""
+        out = {}
+        for (n, labels), entry in self._merged()[1].items():
+            if n != name:
+                continue
+            counts = entry[:-1]
+            count = sum(counts)
+            out[labels] = {
+                "count": int(count),
+                "sum": entry[-1],
+                "p50": histogram_quantile(self.buckets, counts, 0.5),
+                "p99": histogram_quantile(self.buckets, counts, 0.99),
+            }
+        return out
+
+    # ========== XUẤT ==========
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4."""
+        counters, histograms, gauges = self._merged()
+        by_name: Dict[str, List] = {}
+        for store in (counters, histograms, gauges):
+            for (name, labels), value in store.items():
+                by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name in sorted(by_name):
+            kind, help_text, label_names = METRICS.get(name, ("untyped", "", ()))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+                names = label_names or [f"label{i}" for i in range(len(labels))]
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(names, labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(self.buckets + (float("inf"),), value[:-1]):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                    lines.append(f"{name}_bucket{_format_labels(names, labels, le)} {_format_value(cumulative)}")
+                lines.append(f"{name}_sum{_format_labels(names, labels)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(names, labels)} {_format_value(cumulative)}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """Ghi ra file tạm rồi đổi tên, người đọc không bao giờ thấy file ghi dở."""
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.error(f"[Metrics] Lỗi ghi {path}: {e}")
+
+    def _export_loop(self, path: str, interval: float):
+        while not self._stop.wait(interval):
+            self.write_textfile(path)
+
+    def start_textfile_export(self, path: str, interval: float = 15.0):
+        """Ghi metric ra `path` mỗi `interval` giây trên luồng nền."""
+        if self._export_thread is None or not self._export_thread.is_alive():
+            self._stop.clear()
+            self._export_thread = threading.Thread(target=self._export_loop, args=(path, interval), daemon=True)
+            self._export_thread.start()
+
+    def start_http_server(self, port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Endpoint GET /metrics cho Prometheus scrape (port=0: chọn port trống)."""
+        if self._http_server is not None:
+            return self._http_server
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._http_server = ThreadingHTTPServer((host, port), Handler)
+        self._http_server.daemon_threads = True
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+        self.logger.info(f"[Metrics] Xuất metric tại http://{host}:{self._http_server.server_address[1]}/metrics")
+        return self._http_server
+
+    def stop(self):
+        self._stop.set()
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+            self._http_server = None
+
+
+# Registry mặc định dùng chung trong process (HttpTransport, BinanceAPI, BinanceFuturesAPI, collector...)
+default_metrics = MetricsRegistry()
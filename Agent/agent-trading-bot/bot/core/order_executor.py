@@ -0,0 +1,380 @@
+import logging
+import time
+import uuid
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from core.exchange_api import BinanceAPI
+from core.exchange_info import ExchangeInfoCache
+from core.order_tracker import OrderTracker
+from binance.enums import ORDER_TYPE_MARKET, ORDER_TYPE_LIMIT, SIDE_BUY, SIDE_SELL, TIME_IN_FORCE_GTC
+
+MAX_BATCH_ORDERS = 5  # Giới hạn của /fapi/v1/batchOrders
+# Lỗi tạm thời của sàn (mất kết nối nội bộ, timeout, quá tải): lệnh có thể đã hoặc chưa được nhận
+RETRYABLE_ERROR_CODES = (-1001, -1007, -1008)
+# Kết quả gửi khi lỗi đường truyền (timeout, mất kết nối): chưa rõ sàn đã nhận lệnh hay chưa
+TRANSPORT_ERROR = {"code": None, "msg": "transport error"}
+
+class OrderExecutor:
+    RETRY_WAIT = 1.0  # Thời gian chờ giữa các lần thử đặt lệnh
+
+    def __init__(self, api: BinanceAPI, max_retries: int = 3, retry_delay: float = RETRY_WAIT,
+                 tracker: OrderTracker = None, exchange_info: ExchangeInfoCache = None, max_workers: int = 4):
+        """
+        Args:
+            api: instance BinanceAPI để gọi API thực tế.
+            max_retries: số lần thử lại khi đặt lệnh thất bại.
+            retry_delay: thời gian chờ giữa các lần thử lại.
+            tracker: OrderTracker theo dõi lệnh qua user-data stream; mặc định chỉ poll REST.
+            exchange_info: ExchangeInfoCache cho stepSize/tickSize/minNotional; mặc định tải một lần, không lưu đĩa.
+            max_workers: số luồng gửi song song lệnh của các symbol khác nhau (place_orders).
+        """
+        self.api = api
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.tracker = tracker or OrderTracker(api)
+        # Bảng quy tắc làm tròn dùng chung; bot truyền bản có lưu đĩa + làm mới nền
+        self.exchange_info = exchange_info or ExchangeInfoCache(api, cache_path=None)
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _get_symbol_info(self, symbol: str):
+        """Lấy thông tin chi tiết về symbol (từ ExchangeInfoCache)."""
+        info = self.exchange_info.symbol_info(symbol)
+        if info is None:
+            logging.error(f"[OrderExecutor] Không lấy được info cho symbol: {symbol}")
+        return info
+
+    def _round_quantity(self, symbol: str, quantity: float, market: bool = False):
+        """
+        Làm tròn quantity theo stepSize của symbol (Decimal, chính xác).
+        Tránh lỗi khi đặt lệnh do không đúng bước size quy định.
+        """
+        rules = self.exchange_info.rules(symbol)
+        if rules is None or quantity <= 0:
+            return quantity
+        return rules.round_quantity(quantity, market=market)
+
+    def _round_price(self, symbol: str, price: float):
+        """
+        Làm tròn giá theo tickSize của symbol (Decimal, chính xác).
+        Tránh lỗi đặt lệnh giá không hợp lệ.
+        """
+        rules = self.exchange_info.rules(symbol)
+        if rules is None or price <= 0:
+            return price
+        return rules.round_price(price)
+
+    # ========== CHUẨN BỊ LỆNH ==========
+
+    @staticmethod
+    def new_client_order_id(prefix: str = "bot") -> str:
+        """clientOrderId duy nhất (tối đa 36 ký tự); dùng lại cùng id khi retry để sàn chặn lệnh trùng."""
+        return f"{prefix}-{uuid.uuid4().hex[:28]}"
+
+    def _prepare(
+        self,
+        symbol: str,
+        side: str,
+        quantity: float = None,
+        order_type: str = ORDER_TYPE_MARKET,
+        price: float = None,
+        reduce_only: bool = False,
+        stop_price: float = None,
+        close_position: bool = False,
+        client_order_id: str = None,
+        reference_price: float = None
+    ) -> Optional[Dict]:
+        """
+        Làm tròn + kiểm tra một lệnh; trả về kwargs cho api.place_order hoặc None nếu không hợp lệ.
+        reference_price: giá cuối/mark để kiểm tra MIN_NOTIONAL cho lệnh MARKET (sàn từ chối -4164).
+        """
+        market = order_type != ORDER_TYPE_LIMIT
+        if not close_position and (quantity is None or quantity <= 0):
+            logging.error(f"[OrderExecutor] Quantity phải > 0, nhận: {quantity}")
+            return None
+        if order_type == ORDER_TYPE_LIMIT and (price is None or price <= 0):
+            logging.error(f"[OrderExecutor] Giá phải hợp lệ cho lệnh LIMIT, nhận: {price}")
+            return None
+
+        if not close_position:
+            quantity = self._round_quantity(symbol, quantity, market=market)
+        if price is not None:
+            price = self._round_price(symbol, price)
+        if stop_price is not None:
+            stop_price = self._round_price(symbol, stop_price)
+        rules = self.exchange_info.rules(symbol)
+        if rules is not None and not close_position:
+            error = rules.validate(quantity, price, market=market, reference_price=reference_price,
+                                   reduce_only=reduce_only)
+            if error:
+                logging.error(f"[OrderExecutor] Lệnh {symbol} không hợp lệ: {error}")
+                return None
+
+        return {
+            "symbol": symbol,
+            "side": side,
+            "order_type": order_type,
+            "quantity": None if close_position else quantity,
+            "price": price,
+            "reduce_only": reduce_only,
+            "time_in_force": TIME_IN_FORCE_GTC if order_type == ORDER_TYPE_LIMIT else None,
+            "stop_price": stop_price,
+            "close_position": close_position,
+            "new_client_order_id": client_order_id or self.new_client_order_id(),
+        }
+
+    def _recover(self, order: Dict) -> Optional[Dict]:
+        """
+        Request trước lỗi (timeout, mất kết nối) có thể đã tới sàn: tra lệnh theo clientOrderId
+        trước khi gửi lại, tránh đặt trùng.
+        """
+        try:
+            existing = self.api.get_order(order["symbol"], client_order_id=order["new_client_order_id"])
+        except Exception as e:
+            logging.warning(f"[OrderExecutor] Lỗi tra lệnh {order['new_client_order_id']}: {e}")
+            return None
+        if existing and "orderId" in existing:
+            logging.info(f"[OrderExecutor] Lệnh {order['new_client_order_id']} đã tới sàn ở lần gửi trước.")
+            return existing
+        return None
+
+    # ========== ĐẶT LỆNH ==========
+
+    def place_order(
+        self,
+        symbol: str,
+        side: str,
+        quantity: float,
+        order_type: str = ORDER_TYPE_MARKET,
+        price: float = None,
+        reduce_only: bool = False,
+        timeout: float = 10.0,
+        stop_price: float = None,
+        client_order_id: str = None,
+        reference_price: float = None
+    ):
+        """
+        Đặt lệnh mua/bán trên Binance Futures.
+        Với limit order, chờ tối đa `timeout` giây rồi tự động hủy nếu không khớp.
+
+        Args:
+            symbol: cặp giao dịch (ví dụ "BTCUSDT").
+            side: SIDE_BUY hoặc SIDE_SELL.
+            quantity: khối lượng lệnh (đã được làm tròn).
+            order_type: loại lệnh (market hoặc limit).
+            price: giá đặt nếu là limit order.
+            reduce_only: True nếu là lệnh giảm vị thế.
+            timeout: thời gian chờ lệnh limit khớp trước khi hủy.
+            stop_price: giá kích hoạt cho STOP_MARKET/TAKE_PROFIT_MARKET.
+            client_order_id: newClientOrderId; mặc định tự sinh, giữ nguyên qua các lần thử lại.
+            reference_price: giá cuối/mark để lệnh MARKET dưới MIN_NOTIONAL bị chặn ngay tại bot.
+
+        Returns:
+            dict order info nếu thành công, None nếu thất bại.
+        """
+        start_time = time.time()
+        prepared = self._prepare(symbol, side, quantity, order_type, price, reduce_only,
+                                 stop_price=stop_price, client_order_id=client_order_id,
+                                 reference_price=reference_price)
+        if prepared is None:
+            return None
+
+        order = self._submit([prepared], use_batch=False)[0]
+        if not order:
+            return None
+        logging.info(f"[OrderExecutor] Đặt lệnh thành công: {order}")
+
+        if order_type == ORDER_TYPE_LIMIT and timeout > 0:
+            order_id = order.get('orderId')
+            if order_id is None:
+                logging.warning(f"[OrderExecutor] Không có orderId trả về, không chờ lệnh khớp.")
+                return order
+
+            # Chờ sự kiện khớp/hủy từ user-data stream, poll REST chỉ là dự phòng
+            handle = self.tracker.track(symbol, order)
+            status = self.tracker.wait(handle, max(0.0, timeout - (time.time() - start_time)))
+            if handle.done:
+                logging.info(f"[OrderExecutor] Lệnh {order_id} trạng thái {status}, kết thúc chờ.")
+            else:
+                self.tracker.cancel(handle)
+                logging.info(f"[OrderExecutor] Hủy lệnh {order_id} do timeout {timeout}s "
+                             f"(đã khớp {handle.executed_qty}).")
+            order = dict(order, **handle.order)
+        return order
+
+    def place_orders(self, orders: List[Dict], use_batch: bool = True) -> List[Optional[Dict]]:
+        """
+        Đặt nhiều lệnh độc lập, không chờ khớp.
+
+        orders: list dict tham số như place_order (symbol, side, quantity, order_type, price,
+            reduce_only, stop_price, close_position, client_order_id, reference_price).
+        Lệnh được gom theo symbol; mỗi symbol gửi qua /fapi/v1/batchOrders (tối đa 5 lệnh/request)
+        nếu use_batch, các symbol chạy song song. Trả về kết quả từng lệnh theo đúng thứ tự đầu vào
+        (dict order hoặc None nếu lệnh thất bại).
+        """
+        results: List[Optional[Dict]] = [None] * len(orders)
+        groups: Dict[str, List[int]] = {}
+        prepared: Dict[int, Dict] = {}
+        for i, spec in enumerate(orders):
+            spec = dict(spec)
+            p = self._prepare(spec.pop("symbol"), spec.pop("side"), **spec)
+            if p is not None:
+                prepared[i] = p
+                groups.setdefault(p["symbol"], []).append(i)
+
+        def run_group(indexes):
+            return indexes, self._submit([prepared[i] for i in indexes], use_batch)
+
+        if len(groups) == 1:
+            done = [run_group(next(iter(groups.values())))]
+        else:
+            done = list(self._get_pool().map(run_group, groups.values()))
+        for indexes, group_results in done:
+            for i, result in zip(indexes, group_results):
+                results[i] = result
+        return results
+
+    def reverse_position(self, symbol: str, side: str, position_qty: float, quantity: float,
+                         reference_price: float = None):
+        """
+        Đảo vị thế trong một round trip: một lệnh MARKET khối lượng |vị thế| + quantity.
+        (Không gửi cặp đóng reduceOnly + mở trong batchOrders vì sàn không đảm bảo thứ tự khớp trong batch:
+        nếu lệnh mở khớp trước, lệnh reduceOnly bị từ chối và vị thế kết thúc ở 0.)
+        """
+        return self.place_order(symbol, side, abs(position_qty) + quantity, ORDER_TYPE_MARKET, timeout=0,
+                                reference_price=reference_price)
+
+    def open_with_brackets(
+        self,
+        symbol: str,
+        side: str,
+        quantity: float,
+        stop_loss: float = None,
+        take_profit: float = None,
+        order_type: str = ORDER_TYPE_MARKET,
+        price: float = None,
+        reference_price: float = None
+    ) -> List[Optional[Dict]]:
+        """
+        Lệnh vào + SL (STOP_MARKET) + TP (TAKE_PROFIT_MARKET) trong một request batchOrders.
+        SL/TP dùng closePosition nên đặt được trước khi lệnh vào khớp và đóng toàn bộ vị thế khi kích hoạt.
+        Trả về [entry, sl, tp] (phần tử None nếu không đặt hoặc thất bại).
+        """
+        exit_side = SIDE_SELL if side == SIDE_BUY else SIDE_BUY
+        specs = [{"symbol": symbol, "side": side, "quantity": quantity, "order_type": order_type, "price": price,
+                  "reference_price": reference_price}]
+        if stop_loss is not None:
+            specs.append({"symbol": symbol, "side": exit_side, "order_type": "STOP_MARKET",
+                          "stop_price": stop_loss, "close_position": True})
+        if take_profit is not None:
+            specs.append({"symbol": symbol, "side": exit_side, "order_type": "TAKE_PROFIT_MARKET",
+                          "stop_price": take_profit, "close_position": True})
+        results = self.place_orders(specs)
+        if results[0] is None and any(results[1:]):
+            # Lệnh vào thất bại: hủy SL/TP đã đặt
+            for order in results[1:]:
+                if order:
+                    self.cancel_order(symbol, order["orderId"])
+            return [None] * 3
+        results += [None] * (3 - len(results))
+        if stop_loss is None:
+            results = [results[0], None, results[1]]
+        return results
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="OrderExecutor")
+        return self._pool
+
+    @staticmethod
+    def _is_retryable(response) -> bool:
+        """Chỉ thử lại lỗi đường truyền và lỗi tạm thời của sàn; lệnh bị từ chối (-2019, -4164...) thì không."""
+        return response is TRANSPORT_ERROR or (
+            isinstance(response, dict) and response.get("code") in RETRYABLE_ERROR_CODES
+        )
+
+    def _send(self, batch: List[Dict], use_batch: bool) -> List:
+        """
+        Gửi một nhóm lệnh (một request): /order cho 1 lệnh, /batchOrders cho 2-5 lệnh.
+        Mỗi phần tử là order, body lỗi {"code", "msg"} của sàn, TRANSPORT_ERROR hoặc None (lỗi khác).
+        """
+        try:
+            if len(batch) == 1 or not use_batch:
+                return [self.api.place_order(**batch[0], return_errors=True)]
+            responses = self.api.place_batch_orders(
+                [self.api.build_order_params(**o) for o in batch], return_errors=True
+            )
+            return responses if isinstance(responses, list) else [responses] * len(batch)
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"[OrderExecutor] Lỗi đường truyền khi gửi lệnh: {e}")
+            return [TRANSPORT_ERROR] * len(batch)
+        except Exception as e:
+            logging.error(f"[OrderExecutor] Lỗi khi gửi lệnh: {e}")
+            return [None] * len(batch)
+
+    def _submit(self, orders: List[Dict], use_batch: bool) -> List[Optional[Dict]]:
+        """Gửi các lệnh cùng symbol với retry; lệnh lỗi tạm thời được tra theo clientOrderId rồi mới gửi lại."""
+        results: List[Optional[Dict]] = [None] * len(orders)
+        pending = list(range(len(orders)))
+        size = MAX_BATCH_ORDERS if use_batch else 1
+        for attempt in range(self.max_retries):
+            if attempt:
+                logging.info(f"[OrderExecutor] Thử lại lần {attempt+1} đặt {len(pending)} lệnh sau {self.retry_delay}s...")
+                time.sleep(self.retry_delay)
+                still_pending = []
+                for i in pending:
+                    results[i] = self._recover(orders[i])
+                    if results[i] is None:
+                        still_pending.append(i)
+                pending = still_pending
+            retry = []
+            for start in range(0, len(pending), size):
+                chunk = pending[start:start + size]
+                for i, response in zip(chunk, self._send([orders[i] for i in chunk], use_batch)):
+                    if isinstance(response, dict) and "orderId" in response:
+                        results[i] = response
+                    elif self._is_retryable(response):
+                        retry.append(i)
+                    else:
+                        logging.error(f"[OrderExecutor] Sàn từ chối lệnh {orders[i]['new_client_order_id']}: {response}")
+            pending = retry
+            if not pending:
+                return results
+        logging.error(f"[OrderExecutor] Đặt lệnh thất bại sau {self.max_retries} lần thử ({len(pending)} lệnh).")
+        return results
+
+    def cancel_order(self, symbol: str, order_id: int):
+        """
+        Hủy lệnh theo symbol và order_id.
+        Trả về kết quả hủy hoặc None nếu lỗi.
+        """
+        if not symbol or order_id <= 0:
+            logging.error(f"[OrderExecutor] cancel_order: symbol hoặc order_id không hợp lệ.")
+            return None
+        try:
+            result = self.api.cancel_order(symbol=symbol, order_id=order_id)
+            logging.info(f"[OrderExecutor] Hủy lệnh {order_id} thành công.")
+            return result
+        except Exception as e:
+            logging.error(f"[OrderExecutor] Lỗi khi hủy lệnh {order_id}: {e}")
+            return None
+
+    def check_order_status(self, symbol: str, order_id: int):
+        """
+        Lấy trạng thái lệnh từ Binance.
+        Trả về string trạng thái hoặc None nếu lỗi.
+        """
+        if not symbol or order_id <= 0:
+            logging.error(f"[OrderExecutor] check_order_status: symbol hoặc order_id không hợp lệ.")
+            return None
+        handle = self.tracker.get(order_id)
+        if handle is not None and handle.done:
+            return handle.status
+        try:
+            status = self.api.get_order_status(symbol, order_id)
+            logging.info(f"[OrderExecutor] Trạng thái lệnh {order_id}: {status}")
+            return status
+        except Exception as e:
+            logging.error(f"[OrderExecutor] Lỗi lấy trạng thái lệnh {order_id}: {e}")
+            return None
@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional
+
+from core.user_stream import UserDataStream
+
+FINAL_STATUSES = ("FILLED", "CANCELED", "REJECTED", "EXPIRED", "EXPIRED_IN_MATCH")
+
+
+def order_from_event(event: Dict) -> Dict:
+    """Chuyển sự kiện ORDER_TRADE_UPDATE sang dict cùng khóa với REST /fapi/v1/order."""
+    o = event["o"]
+    return {
+        "orderId": o["i"],
+        "symbol": o["s"],
+        "clientOrderId": o.get("c"),
+        "side": o.get("S"),
+        "type": o.get("o"),
+        "origQty": o.get("q"),
+        "price": o.get("p"),
+        "avgPrice": o.get("ap"),
+        "executedQty": o.get("z"),
+        "status": o["X"],
+        "executionType": o.get("x"),
+        "lastFilledQty": o.get("l"),
+        "lastFilledPrice": o.get("L"),
+        "updateTime": o.get("T") or event.get("E", 0),
+    }
+
+
+class OrderHandle:
+    """
+    Handle của một lệnh đang theo dõi.
+
+    `future` (concurrent.futures.Future) hoàn tất với dict lệnh cuối cùng khi lệnh về trạng thái
+    cuối (FILLED/CANCELED/REJECTED/EXPIRED). Có thể chờ bằng wait(), future.result(), hoặc
+    `await handle` trong code asyncio.
+    """
+
+    def __init__(self, symbol: str, order_id: int, client_order_id: Optional[str] = None):
+        self.symbol = symbol
+        self.order_id = order_id
+        self.client_order_id = client_order_id
+        self.status = "NEW"
+        self.executed_qty = 0.0
+        self.avg_price = 0.0
+        self.update_time = 0
+        self.order: Dict = {"symbol": symbol, "orderId": order_id, "status": "NEW"}
+        self.source: Optional[str] = None  # "stream" hoặc "rest": nguồn của cập nhật cuối
+        self.updated_at = time.monotonic()
+        self.resolved = False  # Đặt trong lock của OrderTracker khi về trạng thái cuối, trước set_result
+        self.future: Future = Future()
+
+    @property
+    def done(self) -> bool:
+        return self.future.done()
+
+    @property
+    def is_partially_filled(self) -> bool:
+        return self.status == "PARTIALLY_FILLED"
+
+    def wait(self, timeout: Optional[float] = None) -> str:
+        """Chờ lệnh về trạng thái cuối tối đa `timeout` giây (chỉ chờ sự kiện, không poll). Trả về status hiện tại."""
+        try:
+            self.future.result(timeout=timeout)
+        except FutureTimeout:
+            pass
+        return self.status
+
+    def result(self, timeout: Optional[float] = None) -> Dict:
+        return self.future.result(timeout=timeout)
+
+    def add_done_callback(self, fn: Callable[["OrderHandle"], None]):
+        self.future.add_done_callback(lambda _: fn(self))
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+
+    def _apply(self, update: Dict, source: str) -> bool:
+        """Áp dụng cập nhật (REST hoặc stream). Bỏ qua cập nhật cũ hơn trạng thái đang có."""
+        if self.done:
+            return False
+        executed = float(update.get("executedQty") or 0.0)
+        update_time = int(update.get("updateTime") or 0)
+        if executed < self.executed_qty or (update_time and update_time < self.update_time):
+            return False
+        self.order.update({k: v for k, v in update.items() if v is not None})
+        self.status = update.get("status", self.status)
+        self.executed_qty = executed
+        self.avg_price = float(update.get("avgPrice") or self.avg_price)
+        self.update_time = max(self.update_time, update_time)
+        self.client_order_id = update.get("clientOrderId") or self.client_order_id
+        self.source = source
+        self.updated_at = time.monotonic()
+        return True
+
+    def __repr__(self):
+        return f"OrderHandle({self.symbol}, {self.order_id}, {self.status}, filled={self.executed_qty})"
+
+
+class OrderTracker:
+    """
+    Theo dõi trạng thái lệnh bằng sự kiện ORDER_TRADE_UPDATE của user-data stream.
+
+    - track() trả về OrderHandle; khớp một phần, khớp hết, hủy... được cập nhật ngay khi sự kiện tới.
+    - Sự kiện có thể tới trước response REST của lệnh: được giữ tạm và áp dụng khi track().
+    - Polling REST chỉ là dự phòng: mỗi `poll_interval` giây khi không có stream (hoặc stream mất
+      kết nối), mỗi `fallback_interval` giây khi stream đang chạy mà lệnh lâu không có sự kiện.
+    - Stream kết nối lại: poll toàn bộ lệnh đang mở để bù sự kiện bị lỡ.
+    """
+
+    def __init__(
+        self,
+        api,
+        user_stream: Optional[UserDataStream] = None,
+        poll_interval: float = 0.5,
+        fallback_interval: float = 5.0,
+        max_buffered: int = 1000
+    ):
+        self.api = api
+        self.user_stream = user_stream
+        self.poll_interval = poll_interval
+        self.fallback_interval = fallback_interval
+        self.max_buffered = max_buffered
+        self._handles: Dict[int, OrderHandle] = {}
+        self._finished: "OrderedDict[int, OrderHandle]" = OrderedDict()
+        self._early: "OrderedDict[int, Dict]" = OrderedDict()  # Sự kiện của lệnh chưa track
+        self._lock = threading.Lock()
+        self.stats = {"events": 0, "polls": 0, "resolved_by_stream": 0, "resolved_by_poll": 0}
+        self.logger = logging.getLogger("OrderTracker")
+        if user_stream is not None:
+            user_stream.add_handler(self.on_event)
+            user_stream.add_on_connect(self.resync)
+
+    def _stream_live(self) -> bool:
+        return self.user_stream is not None and self.user_stream.connected
+
+    # ========== ĐĂNG KÝ LỆNH ==========
+
+    def track(self, symbol: str, order: Dict) -> OrderHandle:
+        """Bắt đầu theo dõi lệnh từ response đặt lệnh (cần có orderId)."""
+        order_id = int(order["orderId"])
+        with self._lock:
+            handle = self._handles.get(order_id) or self._finished.get(order_id)
+            if handle is not None:
+                return handle
+            handle = OrderHandle(symbol, order_id, order.get("clientOrderId"))
+            self._handles[order_id] = handle
+            early = self._early.pop(order_id, None)
+        self._apply(handle, order, "rest")
+        if early is not None:
+            self._apply(handle, early, "stream")
+        return handle
+
+    def get(self, order_id: int) -> Optional[OrderHandle]:
+        with self._lock:
+            return self._handles.get(order_id) or self._finished.get(order_id)
+
+    def open_handles(self) -> List[OrderHandle]:
+        with self._lock:
+            return list(self._handles.values())
+
+    # ========== CẬP NHẬT ==========
+
+    def _apply(self, handle: OrderHandle, update: Dict, source: str):
+        with self._lock:
+            # Hai luồng (stream + poll) cùng thấy trạng thái cuối: chỉ luồng đầu tiên set_result
+            if handle.resolved or not handle._apply(update, source) or handle.status not in FINAL_STATUSES:
+                return
+            handle.resolved = True
+            self._handles.pop(handle.order_id, None)
+            self._finished[handle.order_id] = handle
+            while len(self._finished) > self.max_buffered:
+                self._finished.popitem(last=False)
+            self.stats["resolved_by_stream" if source == "stream" else "resolved_by_poll"] += 1
+        # Callback của future chạy ngoài lock
+        handle.future.set_result(dict(handle.order))
+        self.logger.debug(f"[OrderTracker] Lệnh {handle.order_id} {handle.status} ({source})")
+
+    def on_event(self, event: Dict):
+        if event.get("e") != "ORDER_TRADE_UPDATE":
+            return
+        update = order_from_event(event)
+        order_id = int(update["orderId"])
+        with self._lock:
+            self.stats["events"] += 1
+            handle = self._handles.get(order_id)
+            if handle is None:
+                if order_id not in self._finished:
+                    self._early[order_id] = update
+                    while len(self._early) > self.max_buffered:
+                        self._early.popitem(last=False)
+                return
+        self._apply(handle, update, "stream")
+
+    def poll(self, handle: OrderHandle) -> bool:
+        """Lấy trạng thái lệnh qua REST (dự phòng). Trả về True nếu lấy được."""
+        self.stats["polls"] += 1
+        try:
+            order = self.api.get_order(handle.symbol, handle.order_id)
+        except Exception as e:
+            self.logger.warning(f"[OrderTracker] Lỗi poll lệnh {handle.order_id}: {e}")
+            return False
+        if not order:
+            return False
+        self._apply(handle, order, "rest")
+        return True
+
+    def resync(self):
+        """Poll mọi lệnh đang mở (gọi khi stream kết nối lại)."""
+        for handle in self.open_handles():
+            self.poll(handle)
+
+    # ========== CHỜ / HỦY ==========
+
+    def wait(self, handle: OrderHandle, timeout: float) -> str:
+        """
+        Chờ lệnh về trạng thái cuối tối đa `timeout` giây; sự kiện stream đánh thức ngay,
+        poll REST chỉ khi lệnh không có cập nhật trong một khoảng poll. Trả về status hiện tại.
+        """
+        deadline = time.monotonic() + timeout
+        while not handle.done:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            interval = self.fallback_interval if self._stream_live() else self.poll_interval
+            handle.wait(min(remaining, interval))
+            if not handle.done and time.monotonic() - handle.updated_at >= interval:
+                self.poll(handle)
+        return handle.status
+
+    def cancel(self, handle: OrderHandle) -> Optional[Dict]:
+        """Hủy lệnh; response hủy được áp dụng ngay vào handle."""
+        try:
+            result = self.api.cancel_order(handle.symbol, handle.order_id)
+        except Exception as e:
+            self.logger.error(f"[OrderTracker] Lỗi hủy lệnh {handle.order_id}: {e}")
+            return None
+        if result:
+            self._apply(handle, result, "rest")
+        else:
+            # Hủy thất bại thường do lệnh vừa khớp: lấy trạng thái thật
+            self.poll(handle)
+        return result
@@ -20,6 +20,9 @@ class PositionManager:
         """Lấy thông tin vị thế hiện tại từ sàn và cập nhật nội bộ."""
         try:
             pos = self.api.get_position(self.symbol)
+            if isinstance(pos, list):
+                # positionRisk trả về list, chọn đúng symbol
+                pos = next((p for p in pos if p.get('symbol') == self.symbol), None)
             if pos:
                 self.position = pos
                 logging.info(f"[PositionManager] Cập nhật vị thế: {pos}")
@@ -0,0 +1,292 @@
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+# Lane ưu tiên: số nhỏ được phục vụ trước
+LANE_ORDER = 0        # Đặt/hủy lệnh, đòn bẩy, margin type
+LANE_ACCOUNT = 1      # Đọc tài khoản/vị thế/lệnh (request ký dạng GET)
+LANE_MARKET_DATA = 2  # Nến, order book, exchangeInfo...
+LANE_NAMES = {LANE_ORDER: "order", LANE_ACCOUNT: "account", LANE_MARKET_DATA: "market_data"}
+
+# Request weight của Binance USDⓈ-M Futures theo (method, path); giá trị là số hoặc hàm(params)
+ENDPOINT_WEIGHTS = {
+    ("GET", "/fapi/v1/ping"): 1,
+    ("GET", "/fapi/v1/time"): 1,
+    ("GET", "/fapi/v1/exchangeInfo"): 1,
+    ("GET", "/fapi/v1/klines"): lambda p: _klines_weight(int(p.get("limit", 500))),
+    ("GET", "/fapi/v1/depth"): lambda p: _depth_weight(int(p.get("limit", 500))),
+    ("GET", "/fapi/v1/ticker/price"): lambda p: 1 if "symbol" in p else 2,
+    ("GET", "/fapi/v2/account"): 5,
+    ("GET", "/fapi/v2/positionRisk"): 5,
+    ("GET", "/fapi/v2/balance"): 5,
+    ("GET", "/fapi/v1/order"): 1,
+    ("GET", "/fapi/v1/openOrders"): lambda p: 1 if "symbol" in p else 40,
+    ("GET", "/fapi/v1/positionSide/dual"): 30,
+    ("POST", "/fapi/v1/positionSide/dual"): 1,
+    ("POST", "/fapi/v1/order"): 1,
+    ("DELETE", "/fapi/v1/order"): 1,
+    ("POST", "/fapi/v1/batchOrders"): 5,
+    ("DELETE", "/fapi/v1/batchOrders"): 1,
+    ("DELETE", "/fapi/v1/allOpenOrders"): 1,
+    ("POST", "/fapi/v1/leverage"): 1,
+    ("POST", "/fapi/v1/marginType"): 1,
+    ("POST", "/fapi/v1/listenKey"): 1,
+    ("PUT", "/fapi/v1/listenKey"): 1,
+}
+
+
+def _klines_weight(limit: int) -> int:
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def _depth_weight(limit: int) -> int:
+    if limit <= 50:
+        return 2
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 10
+    return 20
+
+
+def endpoint_weight(method: str, path: str, params: Optional[dict] = None) -> int:
+    weight = ENDPOINT_WEIGHTS.get((method, path), 1)
+    return weight(params or {}) if callable(weight) else weight
+
+
+def default_lane(method: str, path: str, signed: bool) -> int:
+    if method in ("POST", "DELETE", "PUT") and not path.endswith("/listenKey"):
+        return LANE_ORDER
+    if signed:
+        return LANE_ACCOUNT
+    return LANE_MARKET_DATA
+
+
+def order_count(method: str, path: str, params: Optional[dict] = None) -> int:
+    """Số lệnh mới tính vào giới hạn ORDERS (chỉ lệnh đặt mới, không tính hủy)."""
+    if method != "POST":
+        return 0
+    if path == "/fapi/v1/order":
+        return 1
+    if path == "/fapi/v1/batchOrders":
+        try:
+            return len(json.loads((params or {}).get("batchOrders", "[]")))
+        except (TypeError, ValueError):
+            return 5
+    return 0
+
+
+class FixedWindow:
+    """
+    Bộ đếm theo cửa sổ cố định như sàn: `used` về 0 ở mỗi mốc `window` giây của đồng hồ
+    (đầu phút cho 1M, mốc 10 giây cho 10S), không nạp dần giữa cửa sổ.
+    """
+
+    def __init__(self, capacity: float, window: float, clock=time.time):
+        self.capacity = capacity
+        self.window = window
+        self.clock = clock
+        self.used = 0.0
+        self.start = self.window_start(clock())
+
+    def window_start(self, at: float) -> float:
+        return at - at % self.window
+
+    def roll(self, now: float):
+        start = self.window_start(now)
+        if start != self.start:
+            self.start, self.used = start, 0.0
+
+    @property
+    def remaining(self) -> float:
+        return self.capacity - self.used
+
+    def wait_time(self, amount: float, reserve: float = 0.0, now: Optional[float] = None) -> float:
+        """Thời gian cần chờ để lấy `amount` mà vẫn còn lại ít nhất `reserve`: 0 hoặc tới hết cửa sổ."""
+        if self.used + amount + reserve <= self.capacity:
+            return 0.0
+        now = self.clock() if now is None else now
+        return max(0.0, self.start + self.window - now)
+
+    def sync_used(self, used: float, at: Optional[float] = None):
+        """
+        Đồng bộ với số đã dùng sàn báo về (header), giữ tới khi hết cửa sổ. Header của request
+        gửi từ cửa sổ trước (`at`) thì bỏ qua, để con số cũ không chặn cả cửa sổ mới.
+        """
+        if at is not None and self.window_start(at) != self.start:
+            return
+        self.used = max(self.used, used)
+
+
+class RateLimiter:
+    """
+    Lập lịch request theo request weight và giới hạn số lệnh của Binance Futures.
+
+    - Cửa sổ cố định cho REQUEST_WEIGHT (phút) và ORDERS (10 giây, phút) như cách sàn đếm, đồng bộ từ header
+      X-MBX-USED-WEIGHT-1M / X-MBX-ORDER-COUNT-10S / X-MBX-ORDER-COUNT-1M.
+    - Lane ưu tiên: lệnh/hủy lệnh đi trước đọc tài khoản, đọc tài khoản đi trước dữ liệu thị trường.
+      Lane thấp hơn phải chừa lại `reserve_fraction` weight cho lane lệnh, nên một đợt backfill
+      nến không thể dùng hết ngân sách lúc close_position cần gửi lệnh.
+    - 429/418: chặn mọi lane tới hết Retry-After.
+    - Thống kê thời gian chờ trong hàng đợi theo lane (stats).
+    """
+
+    def __init__(
+        self,
+        weight_limit: int = 2400,
+        orders_per_10s: int = 300,
+        orders_per_minute: int = 1200,
+        reserve_fraction: float = 0.2,
+        latency_window: int = 1024,
+        clock=time.time
+    ):
+        self.clock = clock
+        self.weight = FixedWindow(weight_limit, 60.0, clock)
+        self.orders_10s = FixedWindow(orders_per_10s, 10.0, clock)
+        self.orders_1m = FixedWindow(orders_per_minute, 60.0, clock)
+        # Weight phải chừa lại theo lane: lane lệnh dùng được hết, lane dữ liệu chừa nhiều nhất
+        self.reserves = {
+            LANE_ORDER: 0.0,
+            LANE_ACCOUNT: weight_limit * reserve_fraction / 2,
+            LANE_MARKET_DATA: weight_limit * reserve_fraction,
+        }
+        self.blocked_until = 0.0
+        self._cond = threading.Condition()
+        self._queue = []  # heap (lane, seq); vé hết hạn chờ chỉ đánh dấu trong _cancelled, bỏ khi lên đầu heap
+        self._cancelled = set()
+        self._seq = itertools.count()
+        self._waits = {lane: deque(maxlen=latency_window) for lane in LANE_NAMES}
+        self.counters = {lane: {"requests": 0, "weight": 0, "waited": 0} for lane in LANE_NAMES}
+        self.bans = 0
+        self.logger = logging.getLogger("RateLimiter")
+
+    # ========== CẤP PHÉP ==========
+
+    def _wait_needed(self, lane: int, weight: int, orders: int) -> float:
+        now = self.clock()
+        for bucket in (self.weight, self.orders_10s, self.orders_1m):
+            bucket.roll(now)
+        wait = max(0.0, self.blocked_until - time.monotonic())
+        wait = max(wait, self.weight.wait_time(weight, self.reserves[lane], now))
+        if orders:
+            wait = max(wait, self.orders_10s.wait_time(orders, now=now), self.orders_1m.wait_time(orders, now=now))
+        return wait
+
+    def _head(self):
+        while self._queue and self._queue[0] in self._cancelled:
+            self._cancelled.discard(heapq.heappop(self._queue))
+        return self._queue[0] if self._queue else None
+
+    def acquire(self, method: str, path: str, params: Optional[dict] = None,
+                signed: bool = False, lane: Optional[int] = None, timeout: Optional[float] = None) -> float:
+        """
+        Chờ tới lượt và trừ weight/lệnh cho request. Trả về thời gian đã chờ (giây).
+        Raise TimeoutError nếu chờ quá `timeout`.
+        """
+        lane = default_lane(method, path, signed) if lane is None else lane
+        weight = endpoint_weight(method, path, params)
+        orders = order_count(method, path, params)
+        started = time.monotonic()
+        ticket = (lane, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    wait = self._wait_needed(lane, weight, orders)
+                    # Chỉ request đứng đầu hàng (ưu tiên cao nhất, đến trước) mới được lấy quota
+                    at_head = self._head() == ticket
+                    if at_head and wait <= 0:
+                        break
+                    if timeout is not None and time.monotonic() - started + min(wait, 0.05) > timeout:
+                        raise TimeoutError(f"Chờ rate limit quá {timeout}s cho {method} {path}")
+                    self._cond.wait(timeout=min(wait, 0.5) if at_head else 0.5)
+                heapq.heappop(self._queue)
+                self.weight.used += weight
+                if orders:
+                    self.orders_10s.used += orders
+                    self.orders_1m.used += orders
+            except BaseException:
+                self._cancelled.add(ticket)
+                raise
+            finally:
+                self._cond.notify_all()
+
+            waited = time.monotonic() - started
+            self._waits[lane].append(waited)
+            counter = self.counters[lane]
+            counter["requests"] += 1
+            counter["weight"] += weight
+            if waited > 0.001:
+                counter["waited"] += 1
+        return waited
+
+    # ========== ĐỒNG BỘ TỪ SÀN ==========
+
+    def update_from_headers(self, headers, status_code: int = 200, sent_at: Optional[float] = None):
+        """
+        Đồng bộ bộ đếm với header sàn trả về; 429/418 chặn mọi request tới hết Retry-After.
+        sent_at: thời điểm gửi request (theo clock); header của cửa sổ đã qua thì bỏ qua.
+        """
+        with self._cond:
+            now = time.monotonic()
+            for bucket in (self.weight, self.orders_10s, self.orders_1m):
+                bucket.roll(self.clock())
+            for header, bucket in (
+                ("X-MBX-USED-WEIGHT-1M", self.weight),
+                ("X-MBX-ORDER-COUNT-10S", self.orders_10s),
+                ("X-MBX-ORDER-COUNT-1M", self.orders_1m),
+            ):
+                value = headers.get(header)
+                if value is not None:
+                    try:
+                        bucket.sync_used(float(value), sent_at)
+                    except ValueError:
+                        pass
+            if status_code in (418, 429):
+                try:
+                    retry_after = float(headers.get("Retry-After", 60))
+                except ValueError:
+                    retry_after = 60.0
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                self.bans += 1
+                self.logger.warning(f"[RateLimiter] HTTP {status_code}, tạm dừng mọi request {retry_after:.0f}s")
+            self._cond.notify_all()
+
+    # ========== THỐNG KÊ ==========
+
+    def stats(self) -> Dict:
+        with self._cond:
+            now = self.clock()
+            for bucket in (self.weight, self.orders_10s, self.orders_1m):
+                bucket.roll(now)
+            out = {
+                "weight_available": round(self.weight.remaining, 2),
+                "orders_10s_available": round(self.orders_10s.remaining, 2),
+                "orders_1m_available": round(self.orders_1m.remaining, 2),
+                "queued": len(self._queue) - len(self._cancelled),
+                "blocked_for": max(0.0, self.blocked_until - time.monotonic()),
+                "bans": self.bans,
+            }
+            for lane, name in LANE_NAMES.items():
+                waits = sorted(self._waits[lane])
+                lane_stats = dict(self.counters[lane])
+                if waits:
+                    lane_stats.update({
+                        "wait_avg_ms": sum(waits) / len(waits) * 1000,
+                        "wait_p99_ms": waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000,
+                        "wait_max_ms": waits[-1] * 1000,
+                    })
+                out[name] = lane_stats
+        return out
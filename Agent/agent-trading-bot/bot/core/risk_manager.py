@@ -0,0 +1,30 @@
+import logging
+from typing import Dict, Optional
+
+
+class RiskManager:
+    """
+    Kiểm tra trước khi vào lệnh (TradingBot.evaluate_risk).
+
+    Mặc định chỉ chặn hành động không hợp lệ hoặc snapshot không có nến; các ngưỡng khác bật qua tham số:
+        max_range_pct: chặn khi biên độ (high - low) / close của nến cuối lớn hơn ngưỡng (nến biến động mạnh).
+    """
+
+    def __init__(self, max_range_pct: Optional[float] = None):
+        self.max_range_pct = max_range_pct
+        self.logger = logging.getLogger("RiskManager")
+
+    def evaluate(self, market_snapshot: Optional[Dict], action: str, current_position=None, symbol: str = None) -> bool:
+        if action not in ("BUY", "SELL"):
+            return False
+        candles = (market_snapshot or {}).get("candles")
+        if not candles:
+            self.logger.warning(f"[RiskManager] {symbol}: không có nến, chặn {action}")
+            return False
+        last = candles[-1]
+        if self.max_range_pct is not None and last["close"] > 0:
+            range_pct = (last["high"] - last["low"]) / last["close"]
+            if range_pct > self.max_range_pct:
+                self.logger.info(f"[RiskManager] {symbol}: biên độ nến {range_pct:.4f} > {self.max_range_pct}, chặn {action}")
+                return False
+        return True
@@ -0,0 +1,261 @@
+import hashlib
+import hmac
+import logging
+import string
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote_plus
+
+import requests
+
+from core.metrics import API_ERRORS
+from core.rate_limiter import LANE_MARKET_DATA
+from core.transport import HttpTransport
+
+# Lỗi -1021: timestamp ngoài recvWindow (đồng hồ lệch hoặc request tới chậm)
+TIMESTAMP_ERROR_CODE = -1021
+LATENCY_STAGES = ("sign_ms", "queue_ms", "network_ms", "exchange_ms", "total_ms")
+# Endpoint tính là "lệnh" khi ghi độ trễ theo giai đoạn
+ORDER_PATHS = ("/fapi/v1/order", "/fapi/v1/batchOrders")
+
+
+_SAFE_CHARS = frozenset(string.ascii_letters + string.digits + "_.-~")
+
+
+def encode_params(params: Dict) -> str:
+    """
+    Giống urlencode(params) nhưng bỏ qua quote_plus cho giá trị chỉ gồm ký tự an toàn
+    (symbol, số lượng, giá, timestamp...), là phần tốn thời gian nhất khi ký.
+    """
+    parts = []
+    for key, value in params.items():
+        value = value if isinstance(value, str) else str(value)
+        parts.append(f"{key}={value if _SAFE_CHARS.issuperset(value) else quote_plus(value)}")
+    return "&".join(parts)
+
+
+def error_code(response) -> Optional[int]:
+    """Mã lỗi Binance trong body response lỗi ({"code": -1021, "msg": ...}), None nếu không đọc được."""
+    try:
+        return response.json().get("code")
+    except Exception:
+        return None
+
+
+class RequestSigner:
+    """
+    Ký request cho Binance Futures.
+
+    - HMAC-SHA256 khởi tạo khóa một lần; mỗi request chỉ copy trạng thái đã có khóa rồi update
+      query string, không dựng lại ipad/opad từ secret.
+    - Query string được encode một lần và gửi nguyên văn (transport không encode lại).
+    - Offset đồng hồ với /fapi/v1/time đo bằng mẫu có RTT nhỏ nhất trong mỗi lần sync
+      (ước lượng offset = serverTime - (lúc gửi + RTT/2)); luồng nền sync lại mỗi `sync_interval` giây.
+    - recvWindow thích ứng: `recv_window_factor` x (RTT p99 + sai số offset), kẹp trong
+      [min_recv_window, max_recv_window].
+    - Ghi lại thời gian từng giai đoạn của mỗi lệnh (ký, chờ rate limit, mạng, sàn xử lý).
+    """
+
+    def __init__(
+        self,
+        api_secret: str,
+        transport: Optional[HttpTransport] = None,
+        sync_interval: float = 60.0,
+        sync_samples: int = 5,
+        min_recv_window: int = 1000,
+        max_recv_window: int = 60000,
+        default_recv_window: int = 5000,
+        recv_window_factor: float = 3.0,
+        latency_window: int = 1024
+    ):
+        self._mac = hmac.new(api_secret.encode("utf-8"), digestmod=hashlib.sha256)
+        self.transport = transport
+        self.sync_interval = sync_interval
+        self.sync_samples = sync_samples
+        self.min_recv_window = min_recv_window
+        self.max_recv_window = max_recv_window
+        self.recv_window = default_recv_window
+        self.recv_window_factor = recv_window_factor
+        self.offset_ms = 0.0
+        self.offset_error_ms = 0.0  # Nửa RTT của mẫu tốt nhất: offset có thể sai tới mức này
+        self.synced_at = 0.0
+        self._rtts: deque = deque(maxlen=256)
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"signed": 0, "syncs": 0, "timestamp_errors": 0}
+        self.logger = logging.getLogger("RequestSigner")
+
+    # ========== ĐỒNG HỒ SÀN ==========
+
+    def sync_time(self) -> bool:
+        """Đo offset đồng hồ sàn: lấy mẫu có RTT nhỏ nhất trong `sync_samples` lần gọi /fapi/v1/time."""
+        if self.transport is None:
+            return False
+        best: Optional[Tuple[float, float]] = None  # (rtt_ms, offset_ms)
+        for _ in range(self.sync_samples):
+            try:
+                sent = time.time() * 1000
+                response = self.transport.request("GET", "/fapi/v1/time", retries=0, lane=LANE_MARKET_DATA,
+                                                  client="signer")
+                received = time.time() * 1000
+                server_time = response.json()["serverTime"]
+            except Exception as e:
+                self.logger.warning(f"[Signer] Lỗi đồng bộ thời gian: {e}")
+                continue
+            rtt = received - sent
+            with self._lock:
+                self._rtts.append(rtt)
+            if best is None or rtt < best[0]:
+                best = (rtt, server_time - (sent + rtt / 2))
+        if best is None:
+            return False
+        with self._lock:
+            self.offset_error_ms = best[0] / 2
+            self.offset_ms = best[1]
+            self.synced_at = time.monotonic()
+            self._update_recv_window()
+            self.stats["syncs"] += 1
+        self.logger.debug(f"[Signer] offset {self.offset_ms:.1f}ms, RTT {best[0]:.1f}ms, recvWindow {self.recv_window}")
+        return True
+
+    def _update_recv_window(self):
+        # Gọi trong self._lock: mọi chỗ thêm vào _rtts cũng giữ lock nên sorted không gặp deque đang đổi
+        if not self._rtts:
+            return
+        rtts = sorted(self._rtts)
+        p99 = rtts[min(len(rtts) - 1, int(len(rtts) * 0.99))]
+        window = self.recv_window_factor * (p99 + self.offset_error_ms)
+        self.recv_window = int(min(self.max_recv_window, max(self.min_recv_window, window)))
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            self.sync_time()
+
+    def start(self):
+        """Đồng bộ ngay rồi chạy luồng nền đồng bộ định kỳ."""
+        self.sync_time()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sync_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def timestamp(self) -> int:
+        """Thời gian sàn ước lượng (ms)."""
+        return int(time.time() * 1000 + self.offset_ms)
+
+    def on_timestamp_error(self):
+        """Sàn trả -1021: đồng bộ lại ngay trước khi ký lại."""
+        self.stats["timestamp_errors"] += 1
+        self.logger.warning("[Signer] Sàn báo timestamp ngoài recvWindow, đồng bộ lại đồng hồ")
+        self.sync_time()
+
+    # ========== KÝ ==========
+
+    def signature(self, query_string: str) -> str:
+        mac = self._mac.copy()
+        mac.update(query_string.encode("utf-8"))
+        return mac.hexdigest()
+
+    def sign(self, params: Optional[Dict] = None) -> Tuple[Dict, str, float]:
+        """
+        Thêm timestamp/recvWindow/signature vào params.
+        Trả về (params, query string đã ký để gửi nguyên văn, thời gian ký ms).
+        """
+        started = time.perf_counter()
+        params = dict(params or {})
+        params["recvWindow"] = self.recv_window
+        params["timestamp"] = self.timestamp()
+        query = encode_params(params)
+        params["signature"] = self.signature(query)
+        query = f"{query}&signature={params['signature']}"
+        self.stats["signed"] += 1
+        return params, query, (time.perf_counter() - started) * 1000
+
+    # ========== GỬI REQUEST ==========
+
+    def send(self, transport: HttpTransport, method: str, path: str, params: Optional[Dict] = None,
+             headers: Optional[Dict] = None, client: str = "api", signed: bool = False):
+        """
+        Gửi request qua `transport` và trả về body JSON (dùng chung cho BinanceAPI và BinanceFuturesAPI).
+        Request ký được ký lại mỗi lần transport gửi, kể cả thử lại, nên timestamp luôn mới; sàn báo -1021
+        thì đồng bộ đồng hồ rồi gửi lại một lần (sàn chưa nhận request nên gửi lại an toàn).
+        HTTPError được đếm vào API_ERRORS theo `client` rồi raise; lỗi đường truyền raise nguyên trạng.
+        """
+        params = params or {}
+        signed_state = {}
+
+        def sign():
+            sent_params, query, sign_ms = self.sign(params)
+            signed_state.update(params=sent_params, sign_ms=sign_ms)
+            return sent_params, query
+
+        for attempt in range(2):
+            try:
+                response = transport.request(method, path, params=params, headers=headers, client=client,
+                                             sign=sign if signed else None)
+            except requests.exceptions.HTTPError as e:
+                code = error_code(e.response)
+                if transport.metrics is not None:
+                    transport.metrics.inc(API_ERRORS, (client, path, str(code)))
+                if signed and attempt == 0 and code == TIMESTAMP_ERROR_CODE:
+                    self.on_timestamp_error()
+                    continue
+                raise
+            body = response.json()
+            if signed and path in ORDER_PATHS:
+                self.record_latency(path, signed_state["sign_ms"], response.timing,
+                                    signed_state["params"]["timestamp"], body)
+            return body
+
+    # ========== ĐỘ TRỄ ==========
+
+    def record_latency(self, path: str, sign_ms: float, timing: Dict, sent_server_ms: int, body) -> Dict:
+        """
+        Tách thời gian một lệnh theo giai đoạn.
+        timing: từ response.timing của HttpTransport (queue_ms, http_ms).
+        sent_server_ms: timestamp đã ký của lần gửi cuối (giờ sàn, lúc ký, sau khi chờ rate limit).
+        exchange_ms: ước lượng = updateTime của lệnh - timestamp - ký - nửa RTT tốt nhất;
+            phần còn lại của http_ms tính là mạng.
+        """
+        queue_ms = timing.get("queue_ms", 0.0)
+        http_ms = timing.get("http_ms", 0.0)
+        exchange_ms = 0.0
+        update_time = body.get("updateTime") if isinstance(body, dict) else None
+        if update_time:
+            elapsed = update_time - sent_server_ms - sign_ms - self.offset_error_ms
+            exchange_ms = min(http_ms, max(0.0, elapsed))
+        breakdown = {
+            "path": path,
+            "sign_ms": sign_ms,
+            "queue_ms": queue_ms,
+            "network_ms": http_ms - exchange_ms,
+            "exchange_ms": exchange_ms,
+            "total_ms": sign_ms + queue_ms + http_ms,
+        }
+        with self._lock:
+            self._latencies.append(breakdown)
+            if http_ms > 0:
+                self._rtts.append(http_ms - exchange_ms)
+        return breakdown
+
+    def latency_stats(self) -> Dict:
+        """p50/p99/max (ms) của từng giai đoạn trên các lệnh gần nhất."""
+        with self._lock:
+            records = list(self._latencies)
+        out = {"orders": len(records), "offset_ms": self.offset_ms, "recv_window": self.recv_window}
+        for stage in LATENCY_STAGES:
+            values = sorted(r[stage] for r in records)
+            if values:
+                out[stage] = {
+                    "p50": values[len(values) // 2],
+                    "p99": values[min(len(values) - 1, int(len(values) * 0.99))],
+                    "max": values[-1],
+                }
+        return out
@@ -0,0 +1,319 @@
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.metrics import (
+    MetricsRegistry, default_metrics, HTTP_REQUESTS, HTTP_DURATION, HTTP_QUEUE, HTTP_RETRIES, HTTP_ERRORS,
+    HTTP_SENT_BYTES, HTTP_RECEIVED_BYTES, RATE_LIMIT_USED, RATE_LIMIT_AVAILABLE, RATE_LIMIT_QUEUED
+)
+from core.rate_limiter import RateLimiter
+
+BINANCE_FUTURES_URL = "https://fapi.binance.com"
+
+# Timeout (giây) theo endpoint; endpoint không có trong bảng dùng default_timeout
+DEFAULT_ENDPOINT_TIMEOUTS = {
+    "/fapi/v1/order": 5.0,
+    "/fapi/v1/batchOrders": 5.0,
+    "/fapi/v1/leverage": 5.0,
+    "/fapi/v1/marginType": 5.0,
+    "/fapi/v2/positionRisk": 5.0,
+    "/fapi/v2/account": 5.0,
+    "/fapi/v1/klines": 10.0,
+    "/fapi/v1/exchangeInfo": 15.0,
+}
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Header giới hạn của sàn -> label "limit" của gauge binance_rate_limit_used
+RATE_LIMIT_HEADERS = (
+    ("X-MBX-USED-WEIGHT-1M", "weight_1m"),
+    ("X-MBX-ORDER-COUNT-10S", "orders_10s"),
+    ("X-MBX-ORDER-COUNT-1M", "orders_1m"),
+)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Circuit breaker đang mở: request bị chặn ngay, không gửi lên sàn."""
+
+
+class CircuitBreaker:
+    """
+    Ngắt mạch khi sàn lỗi liên tiếp (timeout, mất kết nối, 5xx).
+    closed -> open sau `failure_threshold` lỗi liên tiếp; sau `reset_timeout` giây cho đúng một
+    request thử (half_open), các request khác bị chặn tới khi request thử có kết quả: thành công
+    thì đóng lại, lỗi thì mở tiếp. Request thử treo quá `reset_timeout` thì cho request khác thử.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open":
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+            elif self.probe_started is not None and now - self.probe_started < self.reset_timeout:
+                return False
+            self.probe_started = now
+            return True
+
+    def release(self):
+        """Request thử không được gửi (lỗi trước khi gửi): nhường lượt thử cho request sau."""
+        with self._lock:
+            if self.state == "half_open":
+                self.probe_started = None
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = "closed"
+            self.probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logging.warning(f"[CircuitBreaker] Mở mạch sau {self.failures} lỗi liên tiếp")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.probe_started = None
+
+
+class HttpTransport:
+    """
+    Tầng HTTP dùng chung cho BinanceAPI, BinanceFuturesAPI và BinanceFuturesCollector.
+
+    - Một requests.Session keep-alive với pool kết nối cấu hình được: request ký (đặt lệnh)
+      chỉ tốn một round trip khi kết nối đã ấm (xem warm_up).
+    - Timeout theo endpoint.
+    - Retry với backoff + jitter: GET retry khi lỗi mạng/429/5xx; POST/DELETE chỉ retry khi
+      chưa kết nối được (ConnectTimeout), tránh gửi trùng lệnh.
+    - Circuit breaker chặn request khi sàn lỗi liên tiếp.
+    - RateLimiter (tùy chọn) xếp lịch theo request weight, lane lệnh được ưu tiên.
+    - Metric mỗi lần gửi (core.metrics): độ trễ theo endpoint, lỗi, retry, byte, giới hạn đã dùng;
+      label `client` do bên gọi truyền (api, futures_api, collector...). metrics=None để tắt.
+    """
+
+    def __init__(
+        self,
+        base_url: str = BINANCE_FUTURES_URL,
+        pool_size: int = 10,
+        default_timeout: float = 10.0,
+        endpoint_timeouts: Optional[Dict[str, float]] = None,
+        max_retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        rate_limiter: Optional[RateLimiter] = None,
+        metrics: Optional[MetricsRegistry] = default_metrics
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.default_timeout = default_timeout
+        self.endpoint_timeouts = dict(DEFAULT_ENDPOINT_TIMEOUTS)
+        if endpoint_timeouts:
+            self.endpoint_timeouts.update(endpoint_timeouts)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        if metrics is not None and rate_limiter is not None:
+            metrics.add_collector(self._collect_metrics)
+        self.session = requests.Session()
+        self.pool_size = 0
+        self.resize_pool(pool_size)
+        self.logger = logging.getLogger("HttpTransport")
+
+    def resize_pool(self, pool_size: int):
+        """Mount lại adapter với pool lớn hơn (ví dụ khi collector cần nhiều luồng backfill)."""
+        if pool_size <= self.pool_size:
+            return
+        # Retry do transport tự xử lý, adapter không retry
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        old_adapters = {self.session.adapters.get(prefix) for prefix in ("https://", "http://")}
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Đóng pool cũ, không để kết nối keep-alive của adapter bị thay treo lại tới khi GC
+        for old in old_adapters:
+            if old is not None:
+                old.close()
+        self.pool_size = pool_size
+
+    def timeout_for(self, path: str) -> float:
+        return self.endpoint_timeouts.get(path, self.default_timeout)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Thời gian chờ trước lần thử lại; Retry-After của sàn cũng bị kẹp ở backoff_max."""
+        if retry_after:
+            try:
+                return min(self.backoff_max, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        # Full jitter: ngẫu nhiên trong [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    # ========== METRIC ==========
+
+    def _record_response(self, client: str, method: str, path: str, response: requests.Response, seconds: float):
+        metrics = self.metrics
+        status = response.status_code
+        metrics.inc(HTTP_REQUESTS, (client, method, path, str(status)))
+        metrics.observe(HTTP_DURATION, (client, method, path), seconds)
+        request = response.request
+        metrics.inc(HTTP_SENT_BYTES, (client, path), len(request.url) + len(request.body or b""))
+        metrics.inc(HTTP_RECEIVED_BYTES, (client, path), len(response.content))
+        if status >= 400:
+            metrics.inc(HTTP_ERRORS, (client, method, path, str(status)))
+        headers = response.headers
+        for header, limit in RATE_LIMIT_HEADERS:
+            value = headers.get(header)
+            if value is not None:
+                metrics.set_gauge(RATE_LIMIT_USED, (self.base_url, limit), float(value))
+
+    def _record_exception(self, client: str, method: str, path: str, error: Exception, seconds: float):
+        self.metrics.inc(HTTP_REQUESTS, (client, method, path, "error"))
+        self.metrics.observe(HTTP_DURATION, (client, method, path), seconds)
+        self.metrics.inc(HTTP_ERRORS, (client, method, path, type(error).__name__))
+
+    def _collect_metrics(self):
+        stats = self.rate_limiter.stats()
+        for limit in ("weight", "orders_10s", "orders_1m"):
+            yield RATE_LIMIT_AVAILABLE, (self.base_url, limit), stats[f"{limit}_available"]
+        yield RATE_LIMIT_QUEUED, (self.base_url,), stats["queued"]
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        lane: Optional[int] = None,
+        query: Optional[str] = None,
+        client: str = "other",
+        sign: Optional[Callable[[], Tuple[dict, str]]] = None
+    ) -> requests.Response:
+        """
+        Gửi request, trả về Response đã raise_for_status.
+        lane: lane ưu tiên của rate limiter (mặc định suy ra từ method/path).
+        query: query string đã encode (request ký) gửi nguyên văn; params khi đó chỉ dùng tính weight.
+        client: label `client` của metric (bên gọi: api, futures_api, collector...).
+        sign: hàm trả về (params đã ký, query string) gọi lại trước mỗi lần gửi, sau khi chờ rate limit;
+            lần thử lại mang timestamp mới thay vì gửi lại chữ ký cũ. params khi đó chỉ dùng tính weight.
+        response.timing: {"queue_ms": thời gian chờ rate limit, "http_ms": round trip của lần gửi cuối, "attempts"}.
+        Raise requests.exceptions.RequestException (HTTPError, CircuitOpenError...) khi thất bại.
+        """
+        if method not in ("GET", "POST", "PUT", "DELETE"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        url = self.base_url + path
+        timeout = timeout or self.timeout_for(path)
+        retries = self.max_retries if retries is None else retries
+        idempotent = method == "GET"
+
+        metrics = self.metrics
+        attempt = 0
+        queue_ms = 0.0
+        while True:
+            if not self.breaker.allow():
+                if metrics is not None:
+                    metrics.inc(HTTP_ERRORS, (client, method, path, "circuit_open"))
+                raise CircuitOpenError(f"Circuit breaker đang mở, bỏ qua {method} {path}")
+            try:
+                if self.rate_limiter is not None:
+                    signed = sign is not None or (bool(params) and "signature" in params)
+                    waited = self.rate_limiter.acquire(method, path, params, signed=signed, lane=lane)
+                    queue_ms += waited * 1000
+                    if metrics is not None:
+                        metrics.observe(HTTP_QUEUE, (client, path), waited)
+                if sign is not None:
+                    params, query = sign()
+            except BaseException:
+                self.breaker.release()
+                raise
+            sent = time.perf_counter()
+            sent_at = self.rate_limiter.clock() if self.rate_limiter is not None else None
+            try:
+                response = self.session.request(
+                    method, url, params=query if query is not None else params, headers=headers, timeout=timeout
+                )
+            except requests.exceptions.RequestException as e:
+                if metrics is not None:
+                    self._record_exception(client, method, path, e, time.perf_counter() - sent)
+                self.breaker.record_failure()
+                retryable = idempotent or isinstance(e, requests.exceptions.ConnectTimeout)
+                if not retryable or attempt >= retries:
+                    raise
+                delay = self._backoff(attempt)
+                self.logger.warning(f"[HttpTransport] {method} {path} lỗi {e}, thử lại sau {delay:.2f}s")
+            else:
+                status = response.status_code
+                http_s = time.perf_counter() - sent
+                response.timing = {"queue_ms": queue_ms, "http_ms": http_s * 1000, "attempts": attempt + 1}
+                if metrics is not None:
+                    self._record_response(client, method, path, response, http_s)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.update_from_headers(response.headers, status, sent_at)
+                if status >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if status == 418 or not (idempotent and status in RETRY_STATUS and attempt < retries):
+                    response.raise_for_status()
+                    return response
+                delay = self._backoff(attempt, response.headers.get("Retry-After"))
+                self.logger.warning(f"[HttpTransport] {method} {path} HTTP {status}, thử lại sau {delay:.2f}s")
+            attempt += 1
+            if metrics is not None:
+                metrics.inc(HTTP_RETRIES, (client, method, path))
+            time.sleep(delay)
+
+    def warm_up(self, connections: int = 1, path: str = "/fapi/v1/ping"):
+        """Mở sẵn kết nối (TCP + TLS) để request đầu tiên, thường là lệnh, không phải bắt tay lại."""
+        for _ in range(max(1, min(connections, self.pool_size))):
+            try:
+                self.request("GET", path, retries=0)
+            except requests.exceptions.RequestException as e:
+                self.logger.warning(f"[HttpTransport] Warm up thất bại: {e}")
+                return
+
+    def close(self):
+        self.session.close()
+
+
+_shared: Dict[str, HttpTransport] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_transport(base_url: str = BINANCE_FUTURES_URL, pool_size: Optional[int] = None, **kwargs) -> HttpTransport:
+    """
+    Transport dùng chung theo base_url trong process. Lần gọi đầu tạo transport với kwargs
+    (kèm một RateLimiter chung nếu không truyền); các lần sau chỉ có thể tăng pool_size.
+    """
+    key = base_url.rstrip("/")
+    with _shared_lock:
+        transport = _shared.get(key)
+        if transport is None:
+            kwargs.setdefault("rate_limiter", RateLimiter())
+            transport = HttpTransport(key, pool_size=pool_size or 10, **kwargs)
+            _shared[key] = transport
+        elif pool_size:
+            transport.resize_pool(pool_size)
+        return transport
@@ -0,0 +1,152 @@
+import json
+import logging
+import threading
+import time
+from threading import Thread
+from typing import Callable, Dict, List, Optional
+
+from websocket import WebSocketApp
+
+from core.rate_limiter import LANE_ACCOUNT
+from core.transport import HttpTransport, get_shared_transport, BINANCE_FUTURES_URL
+
+
+class UserDataStream:
+    """
+    User-data stream của Binance Futures: tạo listenKey, gia hạn định kỳ, nhận sự kiện
+    ACCOUNT_UPDATE / ORDER_TRADE_UPDATE / ACCOUNT_CONFIG_UPDATE... qua WebSocket và
+    chuyển tới các handler đăng ký bằng add_handler.
+
+    Handler nhận dict sự kiện đã parse. Khi (re)connect, các hàm on_connect được gọi để
+    nơi dùng stream chụp lại snapshot REST (sự kiện trong lúc mất kết nối đã bị lỡ).
+    """
+    WS_BASE_URL = "wss://fstream.binance.com"
+    KEEPALIVE_INTERVAL = 30 * 60  # listenKey hết hạn sau 60 phút nếu không gia hạn
+
+    def __init__(self, api_key: str, transport: Optional[HttpTransport] = None, ws_base_url: Optional[str] = None):
+        self.api_key = api_key
+        # transport=False: không dùng REST (stream giả lập)
+        self.transport = get_shared_transport(BINANCE_FUTURES_URL) if transport is None else transport
+        self.ws_base_url = ws_base_url or self.WS_BASE_URL
+        self.listen_key: Optional[str] = None
+        self.ws_app: Optional[WebSocketApp] = None
+        self.ws_thread: Optional[Thread] = None
+        self.connected = False
+        self.reconnect = True
+        self.last_event_time = 0.0
+        self._handlers: List[Callable[[Dict], None]] = []
+        self._on_connect: List[Callable[[], None]] = []
+        self._stop = threading.Event()
+        self._keepalive_thread: Optional[Thread] = None
+        self.logger = logging.getLogger("UserDataStream")
+
+    # ========== ĐĂNG KÝ ==========
+
+    def add_handler(self, handler: Callable[[Dict], None]):
+        if handler not in self._handlers:
+            self._handlers.append(handler)
+
+    def remove_handler(self, handler: Callable[[Dict], None]):
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+
+    def add_on_connect(self, callback: Callable[[], None]):
+        if callback not in self._on_connect:
+            self._on_connect.append(callback)
+
+    # ========== LISTEN KEY ==========
+
+    def _listen_key_request(self, method: str) -> Optional[Dict]:
+        response = self.transport.request(
+            method, "/fapi/v1/listenKey", headers={"X-MBX-APIKEY": self.api_key}, lane=LANE_ACCOUNT,
+            client="user_stream"
+        )
+        return response.json()
+
+    def _keepalive_loop(self):
+        while not self._stop.wait(self.KEEPALIVE_INTERVAL):
+            try:
+                self._listen_key_request("PUT")
+                self.logger.debug("[UserStream] Đã gia hạn listenKey")
+            except Exception as e:
+                self.logger.error(f"[UserStream] Lỗi gia hạn listenKey: {e}")
+
+    # ========== KẾT NỐI ==========
+
+    def start(self):
+        self._stop.clear()
+        self.reconnect = True
+        self.listen_key = self._listen_key_request("POST")["listenKey"]
+        self._start_ws()
+        if self._keepalive_thread is None or not self._keepalive_thread.is_alive():
+            self._keepalive_thread = Thread(target=self._keepalive_loop, daemon=True)
+            self._keepalive_thread.start()
+
+    def _start_ws(self):
+        self.ws_app = WebSocketApp(
+            f"{self.ws_base_url}/ws/{self.listen_key}",
+            on_message=lambda ws, message: self.handle_message(message),
+            on_error=self._on_error,
+            on_close=self._on_close,
+            on_open=self._on_open
+        )
+        self.ws_thread = Thread(target=self.ws_app.run_forever, daemon=True)
+        self.ws_thread.start()
+
+    def _on_open(self, ws):
+        self.connected = True
+        self.logger.info("[UserStream] Kết nối thành công.")
+        self._notify_connect()
+
+    def _notify_connect(self):
+        for callback in list(self._on_connect):
+            try:
+                callback()
+            except Exception as e:
+                self.logger.error(f"[UserStream] Lỗi trong on_connect: {e}")
+
+    def _on_error(self, ws, error):
+        self.logger.error(f"[UserStream] Lỗi: {error}")
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        self.connected = False
+        self.logger.warning(f"[UserStream] Kết nối đóng: {close_status_code} - {close_msg}")
+        if self.reconnect and not self._stop.is_set():
+            self.logger.info("[UserStream] Đang thử kết nối lại sau 5 giây...")
+            time.sleep(5)
+            try:
+                self.listen_key = self._listen_key_request("POST")["listenKey"]
+            except Exception as e:
+                self.logger.error(f"[UserStream] Không lấy được listenKey mới: {e}")
+            self._start_ws()
+
+    def handle_message(self, message):
+        """Parse một frame (str hoặc dict) và chuyển tới handler. Dùng được trực tiếp cho stream giả lập."""
+        try:
+            event = json.loads(message) if isinstance(message, (str, bytes)) else message
+        except ValueError as e:
+            self.logger.error(f"[UserStream] Frame không hợp lệ: {e}")
+            return
+        self.last_event_time = time.monotonic()
+        if event.get("e") == "listenKeyExpired":
+            self.logger.warning("[UserStream] listenKey hết hạn, kết nối lại")
+            if self.ws_app is not None:
+                self.ws_app.close()
+        for handler in list(self._handlers):
+            try:
+                handler(event)
+            except Exception as e:
+                self.logger.error(f"[UserStream] Lỗi trong handler sự kiện {event.get('e')}: {e}")
+
+    def stop(self):
+        self.reconnect = False
+        self._stop.set()
+        self.connected = False
+        if self.ws_app is not None:
+            self.ws_app.close()
+        if self.listen_key:
+            try:
+                self._listen_key_request("DELETE")
+            except Exception as e:
+                self.logger.warning(f"[UserStream] Lỗi xóa listenKey: {e}")
+        self.logger.info("[UserStream] Đã dừng.")
@@ -0,0 +1,200 @@
+import os
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data.kline_parser import OHLCV_COLUMNS, arrays_to_dataframe as klines_to_dataframe
+
+
+class CandleStore:
+    """
+    Kho nến cục bộ trên đĩa, phân theo symbol và interval.
+
+    Mỗi cặp (symbol, interval) là một thư mục chứa 2 file .npy dạng cột:
+        timestamp.npy: int64 (open time, epoch ms), đã sắp xếp tăng dần, không trùng
+        ohlcv.npy:     float64 shape (N, 5) theo thứ tự open, high, low, close, volume
+    File được đọc bằng memory-map nên mở lại sau khi khởi động gần như không tốn chi phí parse.
+    Chỉ lưu nến đã đóng (close_time <= now); nến đang chạy luôn được lấy lại từ REST.
+    Khoảng đã tải mà sàn không có nến (trước khi niêm yết, sàn ngừng giao dịch) được ghi nhớ
+    trong bộ nhớ để không tải lại mỗi chu kỳ.
+    """
+
+    def __init__(self, root_dir: str = "candle_store"):
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        self._empty: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root_dir, f"{symbol.upper()}_{interval}")
+
+    def load(self, symbol: str, interval: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Trả về (timestamps, ohlcv) dạng memory-map, mảng rỗng nếu chưa có dữ liệu."""
+        with self._lock:
+            return self._load_locked(symbol, interval)
+
+    def _load_locked(self, symbol: str, interval: str) -> Tuple[np.ndarray, np.ndarray]:
+        key = (symbol.upper(), interval)
+        if key in self._cache:
+            return self._cache[key]
+        path = self._dir(symbol, interval)
+        ts_path = os.path.join(path, "timestamp.npy")
+        ohlcv_path = os.path.join(path, "ohlcv.npy")
+        if os.path.exists(ts_path) and os.path.exists(ohlcv_path):
+            try:
+                data = (np.load(ts_path, mmap_mode="r"), np.load(ohlcv_path, mmap_mode="r"))
+            except Exception as e:
+                logging.error(f"[CandleStore] Lỗi đọc {path}: {e}")
+                data = (np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64))
+        else:
+            data = (np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64))
+        self._cache[key] = data
+        return data
+
+    def write(self, symbol: str, interval: str, timestamps: np.ndarray, ohlcv: np.ndarray):
+        """
+        Gộp nến mới vào kho (nến mới ghi đè nến cũ cùng timestamp) rồi ghi lại file nguyên tử.
+        Giữ lock suốt đọc-gộp-ghi để hai luồng ghi cùng lúc không làm mất nến của nhau.
+        """
+        if len(timestamps) == 0:
+            return
+        with self._lock:
+            old_ts, old_ohlcv = self._load_locked(symbol, interval)
+            all_ts = np.concatenate([np.asarray(old_ts), np.asarray(timestamps, dtype=np.int64)])
+            all_ohlcv = np.concatenate([np.asarray(old_ohlcv), np.asarray(ohlcv, dtype=np.float64).reshape(-1, 5)])
+            # Bỏ tham chiếu tới memory-map cũ trước os.replace (Windows không thay được file đang map)
+            del old_ts, old_ohlcv
+            self._cache.pop((symbol.upper(), interval), None)
+
+            # Đảo ngược để np.unique giữ bản ghi mới nhất cho mỗi timestamp
+            rev_ts = all_ts[::-1]
+            uniq_ts, idx = np.unique(rev_ts, return_index=True)
+            merged_ohlcv = all_ohlcv[::-1][idx]
+
+            path = self._dir(symbol, interval)
+            os.makedirs(path, exist_ok=True)
+            for name, arr in (("timestamp", uniq_ts), ("ohlcv", np.ascontiguousarray(merged_ohlcv))):
+                tmp_path = os.path.join(path, f"{name}.tmp.npy")
+                np.save(tmp_path, arr)
+                os.replace(tmp_path, os.path.join(path, f"{name}.npy"))
+        logging.debug(f"[CandleStore] {symbol.upper()} {interval}: {len(uniq_ts)} nến trên đĩa")
+
+    def read_range(self, symbol: str, interval: str, start_time: int, end_time: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Đọc nến có timestamp trong [start_time, end_time] (view trên memory-map, không copy)."""
+        ts, ohlcv = self.load(symbol, interval)
+        lo = int(np.searchsorted(ts, start_time, side="left"))
+        hi = int(np.searchsorted(ts, end_time, side="right"))
+        return ts[lo:hi], ohlcv[lo:hi]
+
+    def missing_ranges(self, symbol: str, interval: str, start_time: int, end_time: int, step_ms: int) -> List[Tuple[int, int]]:
+        """
+        Tìm các khoảng thời gian còn thiếu trong [start_time, end_time]:
+        phần đầu, các lỗ ở giữa và phần đuôi chưa có trong kho, trừ các khoảng đã biết là rỗng.
+        """
+        ts, _ = self.read_range(symbol, interval, start_time, end_time)
+        ranges = []
+        if len(ts) == 0:
+            ranges.append((start_time, end_time))
+        else:
+            if ts[0] - start_time >= step_ms:
+                ranges.append((start_time, int(ts[0]) - 1))
+            gaps = np.nonzero(np.diff(ts) > step_ms)[0]
+            for i in gaps:
+                ranges.append((int(ts[i]) + step_ms, int(ts[i + 1]) - 1))
+            if end_time - ts[-1] >= step_ms:
+                ranges.append((int(ts[-1]) + step_ms, end_time))
+
+        with self._lock:
+            empty = list(self._empty.get((symbol.upper(), interval), ()))
+        for e_start, e_end in empty:
+            trimmed = []
+            for r_start, r_end in ranges:
+                if e_end < r_start or e_start > r_end:
+                    trimmed.append((r_start, r_end))
+                    continue
+                if r_start < e_start:
+                    trimmed.append((r_start, e_start - 1))
+                if r_end > e_end:
+                    trimmed.append((e_end + 1, r_end))
+            ranges = trimmed
+        return ranges
+
+    def _mark_empty(self, symbol: str, interval: str, start_time: int, end_time: int):
+        """Ghi nhớ khoảng đã tải mà sàn không có nến (gộp với các khoảng liền kề)."""
+        with self._lock:
+            ranges = sorted(self._empty.get((symbol.upper(), interval), []) + [(start_time, end_time)])
+            merged = [ranges[0]]
+            for r_start, r_end in ranges[1:]:
+                if r_start <= merged[-1][1] + 1:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], r_end))
+                else:
+                    merged.append((r_start, r_end))
+            self._empty[(symbol.upper(), interval)] = merged
+
+    def get_range(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: int,
+        end_time: int,
+        step_ms: int,
+        fetch: Callable[[int, int], Dict[str, np.ndarray]],
+        now_ms: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Trả về nến trong [start_time, end_time], chỉ gọi `fetch(start, end)` cho các khoảng còn thiếu.
+        `fetch` trả về dict cột NumPy (xem data.kline_parser); raise khi tải lỗi.
+        Nến đã đóng (close_time <= now_ms, mặc định là bây giờ) được lưu vào kho; nến đang chạy
+        chỉ được trả về, không lưu. Khoảng đã đóng mà `fetch` trả về rỗng được ghi nhớ là rỗng;
+        khoảng tải lỗi thì không, lần sau sẽ tải lại.
+        """
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        fetched = []
+        for r_start, r_end in self.missing_ranges(symbol, interval, start_time, end_time, step_ms):
+            try:
+                chunk = fetch(r_start, r_end)
+            except Exception as e:
+                logging.warning(f"[CandleStore] Lỗi tải {symbol.upper()} {interval} [{r_start}, {r_end}]: {e}")
+                continue
+            if len(chunk["timestamp"]):
+                fetched.append(chunk)
+            elif r_end + step_ms < now_ms:
+                self._mark_empty(symbol, interval, r_start, r_end)
+
+        if not fetched:
+            ts, ohlcv = self.read_range(symbol, interval, start_time, end_time)
+            return np.asarray(ts), np.asarray(ohlcv)
+
+        new_ts = np.concatenate([chunk["timestamp"] for chunk in fetched]).astype(np.int64)
+        new_ohlcv = np.concatenate([
+            np.column_stack([chunk[col] for col in OHLCV_COLUMNS]) for chunk in fetched
+        ]).astype(np.float64)
+
+        closed = new_ts + step_ms - 1 <= now_ms
+        self.write(symbol, interval, new_ts[closed], new_ohlcv[closed])
+        live_ts, live_ohlcv = new_ts[~closed], new_ohlcv[~closed]
+
+        ts, ohlcv = self.read_range(symbol, interval, start_time, end_time)
+        if len(live_ts):
+            keep = ~np.isin(live_ts, ts)
+            ts = np.concatenate([ts, live_ts[keep]])
+            ohlcv = np.concatenate([ohlcv, live_ohlcv[keep]])
+            order = np.argsort(ts, kind="stable")
+            ts, ohlcv = ts[order], ohlcv[order]
+        return np.asarray(ts), np.asarray(ohlcv)
+
+
+def arrays_to_dataframe(timestamps: np.ndarray, ohlcv: np.ndarray, step_ms: int) -> pd.DataFrame:
+    """Tạo DataFrame cùng định dạng với BinanceFuturesCollector._to_dataframe từ dữ liệu trong kho."""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    ohlcv = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 5)
+    arrays = {"timestamp": timestamps, "close_time": timestamps + step_ms - 1}
+    for i, col in enumerate(OHLCV_COLUMNS):
+        arrays[col] = ohlcv[:, i]
+    return klines_to_dataframe(arrays)
@@ -0,0 +1,432 @@
+import re
+import time
+import logging
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import List, Dict, Optional, Callable, Tuple
+from threading import Thread
+from websocket import WebSocketApp
+import numpy as np
+import pandas as pd
+
+from data.indicators import calculate_all_indicators
+from data.candle_store import CandleStore, arrays_to_dataframe as store_arrays_to_dataframe
+from data.kline_parser import parse_klines_bytes, arrays_to_dataframe, merge_arrays, empty_arrays
+from core.transport import HttpTransport, get_shared_transport
+
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 60 * 60_000,
+    "2h": 2 * 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "6h": 6 * 60 * 60_000,
+    "8h": 8 * 60 * 60_000,
+    "12h": 12 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+    "3d": 3 * 24 * 60 * 60_000,
+    "1w": 7 * 24 * 60 * 60_000,
+}
+
+
+# Cờ "x" (nến đã đóng) trong payload kline; chấp nhận khoảng trắng quanh dấu ":"
+_KLINE_CLOSED_RE = re.compile(r'"x"\s*:\s*(true|false)')
+
+
+def kline_closed(message: str) -> Optional[bool]:
+    """
+    Đọc cờ `x` của message kline thô mà không json.loads cả message (chạy trên thread socket).
+    None nếu message không có cờ (không phải sự kiện kline).
+    """
+    match = _KLINE_CLOSED_RE.search(message)
+    return None if match is None else match.group(1) == "true"
+
+
+def kline_to_candle(k: Dict) -> Dict:
+    """Chuyển payload `k` của sự kiện kline WebSocket thành dict nến."""
+    return {
+        "timestamp": k["t"],
+        "open_time": datetime.utcfromtimestamp(k["t"] / 1000),
+        "open": float(k["o"]),
+        "high": float(k["h"]),
+        "low": float(k["l"]),
+        "close": float(k["c"]),
+        "volume": float(k["v"]),
+        "close_time": datetime.utcfromtimestamp(k["T"] / 1000)
+    }
+
+
+class BinanceFuturesCollector:
+    REST_URL = "https://fapi.binance.com"
+    WS_BASE_URL = "wss://fstream.binance.com"
+    MAX_KLINES_PER_REQUEST = 1000
+    WINDOW_RETRIES = 2  # Số vòng tải lại các cửa sổ backfill bị lỗi (không tính cửa sổ rỗng)
+
+    def __init__(
+        self,
+        symbol: str,
+        interval: str = "5m",
+        max_workers: int = 8,
+        store: Optional[CandleStore] = None,
+        array_parsing: bool = True,
+        transport: Optional[HttpTransport] = None,
+        rest_url: Optional[str] = None,
+        ws_base_url: Optional[str] = None
+    ):
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.array_parsing = array_parsing  # Giải mã kline thẳng thành cột NumPy (không tạo dict từng dòng)
+        self.max_workers = max_workers  # Số request song song tối đa khi backfill
+        self.store = store  # Kho nến cục bộ (tùy chọn), chỉ tải phần còn thiếu từ REST
+        self.ws_app: Optional[WebSocketApp] = None
+        self.ws_thread: Optional[Thread] = None
+        self.multi_stream = None  # BinanceMultiStream dùng chung khi stream nhiều symbol
+        self._multi_callback: Optional[Callable[[Dict], None]] = None
+        self.recorder = None  # StreamRecorder (tùy chọn) ghi lại frame WebSocket thô
+        self.logger = logging.getLogger(f"BinanceFuturesCollector:{self.symbol}")
+        self.reconnect = True  # Cho phép tự động reconnect WebSocket
+
+        # Transport keep-alive dùng chung với BinanceAPI/BinanceFuturesAPI, pool đủ lớn cho số worker backfill
+        # rest_url/ws_base_url: trỏ tới server giả lập khi test offline
+        self.rest_url = rest_url or self.REST_URL
+        self.ws_base_url = ws_base_url or self.WS_BASE_URL
+        self.transport = transport or get_shared_transport(self.rest_url, pool_size=max(max_workers, 1))
+        self.last_backfill_stats: Dict = {}
+
+    # ========== REST METHODS ==========
+
+    def get_historical_dataframe(
+        self,
+        limit: int = 1000,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        with_indicators: bool = True
+    ) -> pd.DataFrame:
+        """
+        Lấy nến lịch sử dạng DataFrame. Nếu có cả start_time và end_time thì
+        dùng backfill song song để lấy trọn khoảng thời gian (không giới hạn 1000 nến).
+        Nếu có `store`, dữ liệu được đọc từ kho cục bộ và chỉ tải phần thiếu.
+        Với `array_parsing`, nến được giải mã thẳng thành cột NumPy rồi dựng DataFrame.
+        """
+        if self.store is not None:
+            df = self._get_dataframe_from_store(limit, start_time, end_time)
+        elif self.array_parsing:
+            if start_time is not None and end_time is not None:
+                arrays = self.backfill_arrays(start_time, end_time)
+            else:
+                arrays = self.get_historical_arrays(limit, start_time, end_time)
+            df = arrays_to_dataframe(arrays) if len(arrays["timestamp"]) else pd.DataFrame()
+        else:
+            if start_time is not None and end_time is not None:
+                candles = self.backfill(start_time, end_time)
+            else:
+                candles = self.get_historical_candles(limit, start_time, end_time)
+            df = self._to_dataframe(candles) if candles else pd.DataFrame()
+
+        if df.empty:
+            return df
+        return calculate_all_indicators(df) if with_indicators else df
+
+    def _klines_params(self, limit: int, start_time: Optional[int], end_time: Optional[int]) -> Dict:
+        params = {
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "limit": limit
+        }
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        return params
+
+    def get_historical_candles(
+        self,
+        limit: int = 1000,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        raise_errors: bool = False
+    ) -> List[Dict]:
+        """raise_errors: raise lỗi request thay vì trả về list rỗng (để phân biệt với khoảng không có nến)."""
+        params = self._klines_params(limit, start_time, end_time)
+
+        try:
+            response = self.transport.request("GET", "/fapi/v1/klines", params=params, client="collector")
+            raw_candles = response.json()
+            return self._parse_klines(raw_candles)
+        except Exception as e:
+            self.logger.error(f"[REST] Lỗi lấy dữ liệu nến: {e}")
+            if raise_errors:
+                raise
+            return []
+
+    def get_historical_arrays(
+        self,
+        limit: int = 1000,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        raise_errors: bool = False
+    ) -> Dict[str, np.ndarray]:
+        """Giống get_historical_candles nhưng trả về các cột NumPy, giải mã trực tiếp từ body."""
+        params = self._klines_params(limit, start_time, end_time)
+
+        try:
+            response = self.transport.request("GET", "/fapi/v1/klines", params=params, client="collector")
+            return parse_klines_bytes(response.content)
+        except Exception as e:
+            self.logger.error(f"[REST] Lỗi lấy dữ liệu nến: {e}")
+            if raise_errors:
+                raise
+            return empty_arrays()
+
+    def backfill(self, start_time: int, end_time: int, max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        Tải nến trong khoảng [start_time, end_time] (epoch ms) bằng nhiều request song song.
+        Khoảng thời gian được chia thành các cửa sổ tối đa 1000 nến, gửi qua transport keep-alive dùng chung
+        với số luồng giới hạn bởi max_workers. Kết quả được gộp, loại trùng và sắp xếp theo timestamp.
+        Cửa sổ lỗi được tải lại tối đa WINDOW_RETRIES vòng; khoảng vẫn lỗi nằm trong
+        last_backfill_stats["unfilled_ranges"] (cửa sổ không có nến không bị coi là lỗi).
+        """
+        chunks, _ = self._fetch_windows(self.get_historical_candles, start_time, end_time, max_workers)
+        merged: Dict[int, Dict] = {}
+        for candles in chunks:
+            for candle in candles:
+                merged[candle["timestamp"]] = candle
+        result = [merged[ts] for ts in sorted(merged)]
+        self._log_backfill(len(result))
+        return result
+
+    def backfill_arrays(self, start_time: int, end_time: int, max_workers: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Như backfill nhưng trả về các cột NumPy đã gộp, loại trùng và sắp xếp."""
+        return self.backfill_arrays_with_gaps(start_time, end_time, max_workers)[0]
+
+    def backfill_arrays_with_gaps(
+        self, start_time: int, end_time: int, max_workers: Optional[int] = None
+    ) -> Tuple[Dict[str, np.ndarray], List[Tuple[int, int]]]:
+        """Như backfill_arrays, trả thêm các khoảng [start, end] chưa tải được sau mọi lần thử lại."""
+        chunks, unfilled = self._fetch_windows(self.get_historical_arrays, start_time, end_time, max_workers)
+        result = merge_arrays(chunks)
+        self._log_backfill(len(result["timestamp"]))
+        return result, unfilled
+
+    def _fetch_windows(
+        self, fetch: Callable, start_time: int, end_time: int, max_workers: Optional[int]
+    ) -> Tuple[List, List[Tuple[int, int]]]:
+        """
+        Tải song song các cửa sổ; trả về (các chunk có nến, các cửa sổ vẫn lỗi).
+        Cửa sổ rỗng (chưa niêm yết, sàn ngừng giao dịch) là kết quả hợp lệ; chỉ cửa sổ lỗi
+        (exception hoặc None) được tải lại, tối đa WINDOW_RETRIES vòng.
+        """
+        pending = self._split_windows(start_time, end_time)
+        self.last_backfill_stats = {
+            "requests": 0, "failed_requests": 0, "empty_windows": 0, "retries": 0,
+            "unfilled_ranges": [], "workers": 0, "started": time.perf_counter()
+        }
+        if not pending:
+            return [], []
+
+        workers = max(1, min(max_workers or self.max_workers, len(pending)))
+        self.last_backfill_stats["workers"] = workers
+        chunks = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for attempt in range(self.WINDOW_RETRIES + 1):
+                if attempt:
+                    self.last_backfill_stats["retries"] += len(pending)
+                    self.logger.warning(f"[REST] Tải lại {len(pending)} cửa sổ lỗi (lần {attempt})")
+                    time.sleep(0.5 * attempt)
+                futures = {
+                    pool.submit(fetch, self.MAX_KLINES_PER_REQUEST, w_start, w_end, raise_errors=True): (w_start, w_end)
+                    for w_start, w_end in pending
+                }
+                self.last_backfill_stats["requests"] += len(futures)
+                failed = []
+                for future in as_completed(futures):
+                    try:
+                        chunk = future.result()
+                    except Exception:
+                        chunk = None
+                    if chunk is None:
+                        self.last_backfill_stats["failed_requests"] += 1
+                        failed.append(futures[future])
+                    elif len(chunk) == 0 or (isinstance(chunk, dict) and len(chunk["timestamp"]) == 0):
+                        self.last_backfill_stats["empty_windows"] += 1
+                    else:
+                        chunks.append(chunk)
+                pending = sorted(failed)
+                if not pending:
+                    break
+        if pending:
+            self.logger.error(f"[REST] Backfill còn {len(pending)} khoảng chưa tải được: {pending}")
+        self.last_backfill_stats["unfilled_ranges"] = pending
+        return chunks, pending
+
+    def _log_backfill(self, n_candles: int):
+        stats = self.last_backfill_stats
+        elapsed = time.perf_counter() - stats.pop("started", time.perf_counter())
+        stats.update({
+            "candles": n_candles,
+            "seconds": elapsed,
+            "candles_per_second": n_candles / elapsed if elapsed > 0 else 0.0,
+        })
+        self.logger.info(
+            f"[REST] Backfill {n_candles} nến qua {stats['requests']} request "
+            f"({stats['workers']} luồng) trong {elapsed:.2f}s "
+            f"~ {stats['candles_per_second']:.0f} nến/s, lỗi: {stats['failed_requests']}, "
+            f"rỗng: {stats['empty_windows']}, chưa tải được: {len(stats['unfilled_ranges'])}"
+        )
+
+    def _split_windows(self, start_time: int, end_time: int) -> List[Tuple[int, int]]:
+        """Chia [start_time, end_time] thành các cửa sổ mỗi cửa sổ tối đa 1000 nến."""
+        step = INTERVAL_MS.get(self.interval)
+        if step is None:
+            raise ValueError(f"Interval không được hỗ trợ: {self.interval}")
+        if end_time < start_time:
+            return []
+
+        span = step * self.MAX_KLINES_PER_REQUEST
+        windows = []
+        w_start = start_time
+        while w_start <= end_time:
+            w_end = min(w_start + span - 1, end_time)
+            windows.append((w_start, w_end))
+            w_start = w_end + 1
+        return windows
+
+    def _get_dataframe_from_store(self, limit: int, start_time: Optional[int], end_time: Optional[int]) -> pd.DataFrame:
+        step = INTERVAL_MS[self.interval]
+        now_ms = int(time.time() * 1000)
+        if end_time is None:
+            end_time = now_ms
+        if start_time is None:
+            start_time = (end_time // step) * step - (limit - 1) * step
+
+        timestamps, ohlcv = self.store.get_range(
+            self.symbol, self.interval, start_time, end_time, step,
+            fetch=self._fetch_for_store, now_ms=now_ms
+        )
+        if len(timestamps) == 0:
+            return pd.DataFrame()
+        return store_arrays_to_dataframe(timestamps, ohlcv, step)
+
+    def _fetch_for_store(self, start_time: int, end_time: int) -> Dict[str, np.ndarray]:
+        """fetch cho CandleStore.get_range: raise khi không tải được gì để kho không ghi nhớ khoảng là rỗng."""
+        arrays, unfilled = self.backfill_arrays_with_gaps(start_time, end_time)
+        if unfilled and len(arrays["timestamp"]) == 0:
+            raise IOError(f"không tải được {len(unfilled)} khoảng nến")
+        return arrays
+
+    def get_latest_candle(self) -> Optional[Dict]:
+        candles = self.get_historical_candles(limit=1)
+        return candles[0] if candles else None
+
+    def _parse_klines(self, raw_klines: List) -> List[Dict]:
+        return [{
+            "timestamp": item[0],
+            "open_time": datetime.utcfromtimestamp(item[0] / 1000),
+            "open": float(item[1]),
+            "high": float(item[2]),
+            "low": float(item[3]),
+            "close": float(item[4]),
+            "volume": float(item[5]),
+            "close_time": datetime.utcfromtimestamp(item[6] / 1000)
+        } for item in raw_klines]
+
+    def _to_dataframe(self, candles: List[Dict]) -> pd.DataFrame:
+        df = pd.DataFrame(candles)
+        df["open_time"] = pd.to_datetime(df["open_time"])
+        df.set_index("open_time", inplace=True)
+        return df
+
+    # ========== WEBSOCKET METHODS ==========
+
+    def stream_realtime(self, on_candle_callback: Callable[[Dict], None], multi_stream=None, dispatcher=None,
+                        on_partial_callback: Optional[Callable[[Dict], None]] = None):
+        """
+        Stream dữ liệu real-time qua WebSocket. Gọi callback mỗi khi có nến mới.
+        Nếu truyền `multi_stream` (BinanceMultiStream), symbol này được đăng ký trên
+        kết nối combined-stream dùng chung thay vì mở socket và thread riêng.
+        Nếu truyền `dispatcher` (CandleDispatcher), thread socket chỉ đưa message vào hàng đợi;
+        việc decode và gọi callback chạy trên worker pool.
+        on_partial_callback: nhận nến đang chạy (chưa đóng); không áp dụng cho multi_stream (chỉ nến đóng).
+        """
+        if multi_stream is not None:
+            self.multi_stream = multi_stream
+            self._multi_callback = on_candle_callback
+            multi_stream.subscribe(self.symbol, self.interval, on_candle_callback)
+            return
+
+        def handle_message(message):
+            msg = json.loads(message)
+            if "k" in msg:
+                k = msg["k"]
+                if k["x"]:  # Nến đã đóng
+                    on_candle_callback(kline_to_candle(k))
+                elif on_partial_callback is not None:
+                    on_partial_callback(kline_to_candle(k))
+
+        def on_message(ws, message):
+            received_at = time.perf_counter()  # Độ trễ dispatcher tính từ lúc frame tới
+            try:
+                if self.recorder is not None:
+                    self.recorder.write(message)
+                if dispatcher is None:
+                    handle_message(message)
+                    return
+                closed = kline_closed(message)
+                if closed is None or closed:
+                    # Nến đã đóng không bao giờ bị coalesce
+                    dispatcher.submit(self.symbol, handle_message, message, received_at=received_at,
+                                      coalescible=False)
+                elif on_partial_callback is not None:
+                    # Cùng shard với nến đóng để giữ thứ tự; coalesce chỉ bỏ các frame dở dang cũ
+                    dispatcher.submit((self.symbol, "partial"), handle_message, message, received_at=received_at,
+                                      shard_key=self.symbol)
+            except Exception as e:
+                self.logger.error(f"[WebSocket] Lỗi xử lý message: {e}")
+
+        def on_error(ws, error):
+            self.logger.error(f"[WebSocket] Lỗi: {error}")
+
+        def on_close(ws, close_status_code, close_msg):
+            self.logger.warning(f"[WebSocket] Kết nối đóng: {close_status_code} - {close_msg}")
+            if self.reconnect:
+                self.logger.info("[WebSocket] Đang thử kết nối lại sau 5 giây...")
+                time.sleep(5)
+                self._start_ws(on_candle_callback, on_message, on_error, on_close, on_open)
+
+        def on_open(ws):
+            self.logger.info("[WebSocket] Kết nối thành công.")
+
+        self._start_ws(on_candle_callback, on_message, on_error, on_close, on_open)
+
+    def _start_ws(self, on_candle_callback, on_message=None, on_error=None, on_close=None, on_open=None):
+        stream_name = f"{self.symbol.lower()}@kline_{self.interval}"
+        ws_url = f"{self.ws_base_url}/ws/{stream_name}"
+
+        self.ws_app = WebSocketApp(
+            ws_url,
+            on_message=on_message,
+            on_error=on_error,
+            on_close=on_close,
+            on_open=on_open
+        )
+        self.ws_thread = Thread(target=self.ws_app.run_forever, daemon=True)
+        self.ws_thread.start()
+        self.logger.info(f"[WebSocket] Đang stream {self.symbol} - {self.interval}...")
+
+    def stop_stream(self):
+        """
+        Ngắt kết nối WebSocket.
+        """
+        self.reconnect = False
+        if self.multi_stream is not None:
+            self.multi_stream.unsubscribe(self.symbol, self.interval, self._multi_callback)
+            self.multi_stream = None
+            self._multi_callback = None
+        if self.ws_app:
+            self.ws_app.close()
+            self.logger.info("[WebSocket] Dừng kết nối WebSocket.")
@@ -0,0 +1,198 @@
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from threading import Thread
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+
+POLICY_BLOCK = "block"              # Chờ đến khi hàng đợi có chỗ (không mất dữ liệu)
+POLICY_DROP_OLDEST = "drop_oldest"  # Bỏ sự kiện cũ nhất khi hàng đợi đầy
+POLICY_COALESCE = "coalesce"        # Mỗi key chỉ giữ sự kiện mới nhất đang chờ (chỉ sự kiện coalesce được)
+
+
+class _Shard:
+    """Hàng đợi của một worker. Mọi sự kiện cùng shard_key luôn vào cùng shard nên giữ đúng thứ tự."""
+
+    def __init__(self):
+        self.items = OrderedDict()  # item_key -> (handler, payload, received_at, coalescible)
+        self.cond = threading.Condition()
+        self.seq = 0
+
+
+class CandleDispatcher:
+    """
+    Lớp đệm giữa thread WebSocket và callback xử lý nến.
+
+    Thread socket chỉ đưa message vào hàng đợi có giới hạn rồi trả về ngay; một pool worker
+    xử lý (decode JSON, dựng nến, gọi callback). shard_key (thường là symbol, mặc định là key)
+    được băm vào một worker cố định nên thứ tự sự kiện của từng symbol được đảm bảo, kể cả khi
+    nến đóng và frame dở dang dùng key khác nhau.
+
+    Sau stop(), submit() không khởi động lại worker: sự kiện bị bỏ và đếm vào "rejected".
+    """
+
+    def __init__(
+        self,
+        num_workers: int = 2,
+        max_queue_size: int = 1000,
+        policy: str = POLICY_DROP_OLDEST,
+        latency_window: int = 1024
+    ):
+        """
+        Args:
+            num_workers: số worker xử lý callback.
+            max_queue_size: tổng số sự kiện tối đa đang chờ (chia đều cho các worker).
+            policy: "block", "drop_oldest" hoặc "coalesce" khi consumer xử lý không kịp.
+            latency_window: số mẫu latency gần nhất giữ lại để tính p50/p99.
+        """
+        if policy not in (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_COALESCE):
+            raise ValueError(f"Policy không hợp lệ: {policy}")
+        self.num_workers = max(1, num_workers)
+        self.max_shard_size = max(1, max_queue_size // self.num_workers)
+        self.policy = policy
+        self.logger = logging.getLogger("CandleDispatcher")
+
+        self._shards = [_Shard() for _ in range(self.num_workers)]
+        self._threads = []
+        self._running = False
+        self._stopped = False
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self._counters = {
+            "submitted": 0,
+            "processed": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "rejected": 0,
+            "errors": 0,
+            "max_queue_depth": 0,
+        }
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._stopped = False
+        for i, shard in enumerate(self._shards):
+            t = Thread(target=self._worker, args=(shard,), name=f"CandleDispatcher-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        self.logger.info(f"[Dispatcher] Khởi động {self.num_workers} worker, policy={self.policy}")
+
+    def stop(self, timeout: float = 5.0):
+        """Dừng worker sau khi xử lý hết sự kiện còn trong hàng đợi. Gọi start() để chạy lại."""
+        self._stopped = True
+        self._running = False
+        for shard in self._shards:
+            with shard.cond:
+                shard.cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def submit(
+        self,
+        key: Hashable,
+        handler: Callable[[Any], None],
+        payload: Any,
+        received_at: Optional[float] = None,
+        shard_key: Optional[Hashable] = None,
+        coalescible: bool = True
+    ) -> bool:
+        """
+        Đưa một sự kiện vào hàng đợi. Gọi từ thread WebSocket, không chạy handler tại chỗ.
+
+        Args:
+            key: khóa coalesce (ví dụ symbol hoặc tên stream).
+            handler: hàm được worker gọi với `payload`.
+            payload: dữ liệu sự kiện (message thô hoặc nến đã dựng).
+            received_at: thời điểm nhận (time.perf_counter()), mặc định là lúc submit.
+            shard_key: khóa chọn worker/giữ thứ tự, mặc định là `key`.
+            coalescible: False thì sự kiện không bao giờ bị gộp ở policy "coalesce" (ví dụ nến đã đóng).
+
+        Returns:
+            False nếu dispatcher đã stop() và sự kiện bị bỏ.
+        """
+        if not self._running:
+            if self._stopped:
+                self._incr("rejected")
+                return False
+            self.start()
+        received_at = time.perf_counter() if received_at is None else received_at
+        shard = self._shards[hash(key if shard_key is None else shard_key) % self.num_workers]
+        coalesce = self.policy == POLICY_COALESCE and coalescible
+
+        with shard.cond:
+            if coalesce and key in shard.items:
+                # Bỏ frame cũ, frame mới nhất xếp cuối để không vượt lên trước sự kiện đến sau frame cũ
+                del shard.items[key]
+                shard.items[key] = (handler, payload, received_at, True)
+                self._incr("coalesced")
+            else:
+                while len(shard.items) >= self.max_shard_size:
+                    if self.policy == POLICY_BLOCK:
+                        shard.cond.wait()
+                        continue
+                    shard.items.pop(self._evict_key(shard))
+                    self._incr("dropped")
+                item_key = key if coalesce else (key, shard.seq)
+                shard.seq += 1
+                shard.items[item_key] = (handler, payload, received_at, coalesce)
+            self._incr("submitted")
+            self._track_depth()
+            shard.cond.notify_all()
+        return True
+
+    def _evict_key(self, shard: _Shard) -> Hashable:
+        """Khi đầy: policy "coalesce" bỏ frame coalesce được cũ nhất trước, còn lại bỏ sự kiện cũ nhất."""
+        if self.policy == POLICY_COALESCE:
+            for item_key, item in shard.items.items():
+                if item[3]:
+                    return item_key
+        return next(iter(shard.items))
+
+    def _worker(self, shard: _Shard):
+        while True:
+            with shard.cond:
+                while not shard.items and self._running:
+                    shard.cond.wait()
+                if not shard.items:
+                    return
+                _, (handler, payload, received_at, _) = shard.items.popitem(last=False)
+                shard.cond.notify_all()  # Đánh thức producer đang chờ ở policy "block"
+            try:
+                handler(payload)
+                self._incr("processed")
+            except Exception as e:
+                self._incr("errors")
+                self.logger.error(f"[Dispatcher] Lỗi trong callback: {e}")
+            with self._stats_lock:
+                self._latencies.append(time.perf_counter() - received_at)
+
+    def _incr(self, name: str, value: int = 1):
+        with self._stats_lock:
+            self._counters[name] += value
+
+    def _track_depth(self):
+        depth = self.queue_depth()
+        with self._stats_lock:
+            if depth > self._counters["max_queue_depth"]:
+                self._counters["max_queue_depth"] = depth
+
+    def queue_depth(self) -> int:
+        return sum(len(shard.items) for shard in self._shards)
+
+    def stats(self) -> Dict:
+        """Bộ đếm và latency end-to-end (giây, từ lúc nhận message đến khi callback xong)."""
+        with self._stats_lock:
+            stats = dict(self._counters)
+            latencies = np.array(self._latencies, dtype=np.float64)
+        stats["queue_depth"] = self.queue_depth()
+        if len(latencies):
+            stats["latency_avg"] = float(latencies.mean())
+            stats["latency_p50"] = float(np.percentile(latencies, 50))
+            stats["latency_p99"] = float(np.percentile(latencies, 99))
+            stats["latency_max"] = float(latencies.max())
+        return stats
@@ -0,0 +1,167 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from data.indicators import to_dataframe
+from data.indicator_kernels import compute_indicators_2d
+from data.streaming_indicators import StreamingIndicators
+
+
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def _row_signature(df: pd.DataFrame, pos: int) -> Tuple:
+    """OHLCV của một dòng: nến cuối còn mở đổi giá thì chữ ký đổi theo."""
+    return tuple(float(df[c].iat[pos]) for c in OHLCV_COLUMNS if c in df.columns)
+
+
+class _CacheEntry:
+    def __init__(self, frame: pd.DataFrame, timestamps: np.ndarray):
+        self.frame = frame            # DataFrame đầy đủ (chưa dropna) gồm cột gốc + chỉ báo
+        self.timestamps = timestamps  # int64, cùng thứ tự với frame
+        self.engine: Optional[StreamingIndicators] = None  # Khởi tạo khi cần append lần đầu
+        self.tail = _row_signature(frame, -1)  # OHLCV nến cuối đã tính
+
+    @property
+    def last_timestamp(self) -> int:
+        return int(self.timestamps[-1])
+
+
+class IndicatorCache:
+    """
+    Cache kết quả chỉ báo dùng chung giữa Predictor, TradingBot và các thành phần khác.
+
+    Khóa: (symbol, interval, tham số chỉ báo); mỗi entry nhớ timestamp nến đầu, nến cuối và OHLCV nến cuối.
+        - Cùng nến đầu và nến cuối: trả lại kết quả cũ (hit).
+        - Cùng nến đầu, có thêm nến mới nối tiếp: chỉ tính phần nến mới bằng StreamingIndicators (append).
+        - Còn lại (cửa sổ trượt, nến cuối còn mở đổi giá...): tính lại toàn bộ bằng kernel NumPy (miss).
+    Vì EMA/MACD phụ thuộc toàn bộ lịch sử, kết quả chỉ dùng lại khi frame bắt đầu đúng ở nến đầu của entry,
+    nên luôn bằng kết quả tính trên chính frame đó (đã bỏ các dòng còn NaN). Với cửa sổ trượt (limit=N
+    mỗi chu kỳ) cache chỉ tránh tính lại trong cùng chu kỳ (TradingBot và Predictor dùng chung frame).
+    Frame dài hơn `max_rows` không được cache; entry ít dùng nhất bị loại trước (LRU).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 64,
+        max_rows: int = 5000,
+        ema_periods: Sequence[int] = (20, 50),
+        rsi_period: int = 14,
+        macd_params: Sequence[int] = (12, 26, 9),
+        bb_period: int = 20,
+        bb_std_dev: float = 2.0
+    ):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.params = (tuple(ema_periods), rsi_period, tuple(macd_params), bb_period, bb_std_dev)
+        self._entries: "OrderedDict[Tuple, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "appends": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def _timestamps(df: pd.DataFrame) -> np.ndarray:
+        if "timestamp" in df.columns:
+            return df["timestamp"].to_numpy(dtype=np.int64)
+        return df.index.to_numpy().astype("datetime64[ms]").astype(np.int64)
+
+    def _new_engine(self) -> StreamingIndicators:
+        ema_periods, rsi_period, macd_params, bb_period, bb_std_dev = self.params
+        return StreamingIndicators(ema_periods, rsi_period, "sma", macd_params, bb_period, bb_std_dev)
+
+    def _compute_full(self, df: pd.DataFrame) -> pd.DataFrame:
+        ema_periods, rsi_period, macd_params, bb_period, bb_std_dev = self.params
+        batch = compute_indicators_2d(
+            df["close"].to_numpy(dtype=np.float64)[None, :],
+            ema_periods=ema_periods, rsi_period=rsi_period, macd_params=macd_params,
+            bb_period=bb_period, bb_std_dev=bb_std_dev
+        )
+        out = df.copy()
+        for name, values in batch.for_symbol("0").items():
+            out[name] = values
+        return out
+
+    def _append(self, entry: _CacheEntry, new_rows: pd.DataFrame) -> pd.DataFrame:
+        if entry.engine is None:
+            entry.engine = self._new_engine()
+            entry.engine.warm_start(entry.frame["close"].to_numpy())
+        values = [entry.engine.update(x) for x in new_rows["close"].to_numpy(dtype=np.float64)]
+        appended = new_rows.copy()
+        for name in values[0]:
+            appended[name] = [v[name] for v in values]
+        return pd.concat([entry.frame, appended])
+
+    def get(self, candles: Union[pd.DataFrame, List[Dict]], symbol: str, interval: str) -> pd.DataFrame:
+        """
+        Trả về DataFrame có chỉ báo cho `candles`, dùng lại kết quả đã tính khi có thể.
+        Hit/append chỉ khi nến đầu trùng entry và timestamp, OHLCV của nến cuối đã tính khớp:
+        cửa sổ trượt hoặc nến còn mở đổi giá thì tính lại.
+        """
+        df = to_dataframe(candles) if not isinstance(candles, pd.DataFrame) else candles
+        if df.empty:
+            return df
+        key = (symbol, interval, self.params)
+        timestamps = self._timestamps(df)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.timestamps[0] == timestamps[0]:
+                self._entries.move_to_end(key)
+                if entry.last_timestamp == timestamps[-1] and _row_signature(df, -1) == entry.tail:
+                    self.stats["hits"] += 1
+                    return entry.frame.dropna()
+
+                pos = len(entry.timestamps) - 1
+                continues = (
+                    pos + 1 < len(timestamps)
+                    and timestamps[pos] == entry.last_timestamp
+                    and _row_signature(df, pos) == entry.tail
+                )
+                if continues:
+                    self.stats["appends"] += 1
+                    frame = self._append(entry, df.iloc[pos + 1:])
+                    self._store(key, entry, frame, timestamps)
+                    return frame.dropna()
+
+            self.stats["misses"] += 1
+            entry = _CacheEntry(self._compute_full(df), timestamps)
+            self._store(key, entry, entry.frame, timestamps)
+            return entry.frame.dropna()
+
+    def _store(self, key: Tuple, entry: _CacheEntry, frame: pd.DataFrame, timestamps: np.ndarray):
+        if len(frame) > self.max_rows:
+            # Cắt bớt thì nến đầu đổi, không còn khớp frame nào: bỏ entry thay vì giữ kết quả lệch
+            self._entries.pop(key, None)
+            return
+        entry.frame = frame
+        entry.timestamps = timestamps
+        entry.tail = _row_signature(frame, -1)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+            logging.debug(f"[IndicatorCache] Loại entry {evicted[:2]}")
+
+    def invalidate(self, symbol: Optional[str] = None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == symbol]:
+                    del self._entries[key]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["appends"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["appends"]) / lookups if lookups else 0.0
+        return stats
+
+
+# Cache mặc định dùng chung trong process (Predictor, TradingBot...)
+default_indicator_cache = IndicatorCache()
@@ -0,0 +1,359 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from data.indicator_kernels import ema_2d, rolling_mean_2d, rolling_std_2d
+from data.streaming_indicators import EMAState, RollingMeanState, RollingStdState
+
+NAN = float("nan")
+
+
+# ========== NODE ==========
+
+class Node:
+    """
+    Một phép tính trong đồ thị. Node được định danh bằng `key` (loại + tham số + key của input),
+    nên hai feature cần cùng một biểu thức con (ví dụ EMA 12 của close) dùng chung một node.
+    """
+    kind = "node"
+
+    def __init__(self, inputs: Tuple["Node", ...] = (), params: Tuple = ()):
+        self.inputs = inputs
+        self.params = params
+        self.key = (self.kind, params, tuple(n.key for n in inputs))
+        self.level = 1 + max((n.level for n in inputs), default=-1)
+
+    def compute(self, *values: np.ndarray) -> np.ndarray:
+        """Tính cả chuỗi (batch) từ chuỗi của các input."""
+        raise NotImplementedError
+
+    def new_state(self):
+        """Trạng thái cho chế độ tăng dần (None nếu node không có trạng thái)."""
+        return None
+
+    def step(self, state, *values: float) -> float:
+        """Tính giá trị ở nến mới từ giá trị mới của các input."""
+        raise NotImplementedError
+
+
+class Source(Node):
+    kind = "source"
+
+    def __init__(self, column: str):
+        super().__init__((), (column,))
+        self.column = column
+
+
+class EMA(Node):
+    kind = "ema"
+
+    def __init__(self, src: Node, period: int):
+        super().__init__((src,), (period,))
+        self.period = period
+
+    def compute(self, x):
+        return ema_2d(x[None, :], self.period)[0]
+
+    def new_state(self):
+        return EMAState(self.period)
+
+    def step(self, state, x):
+        return state.update(x)
+
+
+class SMA(Node):
+    kind = "sma"
+
+    def __init__(self, src: Node, period: int):
+        super().__init__((src,), (period,))
+        self.period = period
+
+    def compute(self, x):
+        return rolling_mean_2d(x[None, :], self.period)[0]
+
+    def new_state(self):
+        return RollingMeanState(self.period)
+
+    def step(self, state, x):
+        return state.update(x)
+
+
+class RollingStd(Node):
+    """Độ lệch chuẩn trượt (ddof=1). Dùng chung SMA cùng chu kỳ làm input để không tính mean hai lần."""
+    kind = "std"
+
+    def __init__(self, src: Node, mean: SMA):
+        super().__init__((src, mean), (mean.period,))
+        self.period = mean.period
+
+    def compute(self, x, mean):
+        return rolling_std_2d(x[None, :], self.period, mean=mean[None, :])[0]
+
+    def new_state(self):
+        return RollingStdState(self.period)
+
+    def step(self, state, x, mean):
+        # Chế độ tăng dần tự giữ mean/M2 trượt (O(1)); mean của SMA chỉ dùng để đồng bộ NaN
+        std = state.update(x)
+        return NAN if math.isnan(mean) else std
+
+
+class Diff(Node):
+    kind = "diff"
+
+    def __init__(self, src: Node):
+        super().__init__((src,))
+
+    def compute(self, x):
+        out = np.empty_like(x)
+        out[:1] = np.nan
+        out[1:] = np.diff(x)
+        return out
+
+    def new_state(self):
+        return [None]
+
+    def step(self, state, x):
+        prev, state[0] = state[0], x
+        return NAN if prev is None else x - prev
+
+
+class Gain(Node):
+    """Phần dương của input (NaN -> 0, giống delta.where(delta > 0, 0))."""
+    kind = "gain"
+
+    def __init__(self, src: Node):
+        super().__init__((src,))
+
+    def compute(self, x):
+        return np.where(x > 0, x, 0.0)
+
+    def step(self, state, x):
+        return x if x > 0 else 0.0
+
+
+class Loss(Node):
+    """Phần âm của input, đổi dấu (NaN -> 0)."""
+    kind = "loss"
+
+    def __init__(self, src: Node):
+        super().__init__((src,))
+
+    def compute(self, x):
+        return np.where(x < 0, -x, 0.0)
+
+    def step(self, state, x):
+        return -x if x < 0 else 0.0
+
+
+class Add(Node):
+    kind = "add"
+
+    def __init__(self, a: Node, b: Node):
+        super().__init__((a, b))
+
+    def compute(self, a, b):
+        return a + b
+
+    def step(self, state, a, b):
+        return a + b
+
+
+class Sub(Node):
+    kind = "sub"
+
+    def __init__(self, a: Node, b: Node):
+        super().__init__((a, b))
+
+    def compute(self, a, b):
+        return a - b
+
+    def step(self, state, a, b):
+        return a - b
+
+
+class Scale(Node):
+    kind = "scale"
+
+    def __init__(self, src: Node, factor: float):
+        super().__init__((src,), (factor,))
+        self.factor = factor
+
+    def compute(self, x):
+        return x * self.factor
+
+    def step(self, state, x):
+        return x * self.factor
+
+
+class RSIFromAverages(Node):
+    kind = "rsi"
+
+    def __init__(self, avg_gain: Node, avg_loss: Node):
+        super().__init__((avg_gain, avg_loss))
+
+    def compute(self, gain, loss):
+        return 100 - (100 / (1 + gain / (loss + 1e-10)))
+
+    def step(self, state, gain, loss):
+        return 100 - (100 / (1 + gain / (loss + 1e-10)))
+
+
+# ========== FEATURE KHAI BÁO ==========
+
+class Feature:
+    """Một feature người dùng khai báo, sinh ra một hoặc nhiều cột đầu ra (tên -> node)."""
+
+    def __init__(self, build: Callable[["IndicatorGraph"], Dict[str, Node]]):
+        self.build = build
+
+    def outputs(self, graph: "IndicatorGraph") -> Dict[str, Node]:
+        return self.build(graph)
+
+
+def ema(period: int, column: str = "close") -> Feature:
+    return Feature(lambda g: {f"ema_{period}": g.node(EMA, g.node(Source, column), period)})
+
+
+def sma(period: int, column: str = "close") -> Feature:
+    return Feature(lambda g: {f"sma_{period}": g.node(SMA, g.node(Source, column), period)})
+
+
+def rsi(period: int = 14, column: str = "close") -> Feature:
+    """RSI theo indicators.add_rsi (trung bình trượt đơn giản của gain/loss)."""
+    def build(g):
+        delta = g.node(Diff, g.node(Source, column))
+        avg_gain = g.node(SMA, g.node(Gain, delta), period)
+        avg_loss = g.node(SMA, g.node(Loss, delta), period)
+        return {f"rsi_{period}": g.node(RSIFromAverages, avg_gain, avg_loss)}
+    return Feature(build)
+
+
+def macd(fast: int = 12, slow: int = 26, signal: int = 9, column: str = "close") -> Feature:
+    def build(g):
+        src = g.node(Source, column)
+        line = g.node(Sub, g.node(EMA, src, fast), g.node(EMA, src, slow))
+        sig = g.node(EMA, line, signal)
+        return {"macd": line, "macd_signal": sig, "macd_hist": g.node(Sub, line, sig)}
+    return Feature(build)
+
+
+def bb(period: int = 20, std_dev: float = 2.0, column: str = "close") -> Feature:
+    def build(g):
+        src = g.node(Source, column)
+        mean = g.node(SMA, src, period)
+        band = g.node(Scale, g.node(RollingStd, src, mean), std_dev)
+        return {
+            "bb_upper": g.node(Add, mean, band),
+            "bb_lower": g.node(Sub, mean, band),
+            "bb_middle": mean,
+        }
+    return Feature(build)
+
+
+# ========== ĐỒ THỊ ==========
+
+class IndicatorGraph:
+    """
+    Đồ thị chỉ báo khai báo, ví dụ: IndicatorGraph([ema(20), macd(12, 26, 9), bb(20, 2)]).
+
+    Biểu thức con trùng nhau chỉ tính một lần (EMA của MACD trùng với ema(12), SMA của
+    bb dùng chung cho mean và std...). Chạy được theo batch trên DataFrame (`evaluate`),
+    các node cùng tầng độc lập nhau có thể chạy song song, hoặc tăng dần từng nến (`update`).
+    """
+
+    def __init__(self, features: Iterable[Feature] = (), n_threads: int = 1):
+        self.n_threads = n_threads
+        self._nodes: Dict[Tuple, Node] = {}
+        self.outputs: Dict[str, Node] = {}
+        self._states: Optional[Dict[Tuple, object]] = None
+        self._level_cache: Optional[List[List[Node]]] = None
+        for feature in features:
+            self.add(feature)
+
+    def node(self, cls, *args) -> Node:
+        """Tạo node hoặc trả lại node đã có cùng key (dedup biểu thức con)."""
+        candidate = cls(*args)
+        return self._nodes.setdefault(candidate.key, candidate)
+
+    def add(self, feature: Feature) -> "IndicatorGraph":
+        self.outputs.update(feature.outputs(self))
+        self._states = None
+        self._level_cache = None
+        return self
+
+    def node_count(self) -> int:
+        return len(self._nodes)
+
+    def _levels(self) -> List[List[Node]]:
+        """Các tầng node theo thứ tự phụ thuộc; node trong cùng tầng không phụ thuộc nhau."""
+        if self._level_cache is None:
+            levels: Dict[int, List[Node]] = {}
+            for node in self._nodes.values():
+                levels.setdefault(node.level, []).append(node)
+            self._level_cache = [levels[i] for i in sorted(levels)]
+        return self._level_cache
+
+    # ----- Batch -----
+
+    def evaluate(self, df: pd.DataFrame, append: bool = True) -> Union[pd.DataFrame, Dict[str, np.ndarray]]:
+        """
+        Tính toàn bộ đầu ra trên DataFrame, mỗi node đúng một lần.
+        append=True trả về bản copy của df có thêm cột; False trả về dict tên -> mảng.
+        """
+        values: Dict[Tuple, np.ndarray] = {}
+        pool = ThreadPoolExecutor(max_workers=self.n_threads) if self.n_threads > 1 else None
+        try:
+            for level in self._levels():
+                def run(node: Node):
+                    if isinstance(node, Source):
+                        return df[node.column].to_numpy(dtype=np.float64)
+                    return node.compute(*(values[i.key] for i in node.inputs))
+
+                if pool is not None and len(level) > 1:
+                    results = list(pool.map(run, level))
+                else:
+                    results = [run(node) for node in level]
+                for node, result in zip(level, results):
+                    values[node.key] = result
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        columns = {name: values[node.key] for name, node in self.outputs.items()}
+        if not append:
+            return columns
+        out = df.copy()
+        for name, arr in columns.items():
+            out[name] = arr
+        return out
+
+    # ----- Tăng dần -----
+
+    def reset(self):
+        self._states = {key: node.new_state() for key, node in self._nodes.items()}
+
+    def update(self, candle: Dict) -> Dict[str, float]:
+        """Cập nhật với một nến mới, mỗi node chạy một bước O(1) theo thứ tự tầng."""
+        if self._states is None:
+            self.reset()
+        values: Dict[Tuple, float] = {}
+        for level in self._levels():
+            for node in level:
+                if isinstance(node, Source):
+                    values[node.key] = float(candle[node.column])
+                else:
+                    values[node.key] = node.step(self._states[node.key], *(values[i.key] for i in node.inputs))
+        return {name: values[node.key] for name, node in self.outputs.items()}
+
+    def warm_start(self, history: Union[pd.DataFrame, Iterable[Dict]]) -> Optional[Dict[str, float]]:
+        """Nạp lịch sử để chế độ tăng dần tiếp nối đúng từ nến cuối."""
+        self.reset()
+        rows = history.to_dict("records") if isinstance(history, pd.DataFrame) else history
+        last = None
+        for row in rows:
+            last = self.update(row)
+        return last
@@ -1,12 +1,20 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Union
 
+from data.kline_parser import arrays_to_dataframe
 
-def to_dataframe(candles: List[Dict]) -> pd.DataFrame:
+
+def to_dataframe(candles: Union[List[Dict], Dict[str, np.ndarray], pd.DataFrame]) -> pd.DataFrame:
     """
     Chuyển danh sách nến dạng dict thành DataFrame.
+    Nhận thêm DataFrame có sẵn (trả lại bản copy, không dựng lại) hoặc dict cột NumPy
+    từ data.kline_parser (dựng trực tiếp từ mảng, không qua dict từng dòng).
     """
+    if isinstance(candles, pd.DataFrame):
+        return candles.copy()
+    if isinstance(candles, dict):
+        return arrays_to_dataframe(candles)
     df = pd.DataFrame(candles)
     df["open_time"] = pd.to_datetime(df["open_time"])
     df.set_index("open_time", inplace=True)
@@ -50,7 +58,7 @@ def add_bollinger_bands(df: pd.DataFrame, period: int = 20, std_dev: float = 2.0
     return df
 
 
-def calculate_all_indicators(candles: List[Dict]) -> pd.DataFrame:
+def calculate_all_indicators(candles: Union[List[Dict], Dict[str, np.ndarray], pd.DataFrame]) -> pd.DataFrame:
     """
     Hàm tổng hợp tính toàn bộ chỉ báo kỹ thuật cần thiết.
     """
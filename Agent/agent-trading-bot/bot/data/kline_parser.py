@@ -0,0 +1,144 @@
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+# Thứ tự cột trong mảng kline của Binance:
+# [open_time, open, high, low, close, volume, close_time, quote_volume, trades, taker_base, taker_quote, ignore]
+KLINE_WIDTH = 12
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def empty_arrays() -> Dict[str, np.ndarray]:
+    arrays = {"timestamp": np.empty(0, dtype=np.int64), "close_time": np.empty(0, dtype=np.int64)}
+    for col in OHLCV_COLUMNS:
+        arrays[col] = np.empty(0, dtype=np.float64)
+    return arrays
+
+
+def _columns_from_matrix(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    return {
+        "timestamp": matrix[:, 0].astype(np.int64),
+        "open": np.ascontiguousarray(matrix[:, 1], dtype=np.float64),
+        "high": np.ascontiguousarray(matrix[:, 2], dtype=np.float64),
+        "low": np.ascontiguousarray(matrix[:, 3], dtype=np.float64),
+        "close": np.ascontiguousarray(matrix[:, 4], dtype=np.float64),
+        "volume": np.ascontiguousarray(matrix[:, 5], dtype=np.float64),
+        "close_time": matrix[:, 6].astype(np.int64),
+    }
+
+
+def parse_klines_arrays(raw_klines: List) -> Dict[str, np.ndarray]:
+    """
+    Chuyển list kline (đã json.loads) thành các cột NumPy:
+    timestamp/close_time int64 (epoch ms), open/high/low/close/volume float64.
+    Không tạo dict hay datetime cho từng dòng.
+    """
+    if not raw_klines:
+        return empty_arrays()
+    matrix = np.array([row[:7] for row in raw_klines], dtype=object).astype(np.float64)
+    return _columns_from_matrix(matrix)
+
+
+def parse_klines_bytes(payload: Union[bytes, str]) -> Dict[str, np.ndarray]:
+    """
+    Giải mã trực tiếp body JSON của /fapi/v1/klines thành các cột NumPy mà không qua json.loads.
+    Body là mảng 2 chiều chỉ gồm số và chuỗi số, nên chỉ cần bỏ `[`, `]`, `"` rồi parse
+    một lượt bằng NumPy. Timestamp ms (< 2^53) giữ chính xác khi đi qua float64.
+    np.fromstring có thể dừng im lặng (hoặc raise, tùy bản NumPy) ở ký tự lạ, nên số giá trị
+    parse được phải khớp đúng số dòng (đếm `[`) x số cột; không khớp thì quay về json.loads.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    body = payload.strip()
+    if body in (b"", b"[]"):
+        return empty_arrays()
+
+    first_row_end = body.find(b"]")
+    width = body.count(b",", 0, first_row_end) + 1 if first_row_end > 0 else 0
+    rows = body.count(b"[") - 1
+    try:
+        flat = np.fromstring(body.translate(None, b'[]" \n\r\t'), dtype=np.float64, sep=",")
+    except ValueError:
+        flat = None
+    if flat is None or width < 7 or rows <= 0 or flat.size != rows * width:
+        logging.debug("[KlineParser] Định dạng kline không chuẩn, dùng json.loads")
+        return parse_klines_arrays(json.loads(payload))
+    return _columns_from_matrix(flat.reshape(rows, width))
+
+
+def arrays_to_dataframe(arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Tạo DataFrame cùng định dạng với BinanceFuturesCollector._to_dataframe từ các cột NumPy."""
+    timestamps = np.asarray(arrays["timestamp"], dtype=np.int64)
+    data = {"timestamp": timestamps}
+    for col in OHLCV_COLUMNS:
+        data[col] = arrays[col]
+    data["close_time"] = pd.to_datetime(np.asarray(arrays["close_time"], dtype=np.int64), unit="ms")
+    df = pd.DataFrame(data, index=pd.to_datetime(timestamps, unit="ms"), copy=False)
+    df.index.name = "open_time"
+    return df
+
+
+def merge_arrays(chunks: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Gộp nhiều khối cột, loại trùng và sắp xếp theo timestamp (khối sau ghi đè khối trước)."""
+    chunks = [c for c in chunks if len(c["timestamp"])]
+    if not chunks:
+        return empty_arrays()
+    merged = {key: np.concatenate([c[key] for c in chunks]) for key in chunks[0]}
+    # Đảo ngược để np.unique giữ bản ghi cuối cùng cho mỗi timestamp
+    _, idx = np.unique(merged["timestamp"][::-1], return_index=True)
+    idx = len(merged["timestamp"]) - 1 - idx
+    return {key: values[idx] for key, values in merged.items()}
+
+
+def benchmark(n_candles: int = 100_000, repeat: int = 3) -> Dict[str, float]:
+    """
+    So sánh thời gian (giây, lấy min sau `repeat` lần) giữa đường parse cũ
+    (json.loads + dict/datetime từng dòng + pd.DataFrame) và đường parse theo mảng.
+    """
+    base = 1_700_000_000_000
+    raw = [
+        [base + i * 60_000, f"{30000 + i * 0.1:.2f}", "30010.5", "29990.1", "30001.2", "123.456",
+         base + i * 60_000 + 59_999, "3703800.0", 100, "50.0", "1500000.0", "0"]
+        for i in range(n_candles)
+    ]
+    payload = json.dumps(raw).encode("utf-8")
+
+    def legacy():
+        rows = json.loads(payload)
+        candles = [{
+            "timestamp": item[0],
+            "open_time": datetime.utcfromtimestamp(item[0] / 1000),
+            "open": float(item[1]),
+            "high": float(item[2]),
+            "low": float(item[3]),
+            "close": float(item[4]),
+            "volume": float(item[5]),
+            "close_time": datetime.utcfromtimestamp(item[6] / 1000)
+        } for item in rows]
+        df = pd.DataFrame(candles)
+        df["open_time"] = pd.to_datetime(df["open_time"])
+        return df.set_index("open_time")
+
+    def arrays_from_json():
+        return arrays_to_dataframe(parse_klines_arrays(json.loads(payload)))
+
+    def arrays_from_bytes():
+        return arrays_to_dataframe(parse_klines_bytes(payload))
+
+    results = {}
+    for name, fn in (("legacy", legacy), ("arrays_json", arrays_from_json), ("arrays_bytes", arrays_from_bytes)):
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        results[name] = best
+    results["speedup_json"] = results["legacy"] / results["arrays_json"]
+    results["speedup_bytes"] = results["legacy"] / results["arrays_bytes"]
+    logging.info(f"[KlineParser] Benchmark {n_candles} nến: {results}")
+    return results
@@ -0,0 +1,67 @@
+import logging
+from collections import deque
+from typing import Callable, Optional, Dict, Iterable, Union
+import pandas as pd
+from data.collector import BinanceFuturesCollector
+from data.streaming_indicators import StreamingIndicators
+
+class LiveFeed:
+    def __init__(self, symbol: str, interval: str = "5m", collector=None):
+        """
+        collector: nguồn nến có stream_realtime/stop_stream (mặc định BinanceFuturesCollector).
+        Có thể truyền StreamReplayer để chạy offline từ dữ liệu đã ghi.
+        """
+        self.symbol = symbol
+        self.interval = interval
+        self.collector = collector or BinanceFuturesCollector(symbol, interval)
+        # Chỉ báo cập nhật tăng dần O(1) mỗi nến, không tính lại cả cửa sổ
+        self.indicators = StreamingIndicators(ema_periods=(12, 26), rsi_period=14)
+        self.candles = deque(maxlen=500)  # Lưu nến mới nhất
+        self.callback = None
+
+    def warm_start(self, history: Union[pd.DataFrame, Iterable[Dict]]):
+        """
+        Nạp nến lịch sử (list/generator dict hoặc DataFrame) để chỉ báo sẵn sàng ngay từ nến đầu tiên.
+        Lịch sử chỉ được duyệt một lần rồi dùng cho cả chỉ báo và `candles`.
+        """
+        if isinstance(history, pd.DataFrame):
+            self.indicators.warm_start(history)
+            tail = history.tail(self.candles.maxlen)
+            if tail.index.name and tail.index.name not in tail.columns:
+                tail = tail.reset_index()  # Giữ open_time của DataFrame collector trong dict nến
+            self.candles.extend(tail.to_dict("records"))
+            return
+        history = list(history)
+        self.indicators.warm_start(history)
+        self.candles.extend(history)
+
+    def _on_new_candle(self, candle: Dict):
+        # Thêm nến mới vào bộ nhớ (deque tự bỏ nến cũ nhất khi quá 500)
+        self.candles.append(candle)
+
+        # Cập nhật các chỉ báo quan trọng (EMA, RSI, MACD...)
+        values = self.indicators.update(candle)
+        count = self.indicators.count
+
+        feature_vector = {}
+
+        if count >= 14:
+            feature_vector['rsi'] = values['rsi_14']
+        if count >= 26:
+            feature_vector['ema_12'] = values['ema_12']
+            feature_vector['ema_26'] = values['ema_26']
+            feature_vector['macd'] = values['macd']
+            feature_vector['macd_signal'] = values['macd_signal']
+
+        # Gọi callback để AI dùng dữ liệu mới (nếu có)
+        if self.callback:
+            self.callback(feature_vector)
+
+    def start(self, callback: Optional[Callable[[Dict], None]] = None):
+        self.callback = callback
+        logging.info(f"LiveFeed bắt đầu với symbol {self.symbol} interval {self.interval}")
+        self.collector.stream_realtime(self._on_new_candle)
+
+    def stop(self):
+        self.collector.stop_stream()
+        logging.info("LiveFeed đã dừng.")
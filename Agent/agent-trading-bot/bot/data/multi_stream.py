@@ -0,0 +1,234 @@
+import json
+import time
+import logging
+import threading
+from threading import Thread
+from typing import Callable, Dict, List, Optional, Set
+
+from websocket import WebSocketApp
+
+from data.collector import kline_to_candle
+
+
+class _CombinedConnection:
+    """Một kết nối /stream?streams=... chứa nhiều stream kline."""
+
+    def __init__(self, owner: "BinanceMultiStream", conn_id: int, streams: List[str]):
+        self.owner = owner
+        self.conn_id = conn_id
+        self.streams: Set[str] = set(streams)
+        self.ws_app: Optional[WebSocketApp] = None
+        self.thread: Optional[Thread] = None
+        self.connected = False
+        self._request_id = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        # URL chỉ dùng cho lần kết nối đầu; stream thêm sau được gửi SUBSCRIBE trên socket đang mở
+        ws_url = f"{self.owner.ws_base_url}/stream?streams={'/'.join(sorted(self.streams))}"
+        self.ws_app = WebSocketApp(
+            ws_url,
+            on_message=self._on_message,
+            on_error=self._on_error,
+            on_close=self._on_close,
+            on_open=self._on_open
+        )
+        self.thread = Thread(target=self.ws_app.run_forever, daemon=True)
+        self.thread.start()
+        self.owner.logger.info(f"[MultiStream] Kết nối #{self.conn_id} với {len(self.streams)} stream...")
+
+    def send_method(self, method: str, streams: List[str]):
+        """Gửi SUBSCRIBE/UNSUBSCRIBE trên kết nối đang mở, không cần reconnect."""
+        with self._lock:
+            self._request_id += 1
+            payload = {"method": method, "params": streams, "id": self._request_id}
+        if self.connected and self.ws_app is not None:
+            try:
+                self.ws_app.send(json.dumps(payload))
+            except Exception as e:
+                self.owner.logger.error(f"[MultiStream] Lỗi gửi {method} trên kết nối #{self.conn_id}: {e}")
+
+    def close(self):
+        self.connected = False
+        if self.ws_app:
+            self.ws_app.close()
+
+    def _on_open(self, ws):
+        self.connected = True
+        self.owner.logger.info(f"[MultiStream] Kết nối #{self.conn_id} thành công.")
+        # Đồng bộ lại các stream được thêm trong lúc đang kết nối
+        if self.streams:
+            self.send_method("SUBSCRIBE", sorted(self.streams))
+
+    def _on_message(self, ws, message):
+        received_at = time.perf_counter()
+        try:
+            recorder = self.owner.recorder
+            if recorder is not None:
+                recorder.write(message)
+            msg = json.loads(message)
+            stream = msg.get("stream")
+            if stream is None:
+                # Phản hồi SUBSCRIBE/UNSUBSCRIBE: {"result": null, "id": n}
+                if msg.get("result") is not None or "error" in msg:
+                    self.owner.logger.warning(f"[MultiStream] Phản hồi từ server: {msg}")
+                return
+            self.owner._dispatch(stream, msg.get("data", {}), received_at)
+        except Exception as e:
+            self.owner.logger.error(f"[MultiStream] Lỗi xử lý message: {e}")
+
+    def _on_error(self, ws, error):
+        self.owner.logger.error(f"[MultiStream] Lỗi kết nối #{self.conn_id}: {error}")
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        self.connected = False
+        self.owner.logger.warning(
+            f"[MultiStream] Kết nối #{self.conn_id} đóng: {close_status_code} - {close_msg}"
+        )
+        if self.owner.reconnect and self.streams:
+            self.owner.logger.info("[MultiStream] Đang thử kết nối lại sau 5 giây...")
+            time.sleep(5)
+            self.start()
+
+
+class BinanceMultiStream:
+    """
+    Gộp nhiều stream `symbol@kline_interval` vào một số ít kết nối combined-stream
+    (`/stream?streams=`), định tuyến message tới callback theo từng symbol/interval.
+    Hỗ trợ subscribe/unsubscribe trong lúc đang chạy mà không cần kết nối lại.
+    """
+    WS_BASE_URL = "wss://fstream.binance.com"
+    MAX_STREAMS_PER_CONNECTION = 200  # Giới hạn của Binance cho mỗi kết nối
+
+    def __init__(
+        self,
+        max_streams_per_connection: int = MAX_STREAMS_PER_CONNECTION,
+        only_closed: bool = True,
+        dispatcher=None,
+        ws_base_url: Optional[str] = None,
+        recorder=None
+    ):
+        """
+        Args:
+            max_streams_per_connection: số stream tối đa trên mỗi kết nối.
+            only_closed: True thì chỉ gọi callback khi nến đã đóng (giống stream_realtime).
+            dispatcher: CandleDispatcher (tùy chọn) để chạy callback trên worker pool
+                thay vì trên thread WebSocket.
+            ws_base_url: thay cho WS_BASE_URL (ví dụ server giả lập khi test offline).
+            recorder: StreamRecorder (tùy chọn) ghi lại mọi frame combined-stream thô của các kết nối;
+                StreamReplayer(path, symbol=...) phát lại từng symbol.
+        """
+        self.ws_base_url = ws_base_url or self.WS_BASE_URL
+        self.max_streams_per_connection = max_streams_per_connection
+        self.only_closed = only_closed
+        self.dispatcher = dispatcher
+        self.recorder = recorder
+        self.reconnect = True
+        self.logger = logging.getLogger("BinanceMultiStream")
+        self._callbacks: Dict[str, List[Callable[[Dict], None]]] = {}
+        self._stream_conn: Dict[str, _CombinedConnection] = {}
+        self._connections: List[_CombinedConnection] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def stream_name(symbol: str, interval: str) -> str:
+        return f"{symbol.lower()}@kline_{interval}"
+
+    def subscribe(self, symbol: str, interval: str, callback: Callable[[Dict], None]):
+        """Đăng ký callback cho symbol/interval, thêm stream vào kết nối còn chỗ trống."""
+        name = self.stream_name(symbol, interval)
+        new_conn = None
+        with self._lock:
+            self._callbacks.setdefault(name, [])
+            if callback not in self._callbacks[name]:
+                self._callbacks[name].append(callback)
+            if name in self._stream_conn:
+                return
+
+            conn = next((c for c in self._connections if len(c.streams) < self.max_streams_per_connection), None)
+            if conn is None:
+                new_conn = _CombinedConnection(self, len(self._connections) + 1, [name])
+                self._connections.append(new_conn)
+                self._stream_conn[name] = new_conn
+            else:
+                conn.streams.add(name)
+                self._stream_conn[name] = conn
+
+        if new_conn is not None:
+            new_conn.start()
+        else:
+            conn.send_method("SUBSCRIBE", [name])
+        self.logger.info(f"[MultiStream] Subscribe {name}")
+
+    def unsubscribe(self, symbol: str, interval: str, callback: Optional[Callable[[Dict], None]] = None):
+        """Hủy callback (hoặc toàn bộ callback nếu không truyền) và bỏ stream khi không còn ai nghe."""
+        name = self.stream_name(symbol, interval)
+        with self._lock:
+            callbacks = self._callbacks.get(name, [])
+            if callback is not None and callback in callbacks:
+                callbacks.remove(callback)
+            elif callback is None:
+                callbacks.clear()
+            if callbacks:
+                return
+            self._callbacks.pop(name, None)
+            conn = self._stream_conn.pop(name, None)
+            if conn is None:
+                return
+            conn.streams.discard(name)
+            close_conn = not conn.streams
+            if close_conn:
+                self._connections.remove(conn)
+
+        if close_conn:
+            conn.close()
+        else:
+            conn.send_method("UNSUBSCRIBE", [name])
+        self.logger.info(f"[MultiStream] Unsubscribe {name}")
+
+    def _dispatch(self, stream: str, data: Dict, received_at: Optional[float] = None):
+        """received_at: thời điểm frame tới (time.perf_counter()), dùng cho độ trễ của dispatcher."""
+        k = data.get("k")
+        if k is None:
+            return
+        if self.only_closed and not k["x"]:
+            return
+        callbacks = self._callbacks.get(stream)
+        if not callbacks:
+            return
+        if self.dispatcher is not None:
+            # Dựng nến trên worker, thread socket chỉ định tuyến; nến đã đóng không bị coalesce
+            for cb in list(callbacks):
+                self.dispatcher.submit((stream, id(cb)), self._deliver, (cb, k), received_at=received_at,
+                                       shard_key=stream, coalescible=not k["x"])
+            return
+        candle = kline_to_candle(k)
+        for cb in list(callbacks):
+            try:
+                cb(candle)
+            except Exception as e:
+                self.logger.error(f"[MultiStream] Lỗi trong callback của {stream}: {e}")
+
+    @staticmethod
+    def _deliver(item):
+        cb, k = item
+        cb(kline_to_candle(k))
+
+    def subscriptions(self) -> List[str]:
+        with self._lock:
+            return sorted(self._stream_conn)
+
+    def connection_count(self) -> int:
+        return len(self._connections)
+
+    def stop(self):
+        """Đóng toàn bộ kết nối."""
+        self.reconnect = False
+        with self._lock:
+            conns = list(self._connections)
+            self._connections.clear()
+            self._stream_conn.clear()
+            self._callbacks.clear()
+        for conn in conns:
+            conn.close()
+        self.logger.info("[MultiStream] Dừng toàn bộ kết nối.")
@@ -0,0 +1,237 @@
+import os
+import gzip
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from threading import Thread
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from data.collector import kline_to_candle
+
+
+def _open_text(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _close_time_ms(record: Dict) -> float:
+    """close_time của nến dạng dict (epoch ms, datetime UTC hoặc chuỗi ISO); không có thì dùng timestamp."""
+    value = record.get("close_time")
+    if value is None:
+        return float(record["timestamp"])
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)  # kline_to_candle dựng close_time UTC không kèm tz
+    return value.timestamp() * 1000
+
+
+class StreamRecorder:
+    """
+    Ghi lại frame WebSocket thô ra file JSONL (nén gzip nếu đuôi .gz).
+    Mỗi dòng: {"t": thời điểm nhận (epoch ms), "msg": frame thô}.
+
+    Gắn vào collector: `collector.recorder = StreamRecorder("btc_1m.jsonl.gz")`.
+    """
+
+    def __init__(self, path: str, flush_every: int = 100):
+        self.path = path
+        self.flush_every = flush_every
+        self.count = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = _open_text(path, "a")
+
+    def write(self, message: str, received_at_ms: Optional[float] = None):
+        if received_at_ms is None:
+            received_at_ms = time.time() * 1000
+        line = json.dumps({"t": received_at_ms, "msg": message}, ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + "\n")
+            self.count += 1
+            if self.count % self.flush_every == 0:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        logging.info(f"[StreamRecorder] Đã ghi {self.count} frame vào {self.path}")
+
+
+class StreamReplayer:
+    """
+    Nguồn dữ liệu phát lại, cùng giao diện callback với BinanceFuturesCollector.stream_realtime,
+    dùng thay collector cho LiveFeed/TradingBot khi test tải offline.
+
+    Định dạng file hỗ trợ (JSONL, có thể nén .gz, hoặc file JSON một mảng):
+        - Frame thô do StreamRecorder ghi: {"t": ..., "msg": "..."}
+        - Kline REST: [open_time, open, high, low, close, volume, close_time, ...]
+        - Nến dạng dict: {"timestamp", "open", "high", "low", "close", "volume", ...}
+
+    speed: 1.0 = thời gian thực, N = nhanh gấp N lần, None hoặc 0 = nhanh nhất có thể.
+    """
+
+    def __init__(self, path: str, symbol: Optional[str] = None, speed: Optional[float] = 1.0, only_closed: bool = True):
+        self.path = path
+        self.symbol = symbol.upper() if symbol else None
+        self.speed = speed
+        self.only_closed = only_closed
+        self.logger = logging.getLogger(f"StreamReplayer:{os.path.basename(path)}")
+        self.thread: Optional[Thread] = None
+        self._stop = threading.Event()
+        self.stats: Dict = {}
+
+    # ========== ĐỌC FILE ==========
+
+    def _is_json_document(self, f) -> bool:
+        """
+        Chọn một lần cho cả file: tài liệu JSON (một mảng, có thể định dạng nhiều dòng) hay JSONL.
+        Theo đuôi file nếu có (.json / .jsonl, .ndjson), không thì theo dòng đầu tiên không trống:
+        dòng đầu là JSON hoàn chỉnh thì là JSONL, dòng đầu chỉ là "[" của mảng nhiều dòng thì là tài liệu JSON.
+        """
+        name = self.path[:-3] if self.path.endswith(".gz") else self.path
+        if name.endswith(".json"):
+            return True
+        if name.endswith((".jsonl", ".ndjson")):
+            return False
+        for line in f:
+            if line.strip():
+                break
+        else:
+            line = ""
+        f.seek(0)
+        if not line.lstrip().startswith("["):
+            return False
+        try:
+            json.loads(line)
+            return False
+        except json.JSONDecodeError:
+            return True
+
+    def _iter_records(self) -> Iterator:
+        with _open_text(self.path, "r") as f:
+            if self._is_json_document(f):
+                yield from json.load(f)
+                return
+            bad_lines = 0
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    # Dòng hỏng (ví dụ dòng cuối ghi dở khi process bị dừng): bỏ qua, phát tiếp phần còn lại
+                    bad_lines += 1
+                    self.logger.warning(f"[Replay] Bỏ qua dòng {line_no} không hợp lệ: {e}")
+                    continue
+                if isinstance(record, list) and record and isinstance(record[0], (list, dict)):
+                    yield from record  # Một dòng chứa cả mảng, ví dụ body /fapi/v1/klines
+                else:
+                    yield record
+            if bad_lines:
+                self.logger.warning(f"[Replay] {self.path}: bỏ qua {bad_lines} dòng không hợp lệ")
+
+    def _iter_events(self) -> Iterator[Tuple[float, Dict, bool]]:
+        """
+        Sinh (thời điểm sự kiện epoch ms, nến, nến đã đóng) theo thứ tự trong file.
+        Mọi nguồn dùng chung đồng hồ sàn: nến đã đóng phát tại close time T; frame chưa đóng tại
+        event time E của sàn (không dùng thời điểm nhận của recorder).
+        """
+        for record in self._iter_records():
+            if isinstance(record, list):
+                yield float(record[6]), kline_to_candle({
+                    "t": int(record[0]), "T": int(record[6]),
+                    "o": record[1], "h": record[2], "l": record[3], "c": record[4], "v": record[5],
+                }), True
+            elif "msg" in record:
+                msg = record["msg"]
+                msg = json.loads(msg) if isinstance(msg, str) else msg
+                data = msg.get("data", msg)  # Hỗ trợ cả frame combined-stream
+                k = data.get("k")
+                if k is None:
+                    continue
+                if self.symbol and k.get("s", self.symbol).upper() != self.symbol:
+                    continue
+                event_ms = min(float(data.get("E", k["T"])), float(k["T"]))
+                yield event_ms, kline_to_candle(k), bool(k["x"])
+            else:
+                yield _close_time_ms(record), dict(record), True
+
+    # ========== GIAO DIỆN GIỐNG COLLECTOR ==========
+
+    def stream_realtime(self, on_candle_callback: Callable[[Dict], None], blocking: bool = False,
+                        on_partial_callback: Optional[Callable[[Dict], None]] = None):
+        """
+        Phát lại file, gọi callback cho từng nến. Mặc định chạy trên thread nền như collector.
+        on_partial_callback: nhận frame nến chưa đóng (kể cả khi only_closed).
+        """
+        self._stop.clear()
+        if blocking:
+            self._run(on_candle_callback, on_partial_callback)
+            return
+        self.thread = Thread(target=self._run, args=(on_candle_callback, on_partial_callback), daemon=True)
+        self.thread.start()
+        self.logger.info(f"[Replay] Đang phát lại {self.path} (speed={self.speed})...")
+
+    def stop_stream(self):
+        self._stop.set()
+        self.logger.info("[Replay] Dừng phát lại.")
+
+    def wait(self, timeout: Optional[float] = None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def _run(self, on_candle_callback: Callable[[Dict], None],
+             on_partial_callback: Optional[Callable[[Dict], None]] = None):
+        started = time.perf_counter()
+        first_event_ms = None
+        emitted = 0
+        callback_seconds = 0.0
+        realtime = bool(self.speed)
+
+        for event_ms, candle, is_closed in self._iter_events():
+            if self._stop.is_set():
+                break
+            callback = on_candle_callback
+            if not is_closed:
+                if on_partial_callback is not None:
+                    callback = on_partial_callback
+                elif self.only_closed:
+                    continue
+            if realtime:
+                if first_event_ms is None:
+                    first_event_ms = event_ms
+                target = (event_ms - first_event_ms) / 1000 / self.speed
+                delay = target - (time.perf_counter() - started)
+                if delay > 0 and self._stop.wait(delay):
+                    break
+            cb_started = time.perf_counter()
+            try:
+                callback(candle)
+            except Exception as e:
+                self.logger.error(f"[Replay] Lỗi trong callback: {e}")
+            callback_seconds += time.perf_counter() - cb_started
+            emitted += 1
+
+        elapsed = time.perf_counter() - started
+        self.stats = {
+            "events": emitted,
+            "seconds": elapsed,
+            "events_per_second": emitted / elapsed if elapsed > 0 else 0.0,
+            "avg_callback_seconds": callback_seconds / emitted if emitted else 0.0,
+        }
+        self.logger.info(f"[Replay] Kết thúc: {self.stats}")
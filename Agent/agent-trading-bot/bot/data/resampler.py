@@ -0,0 +1,226 @@
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from data.collector import INTERVAL_MS
+
+WEEK_MS = INTERVAL_MS["1w"]
+# Nến 1w của Binance mở lúc 00:00 UTC thứ Hai; epoch (1970-01-01) là thứ Năm, thứ Hai đầu tiên sau 4 ngày
+WEEK_OFFSET_MS = 4 * INTERVAL_MS["1d"]
+
+
+def bucket_start(ts, tf_ms: int):
+    """Thời điểm mở bucket khung `tf_ms` chứa `ts` (số hoặc mảng NumPy), căn như sàn."""
+    offset = WEEK_OFFSET_MS if tf_ms == WEEK_MS else 0
+    return ts - (ts - offset) % tf_ms
+
+
+def timeframe_ms(timeframe: str) -> int:
+    if timeframe == "1M":
+        raise ValueError("Khung 1M (tháng) dài không cố định, không resample được theo bucket")
+    if timeframe not in INTERVAL_MS:
+        raise ValueError(f"Khung không được hỗ trợ: {timeframe}")
+    return INTERVAL_MS[timeframe]
+
+
+def _new_bar(bucket_start: int, tf_ms: int, candle: Dict) -> Dict:
+    return {
+        "timestamp": bucket_start,
+        "open_time": datetime.utcfromtimestamp(bucket_start / 1000),
+        "open": candle["open"],
+        "high": candle["high"],
+        "low": candle["low"],
+        "close": candle["close"],
+        "volume": candle["volume"],
+        "close_time": datetime.utcfromtimestamp((bucket_start + tf_ms - 1) / 1000),
+        "base_count": 1,
+    }
+
+
+def _merge_into(bar: Dict, candle: Dict):
+    bar["high"] = max(bar["high"], candle["high"])
+    bar["low"] = min(bar["low"], candle["low"])
+    bar["close"] = candle["close"]
+    bar["volume"] += candle["volume"]
+    bar["base_count"] += 1
+
+
+class TimeframeSource:
+    """Nguồn nến của một khung thời gian, cùng giao diện stream_realtime/stop_stream với collector."""
+
+    def __init__(self, resampler: "MultiTimeframeResampler", timeframe: str):
+        self.resampler = resampler
+        self.timeframe = timeframe
+        self._callback: Optional[Callable[[Dict], None]] = None
+
+    def stream_realtime(self, on_candle_callback: Callable[[Dict], None],
+                        on_partial_callback: Optional[Callable[[Dict], None]] = None):
+        """on_partial_callback: chấp nhận cho cùng giao diện với collector; bar khung lớn chỉ phát khi đóng."""
+        self._callback = on_candle_callback
+        self.resampler.on_close(self.timeframe, on_candle_callback)
+
+    def stop_stream(self):
+        if self._callback is not None:
+            self.resampler.remove_callback(self.timeframe, self._callback)
+            self._callback = None
+
+
+class MultiTimeframeResampler:
+    """
+    Dựng nến khung lớn (5m, 15m, 1h, 4h...) tăng dần từ một stream nến cơ sở (ví dụ 1m),
+    thay cho việc mở một collector/socket/REST riêng cho từng khung.
+
+    - on_candle(candle): nến cơ sở đã đóng; bar khung lớn đóng ngay khi nến cơ sở cuối của bucket đến.
+      Nến cơ sở trùng hoặc cũ hơn nến đã gộp (gửi lại sau reconnect, chồng với warm_start) bị bỏ qua.
+    - on_partial_candle(candle): nến cơ sở đang chạy, dùng để cập nhật bar dở dang (get_partial).
+    - on_close(tf, callback): đăng ký callback nhận bar khung `tf` khi đóng.
+    Các khung đều được dựng từ cùng một nguồn nên luôn nhất quán với nhau.
+    Bucket căn theo sàn: 1w bắt đầu thứ Hai 00:00 UTC; 1M không hỗ trợ.
+    """
+
+    def __init__(self, base_interval: str = "1m", timeframes: Sequence[str] = ("5m", "15m", "1h", "4h"), history_size: int = 1000):
+        self.base_interval = base_interval
+        self.base_ms = timeframe_ms(base_interval)
+        self.timeframes = {}
+        for tf in timeframes:
+            tf_ms = timeframe_ms(tf)
+            if tf_ms % self.base_ms != 0:
+                raise ValueError(f"Khung {tf} không chia hết cho khung cơ sở {base_interval}")
+            self.timeframes[tf] = tf_ms
+        self._partial: Dict[str, Optional[Dict]] = {tf: None for tf in self.timeframes}
+        self._live_base: Optional[Dict] = None
+        self._last_base_ts: Optional[int] = None  # Timestamp nến cơ sở đã gộp gần nhất
+        self._callbacks: Dict[str, List[Callable[[Dict], None]]] = {tf: [] for tf in self.timeframes}
+        self.history: Dict[str, deque] = {tf: deque(maxlen=history_size) for tf in self.timeframes}
+        self._lock = threading.RLock()
+        self.logger = logging.getLogger("MultiTimeframeResampler")
+
+    # ========== ĐĂNG KÝ ==========
+
+    def on_close(self, timeframe: str, callback: Callable[[Dict], None]):
+        self._callbacks[timeframe].append(callback)
+
+    def remove_callback(self, timeframe: str, callback: Callable[[Dict], None]):
+        if callback in self._callbacks[timeframe]:
+            self._callbacks[timeframe].remove(callback)
+
+    def source(self, timeframe: str) -> TimeframeSource:
+        """Nguồn nến cho LiveFeed/strategy, ví dụ LiveFeed(symbol, "15m", collector=resampler.source("15m"))."""
+        return TimeframeSource(self, timeframe)
+
+    def attach(self, collector, history_limit: int = 0):
+        """
+        Gắn vào một collector khung cơ sở (BinanceFuturesCollector, StreamReplayer...): nến đã đóng
+        vào on_candle, nến đang chạy vào on_partial_candle.
+        history_limit > 0: nạp trước lịch sử REST một lần cho mọi khung.
+        """
+        if history_limit > 0 and hasattr(collector, "get_historical_candles"):
+            self.warm_start(collector.get_historical_candles(limit=history_limit)[:-1])
+        collector.stream_realtime(self.on_candle, on_partial_callback=self.on_partial_candle)
+        return collector
+
+    # ========== CẬP NHẬT ==========
+
+    def on_candle(self, candle: Dict):
+        """Nhận một nến cơ sở đã đóng (cùng định dạng với callback của stream_realtime)."""
+        with self._lock:
+            closed = self._update(candle)
+        for tf, bar in closed:
+            self._emit(tf, bar)
+
+    def _update(self, candle: Dict) -> List[tuple]:
+        """Gộp một nến cơ sở đã đóng (gọi trong lock); trả về các (khung, bar) vừa đóng."""
+        closed: List[tuple] = []
+        ts = int(candle["timestamp"])
+        if self._last_base_ts is not None and ts <= self._last_base_ts:
+            self.logger.debug(f"[Resampler] Bỏ qua nến cơ sở trùng/cũ {ts}")
+            return closed
+        self._last_base_ts = ts
+        self._live_base = None
+        for tf, tf_ms in self.timeframes.items():
+            bucket = bucket_start(ts, tf_ms)
+            bar = self._partial[tf]
+            if bar is not None and bar["timestamp"] != bucket:
+                # Bucket cũ chưa đủ nến (mất dữ liệu): đóng với số nến hiện có
+                closed.append((tf, self._close(tf)))
+                bar = None
+            if bar is None:
+                self._partial[tf] = _new_bar(bucket, tf_ms, candle)
+            else:
+                _merge_into(bar, candle)
+            if ts + self.base_ms >= bucket + tf_ms:
+                closed.append((tf, self._close(tf)))
+        return closed
+
+    def on_partial_candle(self, candle: Dict):
+        """Nhận nến cơ sở đang chạy (chưa đóng) để get_partial luôn phản ánh giá mới nhất."""
+        with self._lock:
+            if self._last_base_ts is not None and int(candle["timestamp"]) <= self._last_base_ts:
+                return  # Frame trễ của nến đã đóng
+            self._live_base = dict(candle)
+
+    def _close(self, tf: str) -> Dict:
+        bar = self._partial[tf]
+        self._partial[tf] = None
+        bar["complete"] = bar["base_count"] == self.timeframes[tf] // self.base_ms
+        self.history[tf].append(bar)
+        return bar
+
+    def _emit(self, tf: str, bar: Dict):
+        for cb in list(self._callbacks[tf]):
+            try:
+                cb(bar)
+            except Exception as e:
+                self.logger.error(f"[Resampler] Lỗi trong callback khung {tf}: {e}")
+
+    def get_partial(self, timeframe: str) -> Optional[Dict]:
+        """Bar đang dở của khung `timeframe`, gồm cả nến cơ sở đang chạy nếu có."""
+        with self._lock:
+            bar = self._partial[timeframe]
+            live = self._live_base
+            tf_ms = self.timeframes[timeframe]
+            if live is None:
+                return dict(bar) if bar is not None else None
+            bucket = bucket_start(int(live["timestamp"]), tf_ms)
+            if bar is None or bar["timestamp"] != bucket:
+                return _new_bar(bucket, tf_ms, live)
+            merged = dict(bar)
+            _merge_into(merged, live)
+            return merged
+
+    def warm_start(self, candles: Iterable[Dict], emit: bool = False):
+        """Nạp nến cơ sở lịch sử để có sẵn history và bar dở dang cho mọi khung (emit: phát cả bar đã đóng)."""
+        closed: List[tuple] = []
+        with self._lock:
+            for candle in candles:
+                bars = self._update(candle)
+                if emit:
+                    closed.extend(bars)
+        for tf, bar in closed:
+            self._emit(tf, bar)
+
+
+def resample_arrays(arrays: Dict[str, np.ndarray], timeframe_ms: int) -> Dict[str, np.ndarray]:
+    """
+    Resample lịch sử dạng cột (data.kline_parser) sang khung lớn hơn một lượt bằng NumPy.
+    Bar cuối có thể chưa đủ nến (bar dở dang).
+    """
+    ts = np.asarray(arrays["timestamp"], dtype=np.int64)
+    if len(ts) == 0:
+        return {key: np.asarray(values)[:0] for key, values in arrays.items()}
+    buckets = bucket_start(ts, timeframe_ms)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+    return {
+        "timestamp": buckets[starts],
+        "open": np.asarray(arrays["open"])[starts],
+        "high": np.maximum.reduceat(np.asarray(arrays["high"]), starts),
+        "low": np.minimum.reduceat(np.asarray(arrays["low"]), starts),
+        "close": np.asarray(arrays["close"])[ends],
+        "volume": np.add.reduceat(np.asarray(arrays["volume"]), starts),
+        "close_time": buckets[starts] + timeframe_ms - 1,
+    }
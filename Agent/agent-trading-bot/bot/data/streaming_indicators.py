@@ -0,0 +1,337 @@
+import math
+from collections import deque
+from typing import Dict, Iterable, Optional, Sequence, Union
+
+import pandas as pd
+
+NAN = float("nan")
+
+
+class EMAState:
+    """EMA cập nhật từng nến, khớp với `Series.ewm(span=period, adjust=False).mean()`."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+    def snapshot(self) -> Dict:
+        return {"period": self.period, "value": self.value}
+
+    def restore(self, state: Dict):
+        self.period = state["period"]
+        self.alpha = 2.0 / (self.period + 1)
+        self.value = state["value"]
+
+
+class RollingMeanState:
+    """Trung bình trượt cửa sổ cố định bằng tổng chạy, O(1) mỗi nến."""
+
+    RESUM_EVERY = 4096  # Định kỳ cộng lại từ buffer để tránh tích lũy sai số làm tròn
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self._since_resum = 0
+
+    def update(self, x: float) -> float:
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(x)
+        self.total += x
+        self._since_resum += 1
+        if self._since_resum >= self.RESUM_EVERY:
+            self.total = math.fsum(self.window)
+            self._since_resum = 0
+        return self.total / self.period if len(self.window) == self.period else NAN
+
+    def snapshot(self) -> Dict:
+        return {"period": self.period, "window": list(self.window)}
+
+    def restore(self, state: Dict):
+        self.period = state["period"]
+        self.window = deque(state["window"], maxlen=self.period)
+        self.total = math.fsum(self.window)
+        self._since_resum = 0
+
+
+class RollingStdState:
+    """
+    Độ lệch chuẩn trượt (ddof=1) cập nhật O(1) mỗi nến: Welford cho cửa sổ cố định như BollingerState,
+    định kỳ tính lại từ buffer để sai số làm tròn không tích lũy. NaN trong cửa sổ cho ra NaN;
+    khi NaN cuối cùng rời cửa sổ thì tính lại từ buffer.
+    """
+
+    RESUM_EVERY = 4096
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.nans = 0
+        self._since_resum = 0
+
+    def _resum(self):
+        values = [v for v in self.window if not math.isnan(v)]
+        self.mean = math.fsum(values) / len(values) if values else 0.0
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in values)
+        self._since_resum = 0
+
+    def update(self, x: float) -> float:
+        full = len(self.window) == self.period
+        old = self.window[0] if full else NAN
+        self.window.append(x)
+        if full and math.isnan(old):
+            self.nans -= 1
+        if math.isnan(x):
+            self.nans += 1
+        self._since_resum += 1
+
+        if self.nans:
+            pass
+        elif (full and math.isnan(old)) or self._since_resum >= self.RESUM_EVERY:
+            self._resum()
+        elif not full:
+            delta = x - self.mean
+            self.mean += delta / len(self.window)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old_mean = self.mean
+            self.mean += (x - old) / self.period
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+            if self.m2 < 0:
+                self.m2 = 0.0
+
+        if self.nans or len(self.window) < self.period or self.period < 2:
+            return NAN
+        return math.sqrt(self.m2 / (self.period - 1))
+
+    def snapshot(self) -> Dict:
+        return {"period": self.period, "window": list(self.window)}
+
+    def restore(self, state: Dict):
+        self.period = state["period"]
+        self.window = deque(state["window"], maxlen=self.period)
+        self.nans = sum(1 for v in self.window if math.isnan(v))
+        self._resum()
+
+
+class RSIState:
+    """
+    RSI tăng dần.
+        mode="sma":    trung bình trượt đơn giản của gain/loss, khớp với indicators.add_rsi
+        mode="wilder": làm mượt kiểu Wilder (SMA cho `period` giá trị đầu, sau đó hệ số 1/period)
+    """
+
+    def __init__(self, period: int = 14, mode: str = "sma"):
+        if mode not in ("sma", "wilder"):
+            raise ValueError(f"RSI mode không hợp lệ: {mode}")
+        self.period = period
+        self.mode = mode
+        self.prev_close: Optional[float] = None
+        self.avg_gain = RollingMeanState(period)
+        self.avg_loss = RollingMeanState(period)
+        self.wilder_gain: Optional[float] = None
+        self.wilder_loss: Optional[float] = None
+
+    def update(self, close: float) -> float:
+        # add_rsi coi diff của nến đầu tiên là 0 (NaN bị where() thay bằng 0)
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+
+        if self.mode == "sma":
+            avg_gain = self.avg_gain.update(gain)
+            avg_loss = self.avg_loss.update(loss)
+        else:
+            if self.wilder_gain is None:
+                avg_gain = self.avg_gain.update(gain)
+                avg_loss = self.avg_loss.update(loss)
+                if not math.isnan(avg_gain):
+                    self.wilder_gain, self.wilder_loss = avg_gain, avg_loss
+            else:
+                self.wilder_gain += (gain - self.wilder_gain) / self.period
+                self.wilder_loss += (loss - self.wilder_loss) / self.period
+                avg_gain, avg_loss = self.wilder_gain, self.wilder_loss
+
+        if math.isnan(avg_gain):
+            return NAN
+        rs = avg_gain / (avg_loss + 1e-10)  # tránh chia 0, giống add_rsi
+        return 100 - (100 / (1 + rs))
+
+    def snapshot(self) -> Dict:
+        return {
+            "period": self.period,
+            "mode": self.mode,
+            "prev_close": self.prev_close,
+            "avg_gain": self.avg_gain.snapshot(),
+            "avg_loss": self.avg_loss.snapshot(),
+            "wilder_gain": self.wilder_gain,
+            "wilder_loss": self.wilder_loss,
+        }
+
+    def restore(self, state: Dict):
+        self.period = state["period"]
+        self.mode = state["mode"]
+        self.prev_close = state["prev_close"]
+        self.avg_gain.restore(state["avg_gain"])
+        self.avg_loss.restore(state["avg_loss"])
+        self.wilder_gain = state["wilder_gain"]
+        self.wilder_loss = state["wilder_loss"]
+
+
+class MACDState:
+    """MACD, signal và histogram tăng dần, khớp với indicators.add_macd."""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMAState(fast)
+        self.slow = EMAState(slow)
+        self.signal = EMAState(signal)
+
+    def update(self, close: float):
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
+
+    def snapshot(self) -> Dict:
+        return {"fast": self.fast.snapshot(), "slow": self.slow.snapshot(), "signal": self.signal.snapshot()}
+
+    def restore(self, state: Dict):
+        self.fast.restore(state["fast"])
+        self.slow.restore(state["slow"])
+        self.signal.restore(state["signal"])
+
+
+class BollingerState:
+    """
+    Bollinger bands với mean/variance trượt cập nhật O(1) (dạng Welford cho cửa sổ cố định),
+    khớp với rolling(period).mean() và rolling(period).std() (ddof=1) trong add_bollinger_bands.
+    """
+
+    def __init__(self, period: int = 20, std_dev: float = 2.0):
+        self.period = period
+        self.std_dev = std_dev
+        self.window = deque(maxlen=period)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x: float):
+        n = len(self.window)
+        if n < self.period:
+            self.window.append(x)
+            delta = x - self.mean
+            self.mean += delta / (n + 1)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.window[0]
+            self.window.append(x)
+            old_mean = self.mean
+            self.mean += (x - old) / self.period
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+            if self.m2 < 0:
+                self.m2 = 0.0
+
+        if len(self.window) < self.period:
+            return NAN, NAN, NAN
+        std = math.sqrt(self.m2 / (self.period - 1)) if self.period > 1 else NAN
+        return self.mean + self.std_dev * std, self.mean - self.std_dev * std, self.mean
+
+    def snapshot(self) -> Dict:
+        return {"period": self.period, "std_dev": self.std_dev, "window": list(self.window),
+                "mean": self.mean, "m2": self.m2}
+
+    def restore(self, state: Dict):
+        self.period = state["period"]
+        self.std_dev = state["std_dev"]
+        self.window = deque(state["window"], maxlen=self.period)
+        self.mean = state["mean"]
+        self.m2 = state["m2"]
+
+
+class StreamingIndicators:
+    """
+    Bộ chỉ báo tăng dần cho LiveFeed: mỗi nến mới cập nhật O(1), không phụ thuộc độ dài lịch sử.
+    Tên giá trị trả về giống các cột trong data.indicators (ema_20, rsi_14, macd, bb_upper, ...).
+    """
+
+    def __init__(
+        self,
+        ema_periods: Sequence[int] = (20, 50),
+        rsi_period: int = 14,
+        rsi_mode: str = "sma",
+        macd_params: Sequence[int] = (12, 26, 9),
+        bb_period: int = 20,
+        bb_std_dev: float = 2.0,
+        column: str = "close"
+    ):
+        self.column = column
+        self.emas = {p: EMAState(p) for p in ema_periods}
+        self.rsi = RSIState(rsi_period, rsi_mode)
+        self.macd = MACDState(*macd_params)
+        self.bollinger = BollingerState(bb_period, bb_std_dev)
+        self.count = 0
+        self.last_values: Dict[str, float] = {}
+
+    def update(self, candle: Union[Dict, float]) -> Dict[str, float]:
+        """Cập nhật với một nến (dict hoặc giá close) và trả về giá trị chỉ báo mới nhất."""
+        x = float(candle[self.column]) if isinstance(candle, dict) else float(candle)
+        values = {f"ema_{p}": ema.update(x) for p, ema in self.emas.items()}
+        values[f"rsi_{self.rsi.period}"] = self.rsi.update(x)
+        values["macd"], values["macd_signal"], values["macd_hist"] = self.macd.update(x)
+        values["bb_upper"], values["bb_lower"], values["bb_middle"] = self.bollinger.update(x)
+        self.count += 1
+        self.last_values = values
+        return values
+
+    def warm_start(self, history: Union[pd.DataFrame, Iterable]) -> Dict[str, float]:
+        """Nạp lịch sử (DataFrame, list nến dict hoặc list giá close) để khởi tạo trạng thái."""
+        if isinstance(history, pd.DataFrame):
+            history = history[self.column].to_numpy()
+        for item in history:
+            self.update(item)
+        return self.last_values
+
+    def is_ready(self) -> bool:
+        """True khi mọi chỉ báo đã đủ dữ liệu (không còn NaN)."""
+        return bool(self.last_values) and not any(math.isnan(v) for v in self.last_values.values())
+
+    def snapshot(self) -> Dict:
+        """Trạng thái dạng dict (JSON được) để lưu và khôi phục sau khi khởi động lại."""
+        return {
+            "column": self.column,
+            "count": self.count,
+            "emas": [ema.snapshot() for ema in self.emas.values()],
+            "rsi": self.rsi.snapshot(),
+            "macd": self.macd.snapshot(),
+            "bollinger": self.bollinger.snapshot(),
+            "last_values": dict(self.last_values),
+        }
+
+    def restore(self, state: Dict):
+        self.column = state["column"]
+        self.count = state["count"]
+        self.emas = {}
+        for ema_state in state["emas"]:
+            ema = EMAState(ema_state["period"])
+            ema.restore(ema_state)
+            self.emas[ema.period] = ema
+        self.rsi.restore(state["rsi"])
+        self.macd.restore(state["macd"])
+        self.bollinger.restore(state["bollinger"])
+        self.last_values = dict(state["last_values"])
+
+    @classmethod
+    def from_snapshot(cls, state: Dict) -> "StreamingIndicators":
+        engine = cls()
+        engine.restore(state)
+        return engine
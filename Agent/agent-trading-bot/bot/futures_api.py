@@ -1,57 +1,34 @@
-import time
-import hmac
-import hashlib
 import requests
 import logging
-from urllib.parse import urlencode
+from core.signer import RequestSigner
+from core.transport import HttpTransport, get_shared_transport
 
 class BinanceFuturesAPI:
     BASE_URL = "https://fapi.binance.com"
 
-    def __init__(self, api_key: str, api_secret: str):
+    def __init__(self, api_key: str, api_secret: str, transport: HttpTransport = None,
+                 signer: RequestSigner = None, base_url: str = None):
         self.api_key = api_key
         self.api_secret = api_secret
-        self.session = requests.Session()
-        self.session.headers.update({
-            "X-MBX-APIKEY": self.api_key
-        })
+        # Transport keep-alive dùng chung với BinanceAPI và collector
+        self.transport = transport or get_shared_transport(base_url or self.BASE_URL)
+        # Ký HMAC dùng lại khóa + offset đồng hồ sàn; truyền cùng signer với BinanceAPI để dùng chung offset
+        self.signer = signer or RequestSigner(api_secret, self.transport)
+        self.headers = {"X-MBX-APIKEY": self.api_key}
+        self.account_cache = None  # AccountStateCache (tùy chọn): getter đọc từ bộ nhớ thay vì REST
 
-    def _get_timestamp(self):
-        return int(time.time() * 1000)
-
-    def _sign_payload(self, params: dict):
-        query_string = urlencode(params)
-        signature = hmac.new(self.api_secret.encode('utf-8'), query_string.encode('utf-8'), hashlib.sha256).hexdigest()
-        return signature
+    def attach_account_cache(self, cache):
+        """Dùng AccountStateCache cho get_account_info/get_position/get_balance."""
+        self.account_cache = cache
 
     def _request(self, method, path, params=None, signed=False):
-        if params is None:
-            params = {}
-
-        url = self.BASE_URL + path
-
-        if signed:
-            params['timestamp'] = self._get_timestamp()
-            params['signature'] = self._sign_payload(params)
-
         try:
-            if method == "GET":
-                response = self.session.get(url, params=params, timeout=10)
-            elif method == "POST":
-                response = self.session.post(url, params=params, timeout=10)
-            elif method == "DELETE":
-                response = self.session.delete(url, params=params, timeout=10)
-            else:
-                raise ValueError(f"Unsupported method {method}")
-
-            response.raise_for_status()
-            return response.json()
-
+            return self.signer.send(self.transport, method, path, params=params, headers=self.headers,
+                                    client="futures_api", signed=signed)
         except requests.exceptions.HTTPError as e:
             logging.error(f"HTTP error {e.response.status_code}: {e.response.text}")
         except requests.exceptions.RequestException as e:
             logging.error(f"Request exception: {e}")
-
         return None
 
     # --- Public Endpoints ---
@@ -70,9 +47,14 @@ class BinanceFuturesAPI:
     # --- Signed Endpoints ---
 
     def get_account_info(self):
+        if self.account_cache is not None:
+            return self.account_cache.account_info(blind_field=True)
         return self._request("GET", "/fapi/v2/account", signed=True)
 
     def get_position(self, symbol: str):
+        if self.account_cache is not None:
+            legs = self.account_cache.legs(symbol, blind_field=True)
+            return legs[0] if legs else None
         data = self.get_account_info()
         if data and "positions" in data:
             for pos in data["positions"]:
@@ -82,7 +64,10 @@ class BinanceFuturesAPI:
 
     def set_leverage(self, symbol: str, leverage: int):
         params = {"symbol": symbol.upper(), "leverage": leverage}
-        return self._request("POST", "/fapi/v1/leverage", params=params, signed=True)
+        result = self._request("POST", "/fapi/v1/leverage", params=params, signed=True)
+        if result and self.account_cache is not None:
+            self.account_cache.set_leverage(symbol, leverage)
+        return result
 
     def place_order(self, symbol: str, side: str, order_type: str, quantity: float,
                     price: float = None, time_in_force: str = "GTC", reduce_only: bool = False,
@@ -148,6 +133,8 @@ class BinanceFuturesAPI:
         return None
 
     def get_usdt_balance(self):
+        if self.account_cache is not None:
+            return self.account_cache.balance("USDT")
         assets = self.get_balance()
         if assets:
             for asset in assets:
@@ -5,14 +5,24 @@ import numpy as np
 from model.model_def import MyModel
 from model.model_loader import load_model
 from data.indicators import calculate_all_indicators
+from data.indicator_cache import IndicatorCache, default_indicator_cache
 import logging
 import os
+from typing import Optional
 
 class Predictor:
-    def __init__(self, model_path: str = "model_checkpoint.pt", sequence_length: int = 60, threshold: float = 0.7):
+    def __init__(
+        self,
+        model_path: str = "model_checkpoint.pt",
+        sequence_length: int = 60,
+        threshold: float = 0.7,
+        indicator_cache: IndicatorCache = None
+    ):
         self.model_path = model_path
         self.sequence_length = sequence_length
         self.threshold = threshold
+        # Cache chỉ báo dùng chung, tránh tính lại cùng một nến nhiều lần mỗi chu kỳ
+        self.indicator_cache = indicator_cache or default_indicator_cache
 
         if not os.path.exists(self.model_path):
             logging.error(f"[Predictor] Không tìm thấy model checkpoint tại '{self.model_path}' - Dừng giao dịch.")
@@ -41,9 +51,17 @@ class Predictor:
             logging.error(f"[Predictor] Lỗi khi xử lý dữ liệu đầu vào: {e} - Dừng giao dịch.")
             raise
 
-    def predict_action(self, df: pd.DataFrame) -> str:
+    def _indicators(self, df: pd.DataFrame, symbol: Optional[str], interval: Optional[str]) -> pd.DataFrame:
+        # Chỉ dùng cache khi biết khóa thật (symbol, interval): khóa chung cho mọi frame dễ trả nhầm kết quả
+        if symbol is None or interval is None:
+            return calculate_all_indicators(df)
+        return self.indicator_cache.get(df, symbol, interval)
+
+    def predict_action(
+        self, df: pd.DataFrame, *, symbol: Optional[str] = None, interval: Optional[str] = None
+    ) -> str:
         try:
-            df = calculate_all_indicators(df)
+            df = self._indicators(df, symbol, interval)
             input_tensor = self.preprocess(df)
 
             with torch.no_grad():
@@ -66,9 +84,11 @@ class Predictor:
             logging.error(f"[Predictor] Lỗi dự đoán hành động: {e} - Dừng giao dịch.")
             return "HOLD"
 
-    def get_action_probabilities(self, df: pd.DataFrame) -> dict:
+    def get_action_probabilities(
+        self, df: pd.DataFrame, *, symbol: Optional[str] = None, interval: Optional[str] = None
+    ) -> dict:
         try:
-            df = calculate_all_indicators(df)
+            df = self._indicators(df, symbol, interval)
             input_tensor = self.preprocess(df)
 
             with torch.no_grad():
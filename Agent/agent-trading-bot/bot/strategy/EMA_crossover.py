@@ -1,44 +1,48 @@
-import pandas as pd
-from strategy.base_strategy import BaseStrategy
+import numpy as np
+from strategy.base_strategy import RingBufferStrategy, IncrementalEMA
+from data.indicator_kernels import ema_2d
+
+class EmaCrossoverStrategy(RingBufferStrategy):
+    columns = ("close", "timestamp")
 
-class EmaCrossoverStrategy(BaseStrategy):
     def __init__(self, short_period=12, long_period=26):
-        super().__init__()
+        super().__init__(capacity=1000)  # Lưu lịch sử giá gần nhất trong bộ đệm vòng
         self.short_period = short_period
         self.long_period = long_period
-        self.data = pd.DataFrame()  # Lưu lịch sử giá để tính EMA
+        # EMA cập nhật tăng dần, không tính lại cả chuỗi mỗi nến
+        self.ema_short = IncrementalEMA(short_period)
+        self.ema_long = IncrementalEMA(long_period)
         self.position_open = False
         self.position_type = None  # 'long' hoặc 'short'
 
-    def update_data(self, candle):
+    def on_candle(self, candle):
         # candle là dict chứa các key: open, high, low, close, volume, timestamp
-        new_row = {
-            "close": candle["close"],
-            "timestamp": candle["timestamp"]
-        }
-        self.data = pd.concat([self.data, pd.DataFrame([new_row])], ignore_index=True)
-        # Giữ data size hợp lý (vd 1000 dòng)
-        if len(self.data) > 1000:
-            self.data = self.data.iloc[-1000:]
-        # Tính EMA
-        self.data["ema_short"] = self.data["close"].ewm(span=self.short_period, adjust=False).mean()
-        self.data["ema_long"] = self.data["close"].ewm(span=self.long_period, adjust=False).mean()
+        close = float(candle["close"])
+        self.ema_short.update(close)
+        self.ema_long.update(close)
+
+    def _ready(self) -> bool:
+        return self.count >= max(self.short_period, self.long_period)
+
+    def _crossed_up(self) -> bool:
+        return self.ema_short.prev <= self.ema_long.prev and self.ema_short.value > self.ema_long.value
+
+    def _crossed_down(self) -> bool:
+        return self.ema_short.prev >= self.ema_long.prev and self.ema_short.value < self.ema_long.value
 
     def should_open_position(self, candle) -> bool:
-        self.update_data(candle)
-        if len(self.data) < max(self.short_period, self.long_period):
+        self.update(candle)
+        if not self._ready():
             return False
-        latest = self.data.iloc[-1]
-        prev = self.data.iloc[-2]
 
         # Tín hiệu mua: EMA ngắn cắt lên EMA dài
-        if not self.position_open and prev["ema_short"] <= prev["ema_long"] and latest["ema_short"] > latest["ema_long"]:
+        if not self.position_open and self._crossed_up():
             self.position_type = "long"
             self.position_open = True
             return True
 
         # Tín hiệu bán khống: EMA ngắn cắt xuống EMA dài
-        if not self.position_open and prev["ema_short"] >= prev["ema_long"] and latest["ema_short"] < latest["ema_long"]:
+        if not self.position_open and self._crossed_down():
             self.position_type = "short"
             self.position_open = True
             return True
@@ -46,25 +50,40 @@ class EmaCrossoverStrategy(BaseStrategy):
         return False
 
     def should_close_position(self, candle) -> bool:
-        self.update_data(candle)
+        self.update(candle)
         if not self.position_open:
             return False
-        latest = self.data.iloc[-1]
-        prev = self.data.iloc[-2]
 
         # Đóng vị thế long khi EMA ngắn cắt xuống EMA dài
-        if self.position_type == "long" and prev["ema_short"] >= prev["ema_long"] and latest["ema_short"] < latest["ema_long"]:
+        if self.position_type == "long" and self._crossed_down():
             self.position_open = False
             self.position_type = None
             return True
 
         # Đóng vị thế short khi EMA ngắn cắt lên EMA dài
-        if self.position_type == "short" and prev["ema_short"] <= prev["ema_long"] and latest["ema_short"] > latest["ema_long"]:
+        if self.position_type == "short" and self._crossed_up():
             self.position_open = False
             self.position_type = None
             return True
 
         return False
 
+    def vectorized_signals(self, arrays):
+        close = np.asarray(arrays["close"], dtype=np.float64)[None, :]
+        # Dùng EMA đã tính sẵn nếu có (ví dụ bảng ema_N trong shared memory của backtest.sweep)
+        emas = [arrays.get(f"ema_{p}") for p in (self.short_period, self.long_period)]
+        emas = [ema_2d(close, p)[0] if e is None else np.asarray(e) for e, p in zip(emas, (self.short_period, self.long_period))]
+        diff = emas[0] - emas[1]
+        prev = np.r_[np.nan, diff[:-1]]
+        ready = np.arange(len(diff)) >= max(self.short_period, self.long_period) - 1
+        crossed_up = ready & (prev <= 0) & (diff > 0)
+        crossed_down = ready & (prev >= 0) & (diff < 0)
+        return {
+            "entry_long": crossed_up,
+            "entry_short": crossed_down,
+            "exit_long": crossed_down,
+            "exit_short": crossed_up,
+        }
+
     def get_signal_type(self, candle) -> str:
         return self.position_type
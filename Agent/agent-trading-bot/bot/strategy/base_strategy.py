@@ -1,4 +1,9 @@
 from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
 
 class BaseStrategy(ABC):
     def __init__(self):
@@ -18,3 +23,158 @@ class BaseStrategy(ABC):
     def get_signal_type(self, candle) -> str:
         """Trả về loại tín hiệu: 'long' hoặc 'short'"""
         pass
+
+    def vectorized_signals(self, arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Tín hiệu trên toàn bộ lịch sử cho backtest vectorized (backtest.vectorized).
+        arrays: dict cột -> mảng (open, high, low, close, volume...).
+        Trả về 4 mảng bool cùng độ dài: entry_long, entry_short, exit_long, exit_short,
+        đánh giá tại giá đóng cửa của từng nến, cùng điều kiện với should_open/should_close_position.
+        """
+        raise NotImplementedError(f"{type(self).__name__} chưa hỗ trợ vectorized_signals")
+
+
+class StrategySelector:
+    """
+    Chọn hành động cuối của TradingBot từ gợi ý của model và (tùy chọn) một strategy luật.
+
+    Gợi ý BUY/SELL của model được dùng luôn; model HOLD thì hỏi `strategy` trên nến cuối của snapshot.
+    require_agreement=True: chỉ vào lệnh khi model và strategy cùng chiều.
+    Trả về chuỗi chứa BUY/SELL/HOLD (TradingBot.decide_action tìm từ khóa trong chuỗi).
+    """
+
+    def __init__(self, strategy: Optional[BaseStrategy] = None, require_agreement: bool = False):
+        self.strategy = strategy
+        self.require_agreement = require_agreement
+
+    def _rule_action(self, market_snapshot: Dict) -> str:
+        if self.strategy is None or not market_snapshot.get("candles"):
+            return "HOLD"
+        candle = market_snapshot["candles"][-1]
+        if not self.strategy.should_open_position(candle):
+            return "HOLD"
+        return "BUY" if self.strategy.get_signal_type(candle) == "long" else "SELL"
+
+    def select_strategy(self, base_prompt: str, ai_action: str, market_snapshot: Dict) -> str:
+        rule_action = self._rule_action(market_snapshot)
+        if self.require_agreement:
+            return ai_action if ai_action == rule_action else "HOLD"
+        return ai_action if ai_action in ("BUY", "SELL") else rule_action
+
+
+# ========== TRẠNG THÁI TĂNG DẦN ==========
+
+class RingBuffer:
+    """Bộ đệm vòng NumPy cấp phát sẵn: append O(1), không tạo mảng mới mỗi nến."""
+
+    def __init__(self, capacity: int, columns: Sequence[str]):
+        self.capacity = capacity
+        self.columns = list(columns)
+        self._col = {name: i for i, name in enumerate(self.columns)}
+        self._data = np.empty((capacity, len(self.columns)), dtype=np.float64)
+        self._head = 0   # Vị trí sẽ ghi tiếp theo
+        self.count = 0   # Tổng số nến đã append (kể cả nến đã bị ghi đè)
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, candle: Dict):
+        row = self._data[self._head]
+        for i, name in enumerate(self.columns):
+            row[i] = candle[name]
+        self._head = (self._head + 1) % self.capacity
+        self.count += 1
+
+    def get(self, column: str, ago: int = 0) -> float:
+        """Giá trị `column` của nến cách nến mới nhất `ago` nến (0 = nến mới nhất)."""
+        if ago >= len(self):
+            raise IndexError(f"Chỉ có {len(self)} nến trong bộ đệm")
+        return float(self._data[(self._head - 1 - ago) % self.capacity, self._col[column]])
+
+    def to_array(self, column: str) -> np.ndarray:
+        """Bản copy theo thứ tự thời gian (cũ -> mới), dùng cho debug/vẽ, không dùng trong vòng lặp nến."""
+        n = len(self)
+        idx = (self._head - n + np.arange(n)) % self.capacity
+        return self._data[idx, self._col[column]]
+
+
+class IncrementalEMA:
+    """EMA cập nhật từng giá, khớp ewm(span=period, adjust=False)."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.value: Optional[float] = None
+        self.prev: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        self.prev = self.value
+        self.value = x if self.value is None else self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class MonotonicWindow:
+    """Max (hoặc min) của `window` giá trị gần nhất bằng deque đơn điệu, O(1) khấu hao mỗi nến."""
+
+    def __init__(self, window: int, mode: str = "max"):
+        if mode not in ("max", "min"):
+            raise ValueError(f"mode phải là 'max' hoặc 'min', nhận {mode}")
+        self.window = window
+        self._is_max = mode == "max"
+        self._items = deque()  # (số thứ tự, giá trị), giá trị đơn điệu giảm (max) / tăng (min)
+        self._seq = 0
+
+    def push(self, x: float):
+        items = self._items
+        if self._is_max:
+            while items and items[-1][1] <= x:
+                items.pop()
+        else:
+            while items and items[-1][1] >= x:
+                items.pop()
+        items.append((self._seq, x))
+        self._seq += 1
+        while items[0][0] <= self._seq - 1 - self.window:
+            items.popleft()
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._items[0][1] if self._items else None
+
+    @property
+    def full(self) -> bool:
+        return self._seq >= self.window
+
+
+class RingBufferStrategy(BaseStrategy):
+    """
+    Strategy có trạng thái tăng dần dùng chung: bộ đệm vòng NumPy và cập nhật đúng một lần mỗi nến.
+
+    Lớp con khai báo `columns`, tạo trạng thái riêng (IncrementalEMA, MonotonicWindow...)
+    trong __init__ và cập nhật chúng trong `on_candle`. Gọi `update(candle)` ở mọi hàm
+    should_*: nến trùng timestamp với nến cuối sẽ bị bỏ qua, nên gọi nhiều lần vẫn an toàn.
+    """
+    columns: Sequence[str] = ("close",)
+
+    def __init__(self, capacity: int = 1000):
+        super().__init__()
+        self.buffer = RingBuffer(capacity, self.columns)
+        self.last_timestamp = None
+
+    def update(self, candle: Dict) -> bool:
+        """Cập nhật trạng thái với nến mới; trả về False nếu nến đã được xử lý."""
+        timestamp = candle.get("timestamp")
+        if timestamp is not None and timestamp == self.last_timestamp:
+            return False
+        self.last_timestamp = timestamp
+        self.on_candle(candle)
+        self.buffer.append(candle)
+        return True
+
+    def on_candle(self, candle: Dict):
+        """Cập nhật trạng thái riêng của strategy; buffer chưa chứa `candle` khi hàm này chạy."""
+        pass
+
+    @property
+    def count(self) -> int:
+        return self.buffer.count
@@ -1,67 +1,80 @@
-import pandas as pd
-from strategy.base_strategy import BaseStrategy
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from strategy.base_strategy import RingBufferStrategy, MonotonicWindow
+
+class BreakoutStrategy(RingBufferStrategy):
+    columns = ("high", "low", "close", "timestamp")
 
-class BreakoutStrategy(BaseStrategy):
     def __init__(self, window=20):
-        super().__init__()
+        super().__init__(capacity=1000)  # Lưu lịch sử giá gần nhất trong bộ đệm vòng
         self.window = window
-        self.data = pd.DataFrame()  # Lưu lịch sử giá để tính đỉnh đáy
+        # Đỉnh/đáy của window bằng deque đơn điệu, O(1) mỗi nến
+        self.highs = MonotonicWindow(window, "max")
+        self.lows = MonotonicWindow(window, "min")
+        self.highest_high = None  # Đỉnh cao nhất của window nến trước nến hiện tại
+        self.lowest_low = None    # Đáy thấp nhất của window nến trước nến hiện tại
         self.position_open = False
         self.position_type = None
 
-    def update_data(self, candle):
-        new_row = {
-            "high": candle["high"],
-            "low": candle["low"],
-            "close": candle["close"],
-            "timestamp": candle["timestamp"]
-        }
-        self.data = pd.concat([self.data, pd.DataFrame([new_row])], ignore_index=True)
-        if len(self.data) > 1000:
-            self.data = self.data.iloc[-1000:]
+    def on_candle(self, candle):
+        # So sánh với window trước khi đưa nến hiện tại vào, nến hiện tại không tự chặn bứt phá của chính nó
+        self.highest_high = self.highs.value if self.highs.full else None
+        self.lowest_low = self.lows.value if self.lows.full else None
+        self.highs.push(float(candle["high"]))
+        self.lows.push(float(candle["low"]))
 
     def should_open_position(self, candle) -> bool:
-        self.update_data(candle)
-        if len(self.data) < self.window:
+        self.update(candle)
+        if self.highest_high is None:
             return False
-        highest_high = self.data["high"].iloc[-self.window:].max()
-        lowest_low = self.data["low"].iloc[-self.window:].min()
 
         if not self.position_open:
             # Bứt phá lên trên đỉnh cao nhất window, mở vị thế long
-            if candle["close"] > highest_high:
+            if candle["close"] > self.highest_high:
                 self.position_open = True
                 self.position_type = "long"
                 return True
             # Bứt phá xuống dưới đáy thấp nhất window, mở vị thế short
-            if candle["close"] < lowest_low:
+            if candle["close"] < self.lowest_low:
                 self.position_open = True
                 self.position_type = "short"
                 return True
         return False
 
     def should_close_position(self, candle) -> bool:
-        self.update_data(candle)
-        if not self.position_open:
+        self.update(candle)
+        if not self.position_open or self.highest_high is None:
             return False
 
         # Đóng vị thế long khi giá đóng dưới đáy thấp nhất window
         if self.position_type == "long":
-            lowest_low = self.data["low"].iloc[-self.window:].min()
-            if candle["close"] < lowest_low:
+            if candle["close"] < self.lowest_low:
                 self.position_open = False
                 self.position_type = None
                 return True
 
         # Đóng vị thế short khi giá đóng trên đỉnh cao nhất window
         if self.position_type == "short":
-            highest_high = self.data["high"].iloc[-self.window:].max()
-            if candle["close"] > highest_high:
+            if candle["close"] > self.highest_high:
                 self.position_open = False
                 self.position_type = None
                 return True
 
         return False
 
+    def vectorized_signals(self, arrays):
+        high = np.asarray(arrays["high"], dtype=np.float64)
+        low = np.asarray(arrays["low"], dtype=np.float64)
+        close = np.asarray(arrays["close"], dtype=np.float64)
+        # Đỉnh/đáy của window nến trước nến hiện tại (giống on_candle)
+        highest = np.full(len(close), np.nan)
+        lowest = np.full(len(close), np.nan)
+        if len(close) > self.window:
+            highest[self.window:] = sliding_window_view(high, self.window).max(axis=1)[:-1]
+            lowest[self.window:] = sliding_window_view(low, self.window).min(axis=1)[:-1]
+        up = close > highest
+        down = close < lowest
+        return {"entry_long": up, "entry_short": down, "exit_long": down, "exit_short": up}
+
     def get_signal_type(self, candle) -> str:
         return self.position_type
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Module trong bot/ import theo gốc bot/ (core.x, data.x, backtest.x...)
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BOT_DIR not in sys.path:
+    sys.path.insert(0, BOT_DIR)
@@ -0,0 +1,69 @@
+import threading
+import time
+
+from core.account_cache import AccountStateCache
+
+ACCOUNT = {
+    "totalWalletBalance": "100",
+    "assets": [{"asset": "USDT", "walletBalance": "100"}],
+    "positions": [
+        {"symbol": "BTCUSDT", "positionSide": "LONG", "positionAmt": "1", "unrealizedProfit": "5"},
+        {"symbol": "BTCUSDT", "positionSide": "SHORT", "positionAmt": "-2", "unrealizedProfit": "-1"},
+    ],
+}
+RISKS = [
+    {"symbol": "BTCUSDT", "positionSide": "LONG", "unRealizedProfit": "5", "leverage": "10", "liquidationPrice": "1"},
+    {"symbol": "BTCUSDT", "positionSide": "SHORT", "unRealizedProfit": "-1", "leverage": "10", "liquidationPrice": "2"},
+]
+
+
+class FakeApi:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def _request(self, method, path, signed=False):
+        self.calls += 1
+        time.sleep(self.delay)
+        return ACCOUNT if path == "/fapi/v2/account" else RISKS
+
+
+class LiveStream:
+    connected = True
+
+    def add_handler(self, handler):
+        pass
+
+    def add_on_connect(self, handler):
+        pass
+
+
+def test_hedge_mode_legs_are_kept_apart():
+    cache = AccountStateCache(FakeApi())
+    legs = cache.position_risk("BTCUSDT")
+    assert sorted(p["positionSide"] for p in legs) == ["LONG", "SHORT"]
+    cache.on_event({"e": "ACCOUNT_UPDATE", "a": {"P": [{"s": "BTCUSDT", "ps": "LONG", "pa": "3", "ep": "1", "up": "7"}]}})
+    assert cache.position("BTCUSDT", position_side="LONG")["positionAmt"] == "3"
+    assert cache.position("BTCUSDT", position_side="SHORT")["positionAmt"] == "-2"
+
+
+def test_unrealized_pnl_is_not_served_from_an_old_snapshot_while_stream_is_live():
+    api = FakeApi()
+    cache = AccountStateCache(api, user_stream=LiveStream(), ttl=0.05, max_age=300)
+    assert cache.unrealized_pnl("BTCUSDT") == 4.0
+    time.sleep(0.06)
+    cache.balance()  # Trường stream gửi: vẫn dùng snapshot tới max_age
+    assert api.calls == 2
+    cache.unrealized_pnl("BTCUSDT")  # PnL đổi theo mark price: snapshot quá ttl thì chụp lại
+    assert api.calls == 4
+
+
+def test_concurrent_getters_refresh_once():
+    api = FakeApi(delay=0.05)
+    cache = AccountStateCache(api)
+    threads = [threading.Thread(target=cache.unrealized_pnl, args=("BTCUSDT",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert api.calls == 2
@@ -0,0 +1,74 @@
+import numpy as np
+
+from data.candle_store import CandleStore
+
+STEP = 60_000
+
+
+def _chunk(timestamps):
+    ts = np.asarray(timestamps, dtype=np.int64)
+    price = ts / STEP
+    return {"timestamp": ts, "open": price, "high": price + 1, "low": price - 1, "close": price, "volume": np.ones(len(ts))}
+
+
+class Exchange:
+    """fetch(start, end) trả nến có trong `available`, ghi lại các khoảng được hỏi."""
+
+    def __init__(self, available):
+        self.available = np.asarray(available, dtype=np.int64)
+        self.requests = []
+
+    def __call__(self, start, end):
+        self.requests.append((start, end))
+        return _chunk(self.available[(self.available >= start) & (self.available <= end)])
+
+
+def test_missing_ranges_reports_head_holes_and_tail(tmp_path):
+    store = CandleStore(str(tmp_path))
+    stored = [t * STEP for t in (2, 3, 6, 7)]
+    store.write("btcusdt", "1m", np.array(stored), np.ones((4, 5)))
+    assert store.missing_ranges("BTCUSDT", "1m", 0, 9 * STEP, STEP) == [
+        (0, 2 * STEP - 1), (4 * STEP, 6 * STEP - 1), (8 * STEP, 9 * STEP)
+    ]
+
+
+def test_get_range_fetches_only_gaps_and_remembers_empty_ranges(tmp_path):
+    store = CandleStore(str(tmp_path))
+    # Sàn không có nến 0-4 (chưa niêm yết) và nến 10 đang chạy
+    exchange = Exchange([t * STEP for t in range(5, 11)])
+    now_ms = 10 * STEP + 30_000
+    ts, _ = store.get_range("BTCUSDT", "1m", 0, 10 * STEP, STEP, exchange, now_ms=now_ms)
+    assert list(ts // STEP) == list(range(5, 11))
+    assert exchange.requests == [(0, 10 * STEP)]
+    # Nến đang chạy không lưu nên lần sau tải lại
+    assert list(store.load("BTCUSDT", "1m")[0] // STEP) == list(range(5, 10))
+
+    exchange.requests.clear()
+    store.get_range("BTCUSDT", "1m", 0, 10 * STEP, STEP, exchange, now_ms=now_ms)
+    assert exchange.requests == [(0, 5 * STEP - 1), (10 * STEP, 10 * STEP)]
+
+    # Khoảng trước niêm yết trả về rỗng đã được nhớ, không tải lại
+    exchange.requests.clear()
+    ts, _ = store.get_range("BTCUSDT", "1m", 0, 10 * STEP, STEP, exchange, now_ms=now_ms)
+    assert exchange.requests == [(10 * STEP, 10 * STEP)]
+    assert list(ts // STEP) == list(range(5, 11))
+
+
+def test_failed_fetch_is_retried_next_time(tmp_path):
+    store = CandleStore(str(tmp_path))
+
+    def broken(start, end):
+        raise ConnectionError("down")
+
+    ts, _ = store.get_range("BTCUSDT", "1m", 0, 4 * STEP, STEP, broken, now_ms=100 * STEP)
+    assert len(ts) == 0
+    assert store.missing_ranges("BTCUSDT", "1m", 0, 4 * STEP, STEP) == [(0, 4 * STEP)]
+
+
+def test_write_overwrites_same_timestamp_and_survives_reopen(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.write("BTCUSDT", "1m", np.array([0, STEP]), np.zeros((2, 5)))
+    store.write("BTCUSDT", "1m", np.array([STEP, 2 * STEP]), np.ones((2, 5)))
+    ts, ohlcv = CandleStore(str(tmp_path)).load("BTCUSDT", "1m")
+    assert list(ts) == [0, STEP, 2 * STEP]
+    assert list(ohlcv[:, 3]) == [0.0, 1.0, 1.0]
@@ -0,0 +1,37 @@
+import threading
+
+from data.dispatcher import POLICY_COALESCE, CandleDispatcher
+
+
+def test_closed_candles_are_never_coalesced_and_keep_order_with_partials():
+    dispatcher = CandleDispatcher(num_workers=4, max_queue_size=1000, policy=POLICY_COALESCE)
+    gate = threading.Event()
+    seen = []
+
+    def handler(item):
+        gate.wait()
+        seen.append(item)
+
+    # Giữ worker bận để các sự kiện dồn trong hàng đợi
+    dispatcher.submit("BTCUSDT", handler, ("closed", 0), coalescible=False)
+    dispatcher.submit(("BTCUSDT", "partial"), handler, ("partial", 1), shard_key="BTCUSDT")
+    dispatcher.submit("BTCUSDT", handler, ("closed", 1), coalescible=False)
+    dispatcher.submit("BTCUSDT", handler, ("closed", 2), coalescible=False)
+    dispatcher.submit(("BTCUSDT", "partial"), handler, ("partial", 3), shard_key="BTCUSDT")
+    gate.set()
+    dispatcher.stop()
+
+    assert [item for item in seen if item[0] == "closed"] == [("closed", 0), ("closed", 1), ("closed", 2)]
+    assert seen[-1] == ("partial", 3)
+    assert dispatcher.stats()["coalesced"] <= 1
+
+
+def test_submit_after_stop_is_rejected():
+    dispatcher = CandleDispatcher(num_workers=1)
+    seen = []
+    dispatcher.submit("BTCUSDT", seen.append, 1)
+    dispatcher.stop()
+    assert dispatcher.submit("BTCUSDT", seen.append, 2) is False
+    assert seen == [1]
+    assert dispatcher.stats()["rejected"] == 1
+    assert not dispatcher._threads
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from core.exchange_info import ExchangeInfoCache, SymbolRules
+
+BTC = {
+    "symbol": "BTCUSDT",
+    "status": "TRADING",
+    "filters": [
+        {"filterType": "PRICE_FILTER", "tickSize": "0.10", "minPrice": "556.80", "maxPrice": "4529764"},
+        {"filterType": "LOT_SIZE", "stepSize": "0.001", "minQty": "0.001", "maxQty": "1000"},
+        {"filterType": "MARKET_LOT_SIZE", "stepSize": "0.010", "minQty": "0.010", "maxQty": "120"},
+        {"filterType": "MIN_NOTIONAL", "notional": "100"},
+    ],
+}
+SHIB = {
+    "symbol": "1000SHIBUSDT",
+    "filters": [
+        {"filterType": "PRICE_FILTER", "tickSize": "0.000001", "minPrice": "0.000001", "maxPrice": "200"},
+        {"filterType": "LOT_SIZE", "stepSize": "10", "minQty": "10", "maxQty": "9000000"},
+        {"filterType": "MIN_NOTIONAL", "notional": "5"},
+    ],
+}
+
+
+class FakeApi:
+    def __init__(self):
+        self.calls = 0
+
+    def _request(self, method, path, signed=False):
+        self.calls += 1
+        return {"symbols": [BTC, SHIB]}
+
+
+def test_rounding_is_exact_and_uses_market_lot_size():
+    rules = SymbolRules(BTC)
+    # 0.1 + 0.2 ở float là 0.30000000000000004: làm tròn Decimal không bị sai số nhị phân
+    assert rules.round_quantity(0.1 + 0.2) == Decimal("0.300")
+    assert rules.round_quantity(0.0079) == Decimal("0.007")
+    assert rules.round_quantity(0.0179, market=True) == Decimal("0.01")
+    assert rules.round_price(65432.19) == Decimal("65432.1")
+    assert rules.round_price(65432.11, round_up=True) == Decimal("65432.2")
+    assert (rules.quantity_precision, rules.price_precision) == (3, 1)
+
+
+def test_step_sizes_above_one_keep_plain_integers():
+    rules = SymbolRules(SHIB)
+    assert str(rules.round_quantity(12345.6)) == "12340"
+    assert str(rules.round_price(0.0123456789)) == "0.012345"
+    assert rules.quantity_precision == 0
+
+
+def test_validate_min_qty_and_notional():
+    rules = SymbolRules(BTC)
+    assert rules.validate(Decimal("0.001"), price=Decimal("65000")) is not None  # notional 65 < 100
+    assert rules.validate(Decimal("0.002"), price=Decimal("65000")) is None
+    assert rules.validate(Decimal("0.001"), market=True) is not None           # < minQty của MARKET_LOT_SIZE
+    # reduceOnly không bị chặn bởi MIN_NOTIONAL
+    assert rules.validate(Decimal("0.01"), market=True, reference_price=5000, reduce_only=True) is None
+    assert rules.validate(Decimal("0.01"), market=True, reference_price=5000) is not None
+
+
+def test_cache_loads_once_and_round_trips_through_disk(tmp_path):
+    api = FakeApi()
+    path = str(tmp_path / "exchange_info.json")
+    cache = ExchangeInfoCache(api, cache_path=path)
+    assert cache.rules("BTCUSDT").tick_size == Decimal("0.10")
+    assert cache.rules("1000SHIBUSDT") is not None
+    assert api.calls == 1
+
+    warm = ExchangeInfoCache(api, cache_path=path)
+    assert warm.symbol_info("BTCUSDT")["status"] == "TRADING"
+    assert api.calls == 1
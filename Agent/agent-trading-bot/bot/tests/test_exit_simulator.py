@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from backtest.exit_simulator import EXIT_LIQ, EXIT_SL, EXIT_TIMEOUT, EXIT_TP, ExitSimulator
+from strategy_data import Strategy
+
+
+def _data(bars):
+    """bars: list (open, high, low, close); nến 0 là nến vào lệnh."""
+    o, h, l, c = (np.array(col, dtype=np.float64) for col in zip(*bars))
+    return {"open": o, "high": h, "low": l, "close": c, "volume": np.ones(len(o)),
+            "timestamp": np.arange(len(o), dtype=np.int64) * 60_000}
+
+
+def _profile(sl=0.0, tp=0.0, leverage=10):
+    return Strategy("test", leverage, 1.0, sl, tp, "")
+
+
+def _exit(bars, profile, side=1, **kwargs):
+    sim = ExitSimulator(_data(bars), max_holding=3, fee_rate=0.0, **kwargs)
+    res = sim.simulate(np.array([0]), np.array([side]), [profile])
+    return int(res["reason"][0, 0]), float(res["exit_price"][0, 0]), bool(res["ambiguous"][0, 0])
+
+
+# Long vào 100, leverage 10: giá thanh lý 100 * (1 - (0.1 - 0.004)) = 90.4
+ENTRY = (100, 100, 100, 100)
+
+
+def test_stop_nearer_than_liquidation_fills_first_in_the_same_bar():
+    reason, price, _ = _exit([ENTRY, (99, 99, 85, 86), (86, 86, 86, 86)], _profile(sl=0.05))
+    assert (reason, price) == (EXIT_SL, 95.0)
+
+
+def test_stop_gapped_through_fills_at_open():
+    reason, price, _ = _exit([ENTRY, (93, 93, 91, 92), (92, 92, 92, 92)], _profile(sl=0.05))
+    assert (reason, price) == (EXIT_SL, 93.0)
+
+
+def test_liquidation_wins_when_bar_opens_beyond_it_or_it_is_nearer():
+    reason, _, _ = _exit([ENTRY, (89, 89, 85, 86), (86, 86, 86, 86)], _profile(sl=0.05))
+    assert reason == EXIT_LIQ
+    reason, _, _ = _exit([ENTRY, (99, 99, 80, 81), (81, 81, 81, 81)], _profile(sl=0.15))
+    assert reason == EXIT_LIQ
+
+
+def test_short_side_mirrors_long():
+    reason, price, _ = _exit([ENTRY, (101, 115, 101, 114), (114, 114, 114, 114)], _profile(sl=0.05), side=-1)
+    assert (reason, price) == (EXIT_SL, 105.0)
+    reason, _, _ = _exit([ENTRY, (111, 115, 111, 114), (114, 114, 114, 114)], _profile(sl=0.05), side=-1)
+    assert reason == EXIT_LIQ
+
+
+# Long vào 100, SL 98, TP 102: nến tăng mở 101 chạm cả hai mức
+BOTH = [ENTRY, (101, 103, 97, 102.5), (102, 102, 102, 102)]
+
+
+@pytest.mark.parametrize("ambiguity, expected", [
+    ("stop_first", (EXIT_SL, 98.0)),
+    ("target_first", (EXIT_TP, 102.0)),
+    ("ohlc", (EXIT_SL, 98.0)),       # Nến tăng đi O->L->H->C: long chạm SL trước
+    ("nearest", (EXIT_TP, 102.0)),   # Open 101 gần TP hơn SL
+])
+def test_ambiguity_policies(ambiguity, expected):
+    reason, price, ambiguous = _exit(BOTH, _profile(sl=0.02, tp=0.02), ambiguity=ambiguity)
+    assert (reason, price) == expected
+    assert ambiguous
+
+
+def test_ohlc_policy_follows_bar_direction_for_shorts():
+    bearish = [ENTRY, (101, 103, 97, 97.5), (98, 98, 98, 98)]
+    reason, _, _ = _exit(bearish, _profile(sl=0.02, tp=0.02), side=-1, ambiguity="ohlc")
+    assert reason == EXIT_SL  # Nến giảm đi O->H->L->C: short chạm SL trước
+    reason, _, _ = _exit(BOTH, _profile(sl=0.02, tp=0.02), side=-1, ambiguity="ohlc")
+    assert reason == EXIT_TP
+
+
+def test_take_profit_gap_fills_at_open_and_timeout_exits_at_close():
+    reason, price, _ = _exit([ENTRY, (105, 106, 104, 105), (105, 105, 105, 105)], _profile(tp=0.02))
+    assert (reason, price) == (EXIT_TP, 105.0)
+    flat = [ENTRY] + [(100, 100.5, 99.5, 100.2)] * 4
+    reason, price, _ = _exit(flat, _profile(sl=0.02, tp=0.02))
+    assert (reason, price) == (EXIT_TIMEOUT, 100.2)
+
+
+def test_unknown_ambiguity_is_rejected():
+    with pytest.raises(ValueError):
+        ExitSimulator(_data(BOTH), ambiguity="random")
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from data.indicator_cache import IndicatorCache
+
+
+def _candles(closes, start=0):
+    n = len(closes)
+    closes = np.asarray(closes, dtype=np.float64)
+    return pd.DataFrame({
+        "timestamp": np.arange(start, start + n, dtype=np.int64) * 60_000,
+        "open": closes, "high": closes + 1, "low": closes - 1, "close": closes, "volume": np.ones(n),
+    })
+
+
+def test_same_last_timestamp_different_candles_is_not_a_hit():
+    cache = IndicatorCache()
+    cache.get(_candles(np.full(60, 200.0)), "AAAUSDT", "1m")
+    # Cùng khóa (caller dùng chung tên) và cùng timestamp nến cuối nhưng là dữ liệu khác
+    out = cache.get(_candles(np.full(60, 1.0)), "AAAUSDT", "1m")
+    assert out["close"].iat[-1] == 1.0
+    assert cache.get_stats()["hits"] == 0
+    out = cache.get(_candles(np.full(60, 5.0)), "BBBUSDT", "1m")
+    assert out["close"].iat[-1] == 5.0
+
+
+def test_open_candle_price_change_recomputes():
+    cache = IndicatorCache()
+    df = _candles(np.full(60, 200.0))
+    cache.get(df, "AAAUSDT", "1m")
+    changed = df.copy()
+    changed.loc[changed.index[-1], ["close", "high"]] = [999.0, 1000.0]
+    out = cache.get(changed, "AAAUSDT", "1m")
+    assert out["close"].iat[-1] == 999.0
+    assert out["ema_20"].iat[-1] > 200.0
+    assert cache.get_stats()["hits"] == 0
+
+
+def test_unchanged_candles_hit_and_new_candle_appends():
+    cache = IndicatorCache()
+    closes = list(np.linspace(100, 160, 60))
+    cache.get(_candles(closes), "AAAUSDT", "1m")
+    cache.get(_candles(closes), "AAAUSDT", "1m")
+    out = cache.get(_candles(closes + [170.0]), "AAAUSDT", "1m")
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["appends"], stats["misses"]) == (1, 1, 1)
+    assert out["close"].iat[-1] == 170.0
+
+
+def _assert_same_as_full(cache, df, out):
+    expected = cache._compute_full(df).dropna()
+    assert list(out.index) == list(expected.index)
+    for name in ("ema_20", "ema_50", "rsi_14", "macd", "macd_signal", "bb_upper", "bb_lower"):
+        np.testing.assert_allclose(out[name].to_numpy(), expected[name].to_numpy(), rtol=1e-9, atol=1e-9)
+
+
+def test_sliding_window_recomputes_from_the_frame_itself():
+    cache = IndicatorCache()
+    closes = 100 + np.cumsum(np.sin(np.arange(200)))
+    cache.get(_candles(closes[:150]), "AAAUSDT", "1m")
+    # Cửa sổ trượt 1 nến: EMA không được lấy từ lịch sử dài hơn đã cache
+    window = _candles(closes[1:151], start=1)
+    out = cache.get(window, "AAAUSDT", "1m")
+    assert cache.get_stats()["appends"] == 0
+    _assert_same_as_full(cache, window, out)
+    # Frame bắt đầu trước entry: không bỏ mất các dòng đầu
+    longer = _candles(closes[:151])
+    out = cache.get(longer, "AAAUSDT", "1m")
+    assert out.index[0] == cache._compute_full(longer).dropna().index[0]
+
+
+def test_append_matches_full_computation():
+    cache = IndicatorCache()
+    closes = 100 + np.cumsum(np.sin(np.arange(200)))
+    cache.get(_candles(closes[:150]), "AAAUSDT", "1m")
+    grown = _candles(closes[:160])
+    out = cache.get(grown, "AAAUSDT", "1m")
+    assert cache.get_stats()["appends"] == 1
+    _assert_same_as_full(cache, grown, out)
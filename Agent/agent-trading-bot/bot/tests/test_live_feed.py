@@ -0,0 +1,41 @@
+import numpy as np
+
+from data.kline_parser import arrays_to_dataframe
+from data.live_feed import LiveFeed
+
+
+class NoCollector:
+    def stream_realtime(self, callback, on_partial_callback=None):
+        pass
+
+    def stop_stream(self):
+        pass
+
+
+def _candles(n):
+    closes = 100 + np.cumsum(np.sin(np.arange(n)))
+    return [{"timestamp": i * 60_000, "open": c, "high": c + 1, "low": c - 1, "close": c, "volume": 1.0}
+            for i, c in enumerate(closes)]
+
+
+def test_generator_history_feeds_indicators_and_candles():
+    history = _candles(100)
+    from_list = LiveFeed("BTCUSDT", "1m", collector=NoCollector())
+    from_list.warm_start(history)
+    from_generator = LiveFeed("BTCUSDT", "1m", collector=NoCollector())
+    from_generator.warm_start(candle for candle in history)
+    assert from_generator.indicators.count == 100
+    assert from_generator.indicators.last_values == from_list.indicators.last_values
+    assert list(from_generator.candles) == history
+
+
+def test_dataframe_history_populates_candles():
+    history = _candles(600)
+    columns = {key: np.array([c[key] for c in history]) for key in history[0]}
+    columns["close_time"] = columns["timestamp"] + 59_999
+    feed = LiveFeed("BTCUSDT", "1m", collector=NoCollector())
+    feed.warm_start(arrays_to_dataframe(columns))
+    assert feed.indicators.count == 600
+    assert len(feed.candles) == feed.candles.maxlen
+    assert feed.candles[-1]["close"] == history[-1]["close"]
+    assert "open_time" in feed.candles[-1]
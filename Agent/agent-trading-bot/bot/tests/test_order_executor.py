@@ -0,0 +1,69 @@
+import requests
+
+from core.order_executor import OrderExecutor
+
+
+class NoRules:
+    def rules(self, symbol):
+        return None
+
+    def symbol_info(self, symbol):
+        return None
+
+
+class FakeApi:
+    """Trả lần lượt các phản hồi trong `responses`; phần tử là Exception thì raise."""
+
+    def __init__(self, responses, existing=None):
+        self.responses = list(responses)
+        self.existing = existing or {}
+        self.sent = []
+        self.lookups = []
+
+    def place_order(self, return_errors=False, **order):
+        self.sent.append(order["new_client_order_id"])
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return dict(response, clientOrderId=order["new_client_order_id"]) if "orderId" in response else response
+
+    def get_order(self, symbol, client_order_id=None):
+        self.lookups.append(client_order_id)
+        return self.existing.get(client_order_id, {"code": -2013, "msg": "Order does not exist."})
+
+
+def _executor(api, max_retries=3):
+    return OrderExecutor(api, max_retries=max_retries, retry_delay=0, tracker=object(), exchange_info=NoRules())
+
+
+def _order(client_order_id="bot-1"):
+    return {"symbol": "BTCUSDT", "side": "BUY", "order_type": "MARKET", "quantity": 1,
+            "new_client_order_id": client_order_id}
+
+
+def test_transient_error_is_retried_with_the_same_client_order_id():
+    api = FakeApi([{"code": -1001, "msg": "Internal error"}, {"orderId": 7}])
+    result = _executor(api)._submit([_order()], use_batch=False)
+    assert result[0]["orderId"] == 7
+    assert api.sent == ["bot-1", "bot-1"]
+    assert api.lookups == ["bot-1"]  # Tra lệnh trước khi gửi lại
+
+
+def test_order_that_reached_the_exchange_is_recovered_not_resent():
+    api = FakeApi([requests.exceptions.ReadTimeout("timeout")], existing={"bot-1": {"orderId": 9}})
+    result = _executor(api)._submit([_order()], use_batch=False)
+    assert result[0]["orderId"] == 9
+    assert api.sent == ["bot-1"]
+
+
+def test_rejected_order_is_not_retried():
+    api = FakeApi([{"code": -2019, "msg": "Margin is insufficient."}])
+    assert _executor(api)._submit([_order()], use_batch=False) == [None]
+    assert api.sent == ["bot-1"]
+    assert api.lookups == []
+
+
+def test_gives_up_after_max_retries():
+    api = FakeApi([requests.exceptions.ConnectionError("down")] * 2)
+    assert _executor(api, max_retries=2)._submit([_order()], use_batch=False) == [None]
+    assert api.sent == ["bot-1", "bot-1"]
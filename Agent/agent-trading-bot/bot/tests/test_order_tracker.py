@@ -0,0 +1,20 @@
+from core.order_tracker import OrderTracker
+
+FILLED = {"orderId": 1, "status": "FILLED", "executedQty": "1", "updateTime": 5}
+
+
+def test_final_update_applied_twice_resolves_once():
+    tracker = OrderTracker(api=None)
+    handle = tracker.track("BTCUSDT", {"orderId": 1, "status": "NEW"})
+    set_result = handle.future.set_result
+
+    def racing_set_result(result):
+        # Luồng khác (poll REST) áp dụng cùng trạng thái cuối giữa lúc nhả lock và set_result
+        tracker._apply(handle, FILLED, "rest")
+        set_result(result)
+
+    handle.future.set_result = racing_set_result
+    tracker._apply(handle, FILLED, "stream")
+    assert handle.result(timeout=0)["status"] == "FILLED"
+    assert tracker.stats["resolved_by_stream"] == 1
+    assert tracker.stats["resolved_by_poll"] == 0
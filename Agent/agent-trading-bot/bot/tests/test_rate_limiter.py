@@ -0,0 +1,65 @@
+import pytest
+
+from core.rate_limiter import LANE_MARKET_DATA, RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=960_020.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_market_data_lane_leaves_reserve_for_orders():
+    clock = FakeClock()
+    limiter = RateLimiter(weight_limit=100, reserve_fraction=0.2, clock=clock)
+    for _ in range(80):
+        limiter.acquire("GET", "/fapi/v1/ping")
+    with pytest.raises(TimeoutError):
+        limiter.acquire("GET", "/fapi/v1/ping", timeout=0.05)
+    # Lane lệnh dùng được phần weight chừa lại
+    limiter.acquire("POST", "/fapi/v1/order", {"symbol": "BTCUSDT"}, signed=True, timeout=0.05)
+    stats = limiter.stats()
+    assert stats["weight_available"] == 19
+    assert stats["order"]["requests"] == 1
+    assert stats["market_data"]["requests"] == 80
+    assert stats["queued"] == 0
+
+
+def test_fixed_window_resets_at_the_boundary():
+    clock = FakeClock(960_020.0)  # Giây thứ 20 của phút
+    limiter = RateLimiter(weight_limit=10, reserve_fraction=0.0, clock=clock)
+    limiter.acquire("GET", "/fapi/v2/account", signed=True)
+    limiter.acquire("GET", "/fapi/v2/account", signed=True)
+    assert limiter.weight.wait_time(1) == pytest.approx(40.0)
+    clock.now += 40.0  # Sang phút mới: weight về 0, không nạp dần
+    assert limiter.stats()["weight_available"] == 10
+    limiter.acquire("GET", "/fapi/v2/account", signed=True, timeout=0.05)
+
+
+def test_order_count_window_and_header_sync():
+    clock = FakeClock(960_000.0)
+    limiter = RateLimiter(orders_per_10s=2, clock=clock)
+    limiter.acquire("POST", "/fapi/v1/order", signed=True)
+    limiter.acquire("POST", "/fapi/v1/order", signed=True)
+    with pytest.raises(TimeoutError):
+        limiter.acquire("POST", "/fapi/v1/order", signed=True, timeout=0.05)
+    # Hủy lệnh không tính vào ORDERS
+    limiter.acquire("DELETE", "/fapi/v1/order", signed=True, timeout=0.05)
+
+    clock.now += 60.0
+    # Header của request gửi từ cửa sổ trước không chặn cửa sổ mới
+    limiter.update_from_headers({"X-MBX-USED-WEIGHT-1M": "2400"}, sent_at=clock.now - 30)
+    assert limiter.stats()["weight_available"] == 2400
+    limiter.update_from_headers({"X-MBX-USED-WEIGHT-1M": "2000"}, sent_at=clock.now)
+    assert limiter.stats()["weight_available"] == 400
+
+
+def test_429_blocks_every_lane_until_retry_after():
+    limiter = RateLimiter(clock=FakeClock())
+    limiter.update_from_headers({"Retry-After": "30"}, status_code=429)
+    assert limiter.stats()["bans"] == 1
+    for method, path in (("POST", "/fapi/v1/order"), ("GET", "/fapi/v1/klines")):
+        with pytest.raises(TimeoutError):
+            limiter.acquire(method, path, lane=None if method == "POST" else LANE_MARKET_DATA, timeout=0.05)
@@ -0,0 +1,35 @@
+import json
+
+from data.collector import kline_to_candle
+from data.replay import StreamReplayer
+
+MIN = 60_000
+
+
+def _kline(i, closed=True, event_ms=None):
+    k = {"t": i * MIN, "T": (i + 1) * MIN - 1, "s": "BTCUSDT", "o": "1", "h": "2", "l": "0.5", "c": "1.5",
+         "v": "3", "x": closed}
+    return {"e": "kline", "E": (i + 1) * MIN + 250 if event_ms is None else event_ms, "s": "BTCUSDT", "k": k}
+
+
+def _events(path, lines):
+    path.write_text("\n".join(json.dumps(line, default=str) for line in lines) + "\n")
+    return [(ms, closed) for ms, _, closed in StreamReplayer(str(path))._iter_events()]
+
+
+def test_every_source_is_paced_by_close_time(tmp_path):
+    rest = [[i * MIN, "1", "2", "0.5", "1.5", "3", (i + 1) * MIN - 1] for i in range(3)]
+    # Recorder nhận frame trễ vài giây: thời điểm nhận không được dùng để phát lại
+    frames = [{"t": (i + 1) * MIN + 5_000, "msg": json.dumps(_kline(i))} for i in range(3)]
+    dicts = [kline_to_candle(_kline(i)["k"]) for i in range(3)]
+
+    expected = [((i + 1) * MIN - 1, True) for i in range(3)]
+    assert _events(tmp_path / "rest.jsonl", rest) == expected
+    assert _events(tmp_path / "frames.jsonl", frames) == expected
+    assert _events(tmp_path / "dicts.jsonl", dicts) == expected
+
+
+def test_partial_frames_use_exchange_event_time(tmp_path):
+    frames = [{"t": 99_999_999, "msg": json.dumps(_kline(0, closed=False, event_ms=30_000))},
+              {"t": 99_999_999, "msg": json.dumps(_kline(0))}]
+    assert _events(tmp_path / "frames.jsonl", frames) == [(30_000, False), (MIN - 1, True)]
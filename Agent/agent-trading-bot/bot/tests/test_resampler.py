@@ -0,0 +1,60 @@
+import numpy as np
+
+from data.resampler import MultiTimeframeResampler, bucket_start, resample_arrays, WEEK_MS
+
+MIN = 60_000
+
+
+def _candle(i, close=None):
+    close = float(i) if close is None else close
+    return {"timestamp": i * MIN, "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": 1.0}
+
+
+def test_bar_closes_on_last_base_candle_and_matches_batch_resample():
+    resampler = MultiTimeframeResampler("1m", ("5m", "15m"))
+    closed = {"5m": [], "15m": []}
+    for tf in closed:
+        resampler.on_close(tf, closed[tf].append)
+    candles = [_candle(i) for i in range(30)]
+    for candle in candles:
+        resampler.on_candle(candle)
+
+    assert [bar["timestamp"] // MIN for bar in closed["5m"]] == list(range(0, 30, 5))
+    assert len(closed["15m"]) == 2 and all(bar["complete"] for bar in closed["15m"])
+    bar = closed["5m"][1]
+    assert (bar["open"], bar["high"], bar["low"], bar["close"], bar["volume"]) == (5.0, 10.0, 4.0, 9.0, 5.0)
+
+    arrays = {key: np.array([c[key] for c in candles]) for key in ("timestamp", "open", "high", "low", "close", "volume")}
+    batch = resample_arrays(arrays, 5 * MIN)
+    assert list(batch["close"]) == [b["close"] for b in closed["5m"]]
+    assert list(batch["high"]) == [b["high"] for b in closed["5m"]]
+
+
+def test_duplicates_are_ignored_and_gaps_close_incomplete_bars():
+    resampler = MultiTimeframeResampler("1m", ("5m",))
+    closed = []
+    resampler.on_close("5m", closed.append)
+    for i in (0, 1, 1, 0, 2, 7, 8, 9):  # Gửi lại sau reconnect, rồi mất nến 3-6
+        resampler.on_candle(_candle(i))
+    assert [(bar["timestamp"] // MIN, bar["base_count"], bar["complete"]) for bar in closed] == [
+        (0, 3, False), (5, 3, False)
+    ]
+    assert closed[0]["volume"] == 3.0
+
+
+def test_partial_bar_includes_the_live_base_candle():
+    resampler = MultiTimeframeResampler("1m", ("5m",))
+    resampler.on_candle(_candle(0))
+    resampler.on_candle(_candle(1))
+    resampler.on_partial_candle(_candle(2, close=50.0))
+    partial = resampler.get_partial("5m")
+    assert (partial["timestamp"], partial["close"], partial["high"], partial["base_count"]) == (0, 50.0, 51.0, 3)
+    # Frame trễ của nến đã đóng không ghi đè
+    resampler.on_partial_candle(_candle(1, close=-5.0))
+    assert resampler.get_partial("5m")["close"] == 50.0
+
+
+def test_weekly_buckets_start_on_monday():
+    monday = 1_704_067_200_000  # 2024-01-01 00:00 UTC, thứ Hai
+    assert bucket_start(monday + 3 * 86_400_000, WEEK_MS) == monday
+    assert bucket_start(monday - 1, WEEK_MS) == monday - WEEK_MS
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+import requests
+
+from core.exchange_api import BinanceAPI
+from core.signer import RequestSigner
+
+
+def _response(status, body):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode()
+    response.timing = {"queue_ms": 0.0, "http_ms": 1.0}
+    return response
+
+
+class FakeTransport:
+    """Trả lần lượt các response; status >= 400 thì raise HTTPError như HttpTransport."""
+
+    metrics = None
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.timestamps = []
+
+    def request(self, method, path, params=None, headers=None, client="other", sign=None, **kwargs):
+        if sign is not None:
+            self.timestamps.append(sign()[0]["timestamp"])
+        response = self.responses.pop(0)
+        if response.status_code >= 400:
+            raise requests.exceptions.HTTPError(response=response)
+        return response
+
+
+def test_timestamp_error_resyncs_and_resends_once():
+    transport = FakeTransport([_response(400, {"code": -1021, "msg": "Timestamp outside recvWindow"}),
+                               _response(200, {"orderId": 1})])
+    signer = RequestSigner("secret")
+    assert signer.send(transport, "POST", "/fapi/v1/order", {"symbol": "BTCUSDT"}, signed=True) == {"orderId": 1}
+    assert len(transport.timestamps) == 2
+    assert signer.stats["timestamp_errors"] == 1
+    assert signer.latency_stats()["orders"] == 1
+
+
+def test_api_returns_exchange_errors_and_raises_unknown_outcomes():
+    transport = FakeTransport([_response(400, {"code": -2019, "msg": "Margin is insufficient."}),
+                               _response(502, {}), _response(400, {"code": -1021, "msg": ""}),
+                               _response(400, {"code": -1021, "msg": ""})])
+    api = BinanceAPI("key", "secret", transport=transport, signer=RequestSigner("secret"))
+    assert api._request("POST", "/fapi/v1/order", signed=True, return_errors=True)["code"] == -2019
+    with pytest.raises(requests.exceptions.HTTPError):
+        api._request("POST", "/fapi/v1/order", signed=True, return_errors=True)
+    # -1021 lần hai thì trả lỗi, không gửi lại mãi
+    assert api._request("POST", "/fapi/v1/order", signed=True) is None
+    assert transport.responses == []
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from backtest.event_loop import BacktestEventLoop
+from backtest.sim_exchange import SimulatedExchange, SimulatedUserStream
+from bot import TradingBot
+
+
+def _candles(n=200):
+    close = 30000 + np.cumsum(np.random.default_rng(0).normal(0, 20, n))
+    return pd.DataFrame({
+        "timestamp": np.arange(n, dtype=np.int64) * 60_000,
+        "open": close, "high": close + 10, "low": close - 10, "close": close, "volume": np.ones(n),
+    })
+
+
+class AlternatingPredictor:
+    """Model giả: BUY/SELL xen kẽ mỗi 10 nến, còn lại HOLD."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict_action(self, df, symbol=None, interval=None):
+        self.calls += 1
+        if self.calls % 10:
+            return "HOLD"
+        return "BUY" if (self.calls // 10) % 2 else "SELL"
+
+
+def test_run_once_trades_on_simulated_exchange(tmp_path):
+    exchange = SimulatedExchange(_candles(), symbol="BTCUSDT", leverage=5)
+    predictor = AlternatingPredictor()
+    bot = TradingBot({"symbol": "BTCUSDT", "quantity": 0.01, "interval": "1m"}, api=exchange, predictor=predictor)
+    result = BacktestEventLoop(exchange, bot.run_once, warmup=60).run()
+
+    assert predictor.calls == result.cycles - 60
+    # Mỗi tín hiệu mở hoặc đảo vị thế; lệnh đảo chiều khớp một lần
+    assert result.stats["fills"] >= 10
+    assert len(bot.memory.get_records("trades", limit=1000)) == predictor.calls
+    assert bot.account_cache is None and bot.user_stream is None
+
+
+def test_run_once_with_user_stream_uses_account_cache_and_tracker():
+    exchange = SimulatedExchange(_candles(), symbol="BTCUSDT", leverage=5)
+    stream = SimulatedUserStream()
+    exchange.attach_user_stream(stream)
+    bot = TradingBot({"symbol": "BTCUSDT", "quantity": 0.01, "interval": "1m"}, api=exchange,
+                     user_stream=stream, predictor=AlternatingPredictor())
+    stream.start()
+    result = BacktestEventLoop(exchange, bot.run_once, warmup=60).run()
+
+    assert result.stats["fills"] >= 10
+    assert exchange.account_cache is bot.account_cache
+    assert bot.account_cache.stats["events"] > 0
+    assert bot.executor.tracker.stats["events"] > 0
@@ -0,0 +1,20 @@
+from core.transport import HttpTransport
+
+
+def test_resize_pool_closes_the_replaced_adapter():
+    transport = HttpTransport("http://localhost", pool_size=2, metrics=None)
+    old = transport.session.adapters["http://"]
+    closed = []
+    old.close = lambda: closed.append(old)
+    transport.resize_pool(8)
+    assert transport.session.adapters["http://"] is not old
+    assert closed == [old]
+    transport.resize_pool(4)  # Nhỏ hơn pool hiện tại: giữ nguyên
+    assert transport.pool_size == 8
+
+
+def test_retry_after_is_capped_at_backoff_max():
+    transport = HttpTransport("http://localhost", backoff_max=2.0, metrics=None)
+    assert transport._backoff(0, "60") == 2.0
+    assert transport._backoff(0, "0.5") == 0.5
+    assert 0.0 <= transport._backoff(5, "soon") <= 2.0
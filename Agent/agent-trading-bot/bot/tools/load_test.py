@@ -0,0 +1,230 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.exchange_api import BinanceAPI
+from core.metrics import MetricsRegistry, HTTP_DURATION, HTTP_ERRORS, HTTP_REQUESTS, HTTP_RETRIES
+from core.order_executor import OrderExecutor
+from core.position_manager import PositionManager
+from core.rate_limiter import RateLimiter
+from core.transport import HttpTransport
+from data.collector import BinanceFuturesCollector
+from tools.mock_binance import MockBinanceServer
+
+
+def _summary(latencies: List[float]) -> Dict:
+    if not latencies:
+        return {"count": 0}
+    values = np.asarray(latencies)
+    return {
+        "count": len(values),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+class OrderLoadTest:
+    """
+    Đo throughput đặt lệnh của OrderExecutor/PositionManager/collector trên server giả lập.
+
+    `threads` luồng đặt lệnh MARKET liên tục trong `duration` giây (mỗi luồng một symbol xoay vòng,
+    BUY/SELL xen kẽ để vị thế không phình ra); batch_size > 1 thì gửi qua place_orders (batchOrders).
+    Song song đó một luồng backfill nến (collector.backfill_arrays) và một luồng đọc vị thế
+    (PositionManager.update_position) để đo ảnh hưởng của lane ưu tiên trong RateLimiter.
+    Cuối cùng đóng mọi vị thế bằng PositionManager.close_position.
+
+    Với giới hạn thật (300 lệnh/10s) RateLimiter giữ throughput quanh 30 lệnh/s và lane lệnh chiếm
+    trước lane đọc tài khoản; tăng orders_per_10s (cả phía server) để đo riêng đường đi của lệnh.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        symbols: List[str],
+        threads: int = 8,
+        batch_size: int = 1,
+        quantity: float = 0.001,
+        backfill_days: int = 0,
+        interval: str = "1m",
+        weight_limit: int = 2400,
+        orders_per_10s: int = 300
+    ):
+        self.symbols = symbols
+        self.threads = threads
+        self.batch_size = batch_size
+        self.quantity = quantity
+        self.backfill_days = backfill_days
+        self.interval = interval
+        # Transport + metric riêng (không dùng bản chung của process) để số liệu chỉ gồm request của bài test
+        self.metrics = MetricsRegistry()
+        self.transport = HttpTransport(base_url, pool_size=threads + 4, metrics=self.metrics,
+                                       rate_limiter=RateLimiter(weight_limit=weight_limit, orders_per_10s=orders_per_10s))
+        self.api = BinanceAPI("load-test", "load-test", transport=self.transport)
+        self.executor = OrderExecutor(self.api, retry_delay=0.05, max_workers=threads)
+        self.positions = {s: PositionManager(self.api, s) for s in symbols}
+        self.collector = BinanceFuturesCollector(symbols[0], interval, transport=self.transport)
+        self._lock = threading.Lock()
+        self._order_latencies: List[float] = []
+        self._position_latencies: List[float] = []
+        self._orders_ok = 0
+        self._orders_failed = 0
+        self._stop = threading.Event()
+
+    def _record(self, latency_ms: float, results: List[Optional[Dict]]):
+        ok = sum(1 for r in results if r and "orderId" in r)
+        with self._lock:
+            self._order_latencies.append(latency_ms)
+            self._orders_ok += ok
+            self._orders_failed += len(results) - ok
+
+    def _order_worker(self, worker: int):
+        symbol = self.symbols[worker % len(self.symbols)]
+        side = "BUY" if worker % 2 == 0 else "SELL"
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            if self.batch_size > 1:
+                # Cặp BUY/SELL trong cùng batch giữ vị thế quanh 0
+                sides = [("BUY", "SELL")[i % 2] for i in range(self.batch_size)]
+                results = self.executor.place_orders(
+                    [{"symbol": symbol, "side": s, "quantity": self.quantity} for s in sides]
+                )
+            else:
+                results = [self.executor.place_order(symbol, side, self.quantity, timeout=0)]
+                side = "SELL" if side == "BUY" else "BUY"
+            self._record((time.perf_counter() - started) * 1000, results)
+
+    def _position_worker(self):
+        while not self._stop.wait(0.2):
+            for manager in self.positions.values():
+                started = time.perf_counter()
+                manager.update_position()
+                with self._lock:
+                    self._position_latencies.append((time.perf_counter() - started) * 1000)
+
+    def _backfill(self) -> Dict:
+        end = int(time.time() * 1000)
+        self.collector.backfill_arrays(end - self.backfill_days * 86_400_000, end)
+        return dict(self.collector.last_backfill_stats)
+
+    def _http_report(self) -> Dict:
+        """Tổng hợp từ MetricsRegistry: tổng request/retry/lỗi và độ trễ theo endpoint."""
+        requests_total = self.metrics.counters(HTTP_REQUESTS)
+        retries = self.metrics.counters(HTTP_RETRIES)
+        errors = self.metrics.counters(HTTP_ERRORS)
+        endpoints = {}
+        for (client, method, path), h in sorted(self.metrics.histograms(HTTP_DURATION).items()):
+            endpoints[f"{client} {method} {path}"] = {
+                "count": h["count"],
+                "avg_ms": round(h["sum"] / h["count"] * 1000, 2) if h["count"] else 0.0,
+                "p50_ms": round(h["p50"] * 1000, 2),
+                "p99_ms": round(h["p99"] * 1000, 2),
+                "errors": int(sum(v for k, v in errors.items() if k[:3] == (client, method, path))),
+                "retries": int(retries.get((client, method, path), 0)),
+            }
+        return {
+            "requests": int(sum(requests_total.values())),
+            "retries": int(sum(retries.values())),
+            "errors": {reason: int(sum(v for k, v in errors.items() if k[3] == reason))
+                       for reason in sorted({k[3] for k in errors})},
+            "endpoints": endpoints,
+        }
+
+    def run(self, duration: float = 10.0) -> Dict:
+        self.executor.exchange_info.load()
+        self.transport.warm_up(self.threads)
+        logging.info(f"[LoadTest] {self.threads} luồng x {duration:.0f}s, batch {self.batch_size}, symbol {self.symbols}")
+
+        backfill_stats = {}
+        with ThreadPoolExecutor(max_workers=self.threads + 2) as pool:
+            started = time.perf_counter()
+            workers = [pool.submit(self._order_worker, i) for i in range(self.threads)]
+            workers.append(pool.submit(self._position_worker))
+            backfill = pool.submit(self._backfill) if self.backfill_days > 0 else None
+            time.sleep(duration)
+            self._stop.set()
+            for future in workers:
+                future.result()
+            elapsed = time.perf_counter() - started
+            if backfill is not None:
+                backfill_stats = backfill.result()
+
+        close_latencies = []
+        for manager in self.positions.values():
+            manager.update_position()
+            t = time.perf_counter()
+            if manager.close_position() is not None:
+                close_latencies.append((time.perf_counter() - t) * 1000)
+
+        limiter = self.transport.rate_limiter.stats()
+        return {
+            "seconds": round(elapsed, 2),
+            "orders_ok": self._orders_ok,
+            "orders_failed": self._orders_failed,
+            "orders_per_second": round(self._orders_ok / elapsed, 1) if elapsed > 0 else 0.0,
+            "order_requests": _summary(self._order_latencies),
+            "position_reads": _summary(self._position_latencies),
+            "close_position": _summary(close_latencies),
+            "backfill": backfill_stats,
+            "http": self._http_report(),
+            "rate_limiter": {"bans": limiter["bans"], "blocked_for": round(limiter["blocked_for"], 2)},
+            "signer": self.api.signer.latency_stats(),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Thử tải đặt lệnh trên server Binance Futures giả lập")
+    parser.add_argument("--base-url", help="Server có sẵn; bỏ trống thì chạy MockBinanceServer trong process")
+    parser.add_argument("--symbols", default="BTCUSDT,ETHUSDT")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch-size", type=int, default=1, help="> 1: gửi lệnh qua batchOrders (tối đa 5)")
+    parser.add_argument("--backfill-days", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Độ trễ xử lý của server giả lập")
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Tỉ lệ request trả 503 (-1001)")
+    parser.add_argument("--server-weight-limit", type=int, default=2400,
+                        help="Giới hạn weight/phút của server; đặt thấp hơn --client-weight-limit để thử 429")
+    parser.add_argument("--client-weight-limit", type=int, default=2400, help="Giới hạn weight của RateLimiter phía bot")
+    parser.add_argument("--server-orders-per-10s", type=int, default=300)
+    parser.add_argument("--client-orders-per-10s", type=int, default=300)
+    parser.add_argument("--metrics-file", help="Ghi metric Prometheus của bài test ra file này")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level)
+
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = MockBinanceServer(
+            symbols=symbols, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate, weight_limit=args.server_weight_limit,
+            orders_per_10s=args.server_orders_per_10s
+        ).start()
+        base_url = server.base_url
+    try:
+        test = OrderLoadTest(base_url, symbols, threads=args.threads, batch_size=min(args.batch_size, 5),
+                             backfill_days=args.backfill_days, weight_limit=args.client_weight_limit,
+                             orders_per_10s=args.client_orders_per_10s)
+        report = test.run(args.duration)
+        if args.metrics_file:
+            test.metrics.write_textfile(args.metrics_file)
+    finally:
+        if server is not None:
+            report_server = dict(server.stats)
+            server.stop()
+    if server is not None:
+        report["server"] = report_server
+    print(json.dumps(report, indent=2, default=str))
+    return report
+
+
+if __name__ == "__main__":
+    main()
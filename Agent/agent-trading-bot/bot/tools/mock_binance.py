@@ -0,0 +1,558 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import random
+import socket
+import struct
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlparse
+
+import numpy as np
+
+from backtest.sim_exchange import SimulatedExchange
+from core.rate_limiter import endpoint_weight, order_count
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+INTERVAL_MS = {"1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+               "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "1d": 86_400_000}
+
+
+# ========== NẾN TỔNG HỢP ==========
+
+def _noise(keys: np.ndarray, seed: int) -> np.ndarray:
+    """Nhiễu tất định trong [0, 1) theo khóa nguyên (cùng nến luôn ra cùng giá)."""
+    x = (keys.astype(np.uint64) * np.uint64(2654435761) + np.uint64(seed)) % np.uint64(1_000_003)
+    return x.astype(np.float64) / 1_000_003
+
+
+def synthetic_klines(symbol: str, interval_ms: int, open_times: np.ndarray, base_price: float) -> Dict[str, np.ndarray]:
+    """OHLCV tất định cho mọi khoảng thời gian: sóng ngày + nhiễu theo từng nến."""
+    seed = zlib.crc32(symbol.encode())
+    keys = open_times // interval_ms
+
+    def price(t):
+        return base_price * (1 + 0.02 * np.sin(2 * np.pi * t / 86_400_000) + 0.004 * (_noise(t // interval_ms, seed) - 0.5))
+
+    open_ = price(open_times)
+    close = price(open_times + interval_ms)
+    spread = 1 + 0.002 * _noise(keys, seed + 1)
+    return {
+        "timestamp": open_times,
+        "open": open_,
+        "high": np.maximum(open_, close) * spread,
+        "low": np.minimum(open_, close) / spread,
+        "close": close,
+        "volume": 10 + 100 * _noise(keys, seed + 2),
+    }
+
+
+def _kline_rows(k: Dict[str, np.ndarray], interval_ms: int) -> List:
+    return [
+        [int(t), f"{o:.2f}", f"{h:.2f}", f"{l:.2f}", f"{c:.2f}", f"{v:.3f}", int(t) + interval_ms - 1,
+         f"{v * c:.2f}", 100, f"{v / 2:.3f}", f"{v * c / 2:.2f}", "0"]
+        for t, o, h, l, c, v in zip(k["timestamp"], k["open"], k["high"], k["low"], k["close"], k["volume"])
+    ]
+
+
+# ========== WEBSOCKET (RFC 6455, phía server, chỉ frame text) ==========
+
+class _WsClient:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def send(self, text: str):
+        payload = text.encode("utf-8")
+        n = len(payload)
+        if n < 126:
+            header = struct.pack("!BB", 0x81, n)
+        elif n < 65536:
+            header = struct.pack("!BBH", 0x81, 126, n)
+        else:
+            header = struct.pack("!BBQ", 0x81, 127, n)
+        self._send_raw(header + payload)
+
+    def _send_raw(self, data: bytes):
+        with self._lock:
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.closed = True
+
+    def _recv_exact(self, n: int) -> bytes:
+        data = b""
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("client đóng kết nối")
+            data += chunk
+        return data
+
+    def read_loop(self):
+        """Đọc frame từ client: trả lời ping, kết thúc khi nhận close hoặc mất kết nối."""
+        try:
+            while not self.closed:
+                b0, b1 = self._recv_exact(2)
+                opcode, n = b0 & 0x0F, b1 & 0x7F
+                if n == 126:
+                    n = struct.unpack("!H", self._recv_exact(2))[0]
+                elif n == 127:
+                    n = struct.unpack("!Q", self._recv_exact(8))[0]
+                mask = self._recv_exact(4) if b1 & 0x80 else b"\0\0\0\0"
+                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(self._recv_exact(n)))
+                if opcode == 0x8:
+                    self._send_raw(b"\x88\x00")
+                    break
+                if opcode == 0x9:
+                    self._send_raw(struct.pack("!BB", 0x8A, len(payload)) + payload)
+        except (ConnectionError, OSError, ValueError):
+            pass
+        self.closed = True
+
+    def close(self):
+        self._send_raw(b"\x88\x00")
+        self.closed = True
+
+
+class _UserStreamBroadcaster:
+    """Đóng vai SimulatedUserStream cho SimulatedExchange: đẩy sự kiện tới client WS của listenKey."""
+
+    def __init__(self, server: "MockBinanceServer"):
+        self.server = server
+
+    def push(self, event: Dict):
+        # Giờ sàn thật thay cho giờ nến giả lập
+        now = self.server.server_time()
+        event["E"] = event["T"] = now
+        if "o" in event:
+            event["o"]["T"] = now
+        self.server.broadcast_user_event(event)
+
+
+# ========== SERVER ==========
+
+class MockBinanceServer:
+    """
+    Server Binance USDⓈ-M Futures giả lập chạy cục bộ (http://127.0.0.1:port, ws://127.0.0.1:port).
+
+    REST: ping, time, exchangeInfo, klines, depth, ticker/price, account, positionRisk, order (POST/GET/DELETE),
+    openOrders, batchOrders, leverage, marginType, listenKey. WebSocket: /ws/<symbol>@kline_<interval>,
+    /stream?streams=... (combined) và /ws/<listenKey> (user-data: ORDER_TRADE_UPDATE, ACCOUNT_UPDATE).
+
+    Lệnh được khớp bởi SimulatedExchange (mỗi symbol một sàn giả lập trên nến tổng hợp, sang nến mới
+    mỗi `tick_interval` giây). Nến REST/WS là nến tổng hợp tất định theo thời gian thực.
+
+    Cấu hình thử tải:
+        latency_ms, jitter_ms: độ trễ xử lý mỗi request.
+        error_rate: tỉ lệ request trả 503 (-1001), mô phỏng sàn quá tải.
+        weight_limit: request weight mỗi phút; vượt thì trả 429 kèm Retry-After như sàn thật.
+        orders_per_10s: số lệnh mới mỗi 10 giây; vượt thì trả 429 (-1015).
+        rate_limit_rate: tỉ lệ request bị ép trả 429 dù chưa vượt giới hạn.
+        clock_skew_ms: lệch đồng hồ server so với máy (thử RequestSigner).
+        api_secret: nếu có, kiểm tra chữ ký HMAC (-1022) và recvWindow (-1021).
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        symbols: Iterable[str] = ("BTCUSDT",),
+        base_price: float = 30000.0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        weight_limit: int = 2400,
+        orders_per_10s: int = 300,
+        rate_limit_rate: float = 0.0,
+        clock_skew_ms: int = 0,
+        api_secret: Optional[str] = None,
+        initial_balance: float = 1_000_000.0,
+        tick_interval: float = 1.0,
+        kline_push_interval: float = 1.0,
+        seed: int = 0
+    ):
+        self.symbols = [s.upper() for s in symbols]
+        self.base_price = base_price
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.weight_limit = weight_limit
+        self.orders_per_10s = orders_per_10s
+        self.rate_limit_rate = rate_limit_rate
+        self.clock_skew_ms = clock_skew_ms
+        self.api_secret = api_secret
+        self.tick_interval = tick_interval
+        self.kline_push_interval = kline_push_interval
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._weight_window = 0
+        self._weight_used = 0
+        self._orders_window = 0
+        self._orders_used = 0
+        self._listen_keys: Dict[str, List[_WsClient]] = {}
+        self._kline_clients: Dict[str, List[_WsClient]] = {}  # stream name -> client (None: /ws, True: combined)
+        self._combined: Dict[_WsClient, bool] = {}
+        self._last_pushed: Dict[str, int] = {}
+        self.stats = {"requests": 0, "errors_injected": 0, "rate_limited": 0, "orders": 0, "ws_messages": 0}
+
+        # Mỗi symbol một sàn giả lập trên 2000 nến 1m tổng hợp gần nhất
+        now = int(time.time() * 1000)
+        open_times = np.arange(now // 60_000 - 2000, now // 60_000, dtype=np.int64) * 60_000
+        self.exchanges: Dict[str, SimulatedExchange] = {}
+        broadcaster = _UserStreamBroadcaster(self)
+        for i, symbol in enumerate(self.symbols):
+            candles = synthetic_klines(symbol, 60_000, open_times, base_price / (1 + i))
+            exchange = SimulatedExchange(candles, symbol=symbol, initial_balance=initial_balance,
+                                         tick_size=0.1 if base_price / (1 + i) > 100 else 0.0001)
+            exchange.attach_user_stream(broadcaster)
+            self.exchanges[symbol] = exchange
+        self._exchange_locks = {symbol: threading.Lock() for symbol in self.symbols}
+
+        server = self
+        self.httpd = _HTTPServer((host, port), type("Handler", (_Handler,), {"mock": server}))
+        self.host, self.port = self.httpd.server_address[:2]
+        self.logger = logging.getLogger("MockBinanceServer")
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def ws_base_url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def server_time(self) -> int:
+        return int(time.time() * 1000) + self.clock_skew_ms
+
+    # ========== VÒNG ĐỜI ==========
+
+    def start(self) -> "MockBinanceServer":
+        self._stop.clear()
+        for target in (self.httpd.serve_forever, self._tick_loop, self._kline_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.logger.info(f"[MockBinance] Chạy tại {self.base_url}")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        for clients in list(self._listen_keys.values()) + list(self._kline_clients.values()):
+            for client in clients:
+                client.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _tick_loop(self):
+        while not self._stop.wait(self.tick_interval):
+            for symbol, exchange in self.exchanges.items():
+                with self._exchange_locks[symbol]:
+                    exchange.advance()
+
+    # ========== GIỚI HẠN / LỖI GIẢ LẬP ==========
+
+    def _admit(self, method: str, path: str, params: Dict):
+        """Trả về (status, body, headers) nếu request bị chặn (429/503), None nếu được xử lý."""
+        now = time.time()
+        with self._lock:
+            self.stats["requests"] += 1
+            minute = int(now // 60)
+            if minute != self._weight_window:
+                self._weight_window, self._weight_used = minute, 0
+            ten_sec = int(now // 10)
+            if ten_sec != self._orders_window:
+                self._orders_window, self._orders_used = ten_sec, 0
+            self._weight_used += endpoint_weight(method, path, params)
+            orders = order_count(method, path, params)
+            # Chỉ request đặt lệnh bị giới hạn lệnh; lệnh bị từ chối không tính vào bộ đếm
+            over_orders = orders > 0 and self._orders_used + orders > self.orders_per_10s
+            if not over_orders:
+                self._orders_used += orders
+            headers = {"X-MBX-USED-WEIGHT-1M": str(self._weight_used),
+                       "X-MBX-ORDER-COUNT-10S": str(self._orders_used)}
+            over_weight = self._weight_used > self.weight_limit
+            forced = self._random.random() < self.rate_limit_rate
+            failed = self._random.random() < self.error_rate
+            if over_weight or over_orders or forced:
+                self.stats["rate_limited"] += 1
+                if over_weight:
+                    headers["Retry-After"] = str(max(1, int(60 - now % 60)))
+                    return 429, {"code": -1003, "msg": "Too many requests."}, headers
+                headers["Retry-After"] = str(max(1, int(10 - now % 10)) if over_orders else 1)
+                return 429, {"code": -1015, "msg": "Too many new orders."}, headers
+            if failed:
+                self.stats["errors_injected"] += 1
+                return 503, {"code": -1001, "msg": "Internal error; unable to process your request."}, headers
+        return None, None, headers
+
+    def _check_signature(self, raw_query: str, params: Dict):
+        if not self.api_secret or "signature" not in params:
+            return None
+        payload = raw_query.rsplit("&signature=", 1)[0]
+        expected = hmac.new(self.api_secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+        if expected != params["signature"]:
+            return 400, {"code": -1022, "msg": "Signature for this request is not valid."}
+        now = self.server_time()
+        timestamp, window = int(params.get("timestamp", 0)), int(params.get("recvWindow", 5000))
+        if timestamp < now - window or timestamp > now + 1000:
+            return 400, {"code": -1021, "msg": "Timestamp for this request is outside of the recvWindow."}
+        return None
+
+    # ========== REST ==========
+
+    def handle(self, method: str, path: str, raw_query: str, params: Dict):
+        """Trả về (status, body, headers)."""
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+        status, body, headers = self._admit(method, path, params)
+        if status is not None:
+            return status, body, headers
+        rejected = self._check_signature(raw_query, params)
+        if rejected is not None:
+            return rejected[0], rejected[1], headers
+        try:
+            status, body = self._route(method, path, params)
+        except (KeyError, ValueError) as e:
+            status, body = 400, {"code": -1102, "msg": str(e)}
+        return status, body, headers
+
+    def _route(self, method: str, path: str, params: Dict):
+        if path == "/fapi/v1/ping":
+            return 200, {}
+        if path == "/fapi/v1/time":
+            return 200, {"serverTime": self.server_time()}
+        if path == "/fapi/v1/exchangeInfo":
+            return 200, {"serverTime": self.server_time(),
+                         "symbols": [ex.get_symbol_info(s) for s, ex in self.exchanges.items()]}
+        if path == "/fapi/v1/klines":
+            return 200, self._klines(params)
+        if path == "/fapi/v1/depth":
+            return 200, self._depth(params)
+        if path == "/fapi/v1/ticker/price":
+            symbols = [params["symbol"]] if "symbol" in params else self.symbols
+            prices = [{"symbol": s, "price": f"{self.exchanges[s].mark_price:.2f}", "time": self.server_time()}
+                      for s in symbols]
+            return 200, prices[0] if "symbol" in params else prices
+        if path == "/fapi/v1/listenKey":
+            return 200, self._listen_key(method, params)
+        if path == "/fapi/v2/account":
+            return 200, self._account()
+        if path == "/fapi/v2/positionRisk":
+            symbols = [params["symbol"]] if "symbol" in params else self.symbols
+            return 200, [p for s in symbols for p in self._call(s, "GET", path, params)]
+        if path == "/fapi/v1/openOrders":
+            symbols = [params["symbol"]] if "symbol" in params else self.symbols
+            return 200, [self.exchanges[s]._order_response(self.exchanges[s].orders[i])
+                         for s in symbols for i in list(self.exchanges[s].open_order_ids)]
+        if path == "/fapi/v1/batchOrders" and method == "POST":
+            orders = json.loads(params["batchOrders"])
+            if len(orders) > 5:
+                return 400, {"code": -1130, "msg": "batchOrders tối đa 5 lệnh"}
+            return 200, [self._place(order)[1] for order in orders]
+        if path == "/fapi/v1/order" and method == "POST":
+            return self._place(params)
+        if path == "/fapi/v1/order":
+            try:
+                return 200, self._call(params["symbol"], method, path, params)
+            except ValueError as e:
+                # Mã lỗi như sàn thật: -2013 không tìm thấy lệnh, -2011 hủy lệnh thất bại
+                return 400, {"code": -2013 if method == "GET" else -2011, "msg": str(e)}
+        if path in ("/fapi/v1/leverage", "/fapi/v1/marginType"):
+            return 200, self._call(params["symbol"], method, path, params)
+        return 404, {"code": -5000, "msg": f"Path {path} không được hỗ trợ"}
+
+    def _call(self, symbol: str, method: str, path: str, params: Dict):
+        exchange = self.exchanges.get(symbol)
+        if exchange is None:
+            raise ValueError("Invalid symbol.")
+        with self._exchange_locks[symbol]:
+            body = exchange._routes[(method, path)](dict(params))
+        if isinstance(body, dict) and "updateTime" in body:
+            body["updateTime"] = self.server_time()
+        return body
+
+    def _place(self, params: Dict):
+        self.stats["orders"] += 1
+        try:
+            return 200, self._call(params.get("symbol", ""), "POST", "/fapi/v1/order", params)
+        except ValueError as e:
+            return 400, {"code": -2010, "msg": str(e)}
+
+    def _account(self) -> Dict:
+        accounts = [self._call(s, "GET", "/fapi/v2/account", {}) for s in self.symbols]
+        merged = {"positions": [p for a in accounts for p in a["positions"]], "updateTime": self.server_time()}
+        for key in accounts[0]:
+            if key.startswith("total") or key in ("availableBalance", "maxWithdrawAmount"):
+                merged[key] = f"{sum(float(a[key]) for a in accounts):.8f}"
+        merged["assets"] = [{"asset": "USDT", "walletBalance": merged["totalWalletBalance"],
+                             "availableBalance": merged["availableBalance"]}]
+        return merged
+
+    def _klines(self, params: Dict) -> List:
+        interval_ms = INTERVAL_MS[params.get("interval", "1m")]
+        limit = min(int(params.get("limit", 500)), 1500)
+        now = self.server_time()
+        end = int(params.get("endTime", now))
+        if "startTime" in params:
+            start = int(params["startTime"]) // interval_ms * interval_ms
+            start += interval_ms if start < int(params["startTime"]) else 0
+        else:
+            start = (end // interval_ms - limit + 1) * interval_ms
+        open_times = np.arange(start, min(end, now) + 1, interval_ms, dtype=np.int64)[:limit]
+        return _kline_rows(synthetic_klines(params["symbol"], interval_ms, open_times, self._base(params["symbol"])), interval_ms)
+
+    def _base(self, symbol: str) -> float:
+        return self.base_price / (1 + self.symbols.index(symbol)) if symbol in self.symbols else self.base_price
+
+    def _depth(self, params: Dict) -> Dict:
+        limit = int(params.get("limit", 500))
+        mid = self.exchanges[params["symbol"]].mark_price
+        tick = self.exchanges[params["symbol"]].tick_size
+        return {
+            "lastUpdateId": self.server_time(), "E": self.server_time(), "T": self.server_time(),
+            "bids": [[f"{mid - tick * (i + 1):.4f}", "1.000"] for i in range(limit)],
+            "asks": [[f"{mid + tick * (i + 1):.4f}", "1.000"] for i in range(limit)],
+        }
+
+    def _listen_key(self, method: str, params: Dict) -> Dict:
+        with self._lock:
+            if method == "POST":
+                key = uuid.uuid4().hex
+                self._listen_keys[key] = []
+                return {"listenKey": key}
+            return {}
+
+    # ========== WEBSOCKET ==========
+
+    def attach_ws(self, client: _WsClient, path: str):
+        """Đăng ký client theo URL: /ws/<listenKey>, /ws/<stream>, /stream?streams=a/b."""
+        parsed = urlparse(path)
+        with self._lock:
+            if parsed.path.startswith("/stream"):
+                streams = dict(parse_qsl(parsed.query)).get("streams", "").split("/")
+                self._combined[client] = True
+            else:
+                streams = [parsed.path.rsplit("/", 1)[-1]]
+            for name in streams:
+                if name in self._listen_keys:
+                    self._listen_keys[name].append(client)
+                elif name:
+                    self._kline_clients.setdefault(name, []).append(client)
+
+    def _send(self, clients: List[_WsClient], text: str):
+        for client in list(clients):
+            if client.closed:
+                clients.remove(client)
+                continue
+            client.send(text)
+            self.stats["ws_messages"] += 1
+
+    def broadcast_user_event(self, event: Dict):
+        text = json.dumps(event)
+        for clients in list(self._listen_keys.values()):
+            self._send(clients, text)
+
+    def _kline_loop(self):
+        while not self._stop.wait(self.kline_push_interval):
+            now = self.server_time()
+            with self._lock:
+                streams = {name: list(clients) for name, clients in self._kline_clients.items() if clients}
+            for name, clients in streams.items():
+                symbol, _, interval = name.partition("@kline_")
+                symbol = symbol.upper()
+                interval_ms = INTERVAL_MS.get(interval)
+                if interval_ms is None:
+                    continue
+                current = now // interval_ms * interval_ms
+                previous = self._last_pushed.get(name)
+                events = []
+                if previous is not None and previous != current:
+                    events.append((previous, True))  # Nến trước vừa đóng
+                events.append((current, False))
+                self._last_pushed[name] = current
+                for open_time, closed in events:
+                    k = synthetic_klines(symbol, interval_ms, np.array([open_time], dtype=np.int64), self._base(symbol))
+                    data = {"e": "kline", "E": now, "s": symbol, "k": {
+                        "t": open_time, "T": open_time + interval_ms - 1, "s": symbol, "i": interval,
+                        "o": f"{k['open'][0]:.2f}", "c": f"{k['close'][0]:.2f}", "h": f"{k['high'][0]:.2f}",
+                        "l": f"{k['low'][0]:.2f}", "v": f"{k['volume'][0]:.3f}", "x": closed}}
+                    plain = [c for c in clients if c not in self._combined]
+                    combined = [c for c in clients if c in self._combined]
+                    if plain:
+                        self._send(plain, json.dumps(data))
+                    if combined:
+                        self._send(combined, json.dumps({"stream": name, "data": data}))
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Backlog mặc định (5) làm rơi SYN khi nhiều luồng mở kết nối cùng lúc: client chờ retransmit 1-3s
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive để client dùng lại kết nối như với sàn thật
+    disable_nagle_algorithm = True  # Header và body ghi riêng; không để Nagle + delayed ACK cộng ~40ms
+    mock: MockBinanceServer = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method: str):
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            return self._upgrade()
+        parsed = urlparse(self.path)
+        params = dict(parse_qsl(parsed.query))
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        if length:
+            params.update(parse_qsl(self.rfile.read(length).decode()))
+        status, body, headers = self.mock.handle(method, parsed.path, parsed.query, params)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _upgrade(self):
+        accept = base64.b64encode(hashlib.sha1((self.headers["Sec-WebSocket-Key"] + WS_GUID).encode()).digest())
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept.decode())
+        self.end_headers()
+        self.wfile.flush()
+        client = _WsClient(self.connection)
+        self.mock.attach_ws(client, self.path)
+        client.read_loop()
+        self.close_connection = True
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")